@@ -1,3 +1,5 @@
+from lexicon import DEFAULT_LETTERS
+
 class Agent:
     def __init__(self, name, **kwargs):
         self.name = name
@@ -7,10 +9,18 @@ class Agent:
                             'challenge_is_word']
         self.action_types = dict(enumerate(action_types, start = 1))
         self.action_types = {str(idx):act for idx,act in self.action_types.items()}
-        self._letters = [letter for letter in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ']
+        # NOTE: the letters of the game's lexicon when it is given
+        lexicon = kwargs.get("lexicon", None)
+        self._letters = lexicon.letters if lexicon is not None else DEFAULT_LETTERS
 
     def __repr__(self):
         return self.name
+
+    def reset(self):
+        '''
+        Nothing to forget between games.
+        '''
+        pass
         
     def get_action(self, game_state):
         '''
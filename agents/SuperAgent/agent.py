@@ -1,5 +1,13 @@
+import time
 import random
-from .best_proposal_finder import find_best_proposal
+from lexicon import load_lexicon
+from .best_proposal_finder import find_best_proposal, get_wordnt_action
+from .substring_index import load_substring_index, DEFAULT_INDEX_DIR
+from .transposition_cache import load_transposition_cache, DEFAULT_MAX_SIZE
+from .opening_book import load_opening_book, DEFAULT_OPENING_BOOK_DIR
+from .solver import load_solved_table, DEFAULT_SOLVED_TABLE_DIR
+from .parallel_scoring import load_proposal_pool
+from .suffix_automaton import load_suffix_automaton, DEFAULT_AUTOMATON_DIR
 
 class Agent:
 
@@ -7,20 +15,75 @@ class Agent:
         self.n_players = kwargs.get("n_players", 6)
         self.name = name
 
-        words_file = kwargs.get("words_file", "./data/wordnt_words.txt")
-        self._words = []
-        with open(words_file, "r") as f:
-            for line in f:
-                self._words.append(line.strip())
+        # NOTE: the lexicon is shared by reference, not copied
+        self.lexicon = kwargs.get("lexicon", None)
+        if self.lexicon is None:
+            self.lexicon = load_lexicon(kwargs.get("words_file", None), kwargs.get("lexicon_dir", None))
 
-        self._max_word_len = max([len(word) for word in self._words])
-        self._words_set = set(self._words)
-        self._letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-        self._latest_basis_words = set()
+        self._words = self.lexicon.words
+        # NOTE: hashed once per process here, not during the first move and its time budget
+        self._words.build_hash_table()
+        self._max_word_len = self.lexicon.max_word_len
+        self._letters = self.lexicon.letters
+
+        # NOTE: the substring index is shared by reference like the lexicon
+        self._index = kwargs.get("index", None)
+        if self._index is None:
+            self._index = load_substring_index(self.lexicon, kwargs.get("index_dir", DEFAULT_INDEX_DIR))
+
+        # NOTE: scores of strings seen in previous games, shared by all agents of the process
+        # pass cache_file to also share them between processes
+        self._cache = kwargs.get("cache", None)
+        if self._cache is None:
+            self._cache = load_transposition_cache(self.lexicon, kwargs.get("cache_file", None), 
+                                                   kwargs.get("cache_max_size", DEFAULT_MAX_SIZE))
+
+        # NOTE: precomputed first plies (see build_opening_book.py), if there is a book for this table
+        self._opening_book = kwargs.get("opening_book", None)
+        if self._opening_book is None:
+            self._opening_book = load_opening_book(self.lexicon, self.n_players, "metagame", 
+                                                   kwargs.get("opening_book_dir", DEFAULT_OPENING_BOOK_DIR))
+
+        # NOTE: with use_solver, play from the exact game solution (see solve_game.py) whenever a forced win exists
+        self._solved_table = kwargs.get("solved_table", None)
+        if (self._solved_table is None) and kwargs.get("use_solver", False):
+            self._solved_table = load_solved_table(self.lexicon, self.n_players, 
+                                                   kwargs.get("solved_table_dir", DEFAULT_SOLVED_TABLE_DIR))
+
+        # NOTE: with use_suffix_automaton, proposals without basis words are pruned before they are scored (see build_suffix_automaton.py)
+        # the moves are the same as without it
+        self._suffix_automaton = kwargs.get("suffix_automaton", None)
+        if (self._suffix_automaton is None) and kwargs.get("use_suffix_automaton", False):
+            self._suffix_automaton = load_suffix_automaton(self.lexicon, kwargs.get("suffix_automaton_dir", DEFAULT_AUTOMATON_DIR))
+
+        # NOTE: with n_scoring_workers > 1, proposals are scored by a pool of processes shared by the agents of the process
+        # the scores are the same as without the pool
+        self._pool = kwargs.get("pool", None)
+        if (self._pool is None) and (kwargs.get("n_scoring_workers", 1) > 1):
+            self._pool = load_proposal_pool(self.lexicon, self._index, kwargs["n_scoring_workers"])
+
+        # NOTE: with a time_budget (seconds per move), deeper search stages are skipped when they can't finish in time
+        # the plies the last move looked ahead are kept in last_search_depth
+        self.time_budget = kwargs.get("time_budget", None)
+        self.last_search_depth = None
+
+        # NOTE: plies the metagame strategy looks ahead, 2 is the next player only (see benchmarks/bench_lookahead_depth.py)
+        # nodes expanded and seconds per depth of the last move are kept in last_search_stats
+        self.search_depth = kwargs.get("search_depth", 2)
+        self.last_search_stats = []
+
+        self.reset()
 
     def __repr__(self):
         return self.name
 
+    def reset(self):
+        '''
+        Forget everything about the previous game.
+        '''
+        # NOTE: nothing to forget, the caches are keyed by string and outlive the games
+        pass
+
     def get_action(self, game_state):
         '''
         It should output actions based on the game state.
@@ -42,25 +105,39 @@ class Agent:
                 if action_type is "claim_word", the supposedly valid word
         '''
 
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        self.last_search_depth = 0
+        self.last_search_stats = []
+
         # responding to a challenge
         if game_state["last_action"] is not None:
             if game_state["last_action"][0] == "challenge_no_word":
-                if self._latest_basis_words:
-                    action_string = random.choice(list(self._latest_basis_words))
-                else:
+                # NOTE: any word containing the string wins the challenge, looked up in the index whatever happened before
+                action_string = self._index.witness(game_state["current_string"])
+                if action_string is None:
                     action_string = random.choice(self._words)
                 action_type = "claim_word"
 
                 return action_type, action_string
     
+        # forced win from the solved table
+        if (self._solved_table is not None) and (game_state["current_string"] not in self._words):
+            winning_proposals = self._solved_table.winning_proposals(game_state["current_string"], self._letters)
+            if winning_proposals:
+                best_proposal = random.choice(sorted(winning_proposals))
+                return get_wordnt_action(game_state["current_string"], best_proposal)
+
         # where all the magic happens
-        output_summary = find_best_proposal(game_state["current_string"], self.n_players, self._max_word_len, self._words_set, self._letters,
-                                            use_metagame_strat = True)
+        # NOTE: the index answers the basis word queries, so the words are only checked for membership and aren't narrowed down
+        # the hashed CompactWords are enough for that, the lexicon's words_set (a python str per word) is never built
+        output_summary = find_best_proposal(game_state["current_string"], self.n_players, self._max_word_len, self._words, self._letters,
+                                            use_metagame_strat = True, index = self._index, cache = self._cache, 
+                                            opening_book = self._opening_book, pool = self._pool, deadline = deadline, 
+                                            search_depth = self.search_depth, suffix_automaton = self._suffix_automaton, 
+                                            with_basis_words = False)
                                             
         action_type, action_string = output_summary["action_type"], output_summary["action_string"]
-
-        # update basis words
-        if output_summary["best_proposal_basis_words"] is not None:
-            self._latest_basis_words = output_summary["best_proposal_basis_words"]
+        self.last_search_depth = output_summary["search_depth"]
+        self.last_search_stats = output_summary["search_stats"]
         
         return action_type, action_string
\ No newline at end of file
@@ -1,11 +1,28 @@
 import ahocorasick as ahc
+import numpy as np
+import math
 import random
+import time
 import copy
 import difflib
+import threading
+from collections import OrderedDict
+from lexicon import WordSet
 
 VERBOSE = False
 SPRINKLE_RANDOMNESS = True
 
+# NOTE: the aho-corasick functions below (down to get_basis_words_per_proposal) are only the fallback for calls without an index
+# (index = None), which scan words_set. SuperAgent always scores from its substring index (see substring_index.py),
+# so they aren't optimized any further. tests/test_equivalence.py checks that both paths give the same scores, and the same as
+# the baseline scorer except for the single letter proposals it got wrong (see test_single_letter_proposals)
+
+# bounds of the automaton and haystack caches, in letters of the cached word lists
+AUTOMATON_CACHE_MAX_SIZE = 2000000
+HAYSTACK_CACHE_MAX_SIZE = 10000000
+# shorter word lists are cheaper to join again than to look up
+HAYSTACK_CACHE_MIN_WORDS = 10000
+
 def make_aho_automaton(keywords):
     # http://ieva.rocks/2016/11/24/keyword-matching-with-aho-corasick/
     A = ahc.Automaton()  # initialize
@@ -14,15 +31,80 @@ def make_aho_automaton(keywords):
     A.make_automaton() # generate automaton
     return A
 
-def get_words_list_window(keyword, end_index, max_word_len, words_string, words_set):
-    window_start_index = max(0,end_index - max_word_len)
-    window_end_index = min(end_index + max_word_len - 1, len(words_string))
+def make_haystack(words):
+    # the words joined into one string to run the automata on, the words in that order,
+    # and the position of each word in the words at every offset of the string (so a match is mapped to its word directly)
+    words = tuple(words)
+    words_string = " " + " ".join(words) + " "
     
-    words_string_window = words_string[window_start_index:window_end_index]
-    words_string_window = words_string_window.split(" ")
-    words_list_window = [word for word in words_string_window if (keyword in word) and (word in words_set)]
+    # NOTE: every word takes its letters and the space before it, the last space is given to the last word
+    word_lens = np.fromiter(map(len, words), dtype = np.int64, count = len(words))
+    word_ids = np.repeat(np.arange(len(words), dtype = np.uint32), word_lens + 1)
+    word_ids = np.append(word_ids, np.uint32(max(len(words) - 1, 0)))
     
-    return words_list_window
+    # NOTE: memoryview indexing returns python ints, much faster than numpy scalars per match
+    return words_string, words, memoryview(word_ids)
+
+class WordListCache:
+    '''
+    Least recently used cache of values built from word lists (automata, haystacks).
+    Word lists are keyed by content, tuples in order and other collections as sets, so the length bucket unions of a
+    WordSet (see lexicon.py) hit the same entry every turn. The total letters of the cached word lists stay under max_size.
+    Can be shared by agents playing in several threads.
+    '''
+    
+    def __init__(self, build, max_size, min_words = 0):
+        self.build = build
+        self.max_size = max_size
+        self.min_words = min_words
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __repr__(self):
+        return "WordListCache({} entries, {} letters, {} hits, {} misses)".format(len(self), self.size, self.hits, self.misses)
+    
+    def get(self, words):
+        if len(words) < self.min_words:
+            return self.build(words)
+        
+        key = words if isinstance(words, tuple) else (tuple(words) if isinstance(words, list) else frozenset(words))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        # NOTE: built outside the lock, two threads missing the same key at once both build it
+        value = self.build(words)
+        size = sum(map(len, words)) + len(words)
+        if size <= self.max_size:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = (value, size)
+                    self.size += size
+                while self.size > self.max_size:
+                    _, (_, evicted_size) = self._entries.popitem(last = False)
+                    self.size -= evicted_size
+        return value
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+# automata by keyword list and haystacks by word list, shared by every call in the process
+AUTOMATON_CACHE = WordListCache(make_aho_automaton, AUTOMATON_CACHE_MAX_SIZE)
+HAYSTACK_CACHE = WordListCache(make_haystack, HAYSTACK_CACHE_MAX_SIZE, HAYSTACK_CACHE_MIN_WORDS)
 
 def get_wordnt_action(current_string, proposal):
     
@@ -44,59 +126,66 @@ def get_wordnt_action(current_string, proposal):
 
 # returns a dictionary
 def get_matched_words_per_keyword(A_keywords, words, max_word_len):
-    words_string = " " + " ".join(words) + " "
-    words_set = set(words)
+    words_string, haystack_words, haystack_word_ids = HAYSTACK_CACHE.get(words)
     
-    matched_words_per_keyword = {}
+    # NOTE: keywords have no spaces, so every match lies inside the one word at its end index
+    matched_word_ids_per_keyword = {}
     
     for end_index, (_, keyword) in A_keywords.iter(words_string):
-        words_list_window = get_words_list_window(keyword, end_index, max_word_len, words_string, words_set)
-        
-        if keyword not in matched_words_per_keyword.keys():
-            matched_words_per_keyword[keyword] = set(words_list_window)
-        else:
-            matched_words_per_keyword[keyword].update(words_list_window)
-        
-    return matched_words_per_keyword
+        word_ids = matched_word_ids_per_keyword.get(keyword)
+        if word_ids is None:
+            word_ids = matched_word_ids_per_keyword[keyword] = set()
+        word_ids.add(haystack_word_ids[end_index])
+    
+    return {keyword:{haystack_words[word_id] for word_id in word_ids} for keyword, word_ids in matched_word_ids_per_keyword.items()}
+
+def is_edge_match(halt_basis_word, keyword, proposal):
+    # case 1
+    if halt_basis_word == keyword:
+        return True
+    # case 2
+    elif (proposal == halt_basis_word[:len(proposal)]) and (proposal == keyword[:len(proposal)]):
+        return True
+    # case 3
+    elif (proposal == halt_basis_word[-len(proposal):]) and (proposal == keyword[-len(proposal):]):
+        return True
+    return False
 
 # returns a set
 def get_matched_words_all(A_keywords, words, max_word_len, proposal, edge_match_only = False):
-    words_string = " " + " ".join(words) + " "
-    words_set = set(words)
+    words_string, haystack_words, haystack_word_ids = HAYSTACK_CACHE.get(words)
     
-    matched_words = set()
+    matched_word_ids = set()
     
     for end_index, (_, keyword) in A_keywords.iter(words_string):
         # keywords are the halt words
-        words_list_window = get_words_list_window(keyword, end_index, max_word_len, words_string, words_set)
-        
-        if edge_match_only:
-            words_list_window_filtered = []
-            for halt_basis_word in words_list_window:
-                # case 1
-                if halt_basis_word == keyword:
-                    words_list_window_filtered.append(halt_basis_word)
-                # case 2
-                elif (proposal == halt_basis_word[:len(proposal)]) and (proposal == keyword[:len(proposal)]):
-                    words_list_window_filtered.append(halt_basis_word)
-                # case 3
-                elif (proposal == halt_basis_word[-len(proposal):]) and (proposal == keyword[-len(proposal):]):
-                    words_list_window_filtered.append(halt_basis_word)
-                else:
-                    pass
-            words_list_window = words_list_window_filtered
-                    
-        matched_words.update(words_list_window)
-
-        # get_matched_words_all(A_halt_words, basis_words_filtered, max_word_len)
-                
-    return matched_words
+        word_id = haystack_word_ids[end_index]
+        if word_id in matched_word_ids:
+            continue
+        
+        # NOTE: the cases only depend on the word and the keyword, not on where the keyword is matched
+        if edge_match_only and not is_edge_match(haystack_words[word_id], keyword, proposal):
+            continue
+        
+        matched_word_ids.add(word_id)
+    
+    return {haystack_words[word_id] for word_id in matched_word_ids}
 
-def generate_proposal_strings(current_string, letters, words_set = None):
+def generate_proposal_strings(current_string, letters, words_set = None, suffix_automaton = None, index = None):
     proposed_strings = set()
     
+    if suffix_automaton is not None:
+        # NOTE: only proposals with basis words (see get_basis_word_masks), the others would be dropped after scoring
+        basis_word_counts = suffix_automaton.extension_counts(current_string, letters, min_len = len(current_string) + 2)
+    elif (index is not None) and (current_string != ""):
+        # NOTE: only letters next to the current string in some word, the other proposals have no basis words either
+        # all of them are read from the suffix array entries of the current string at once
+        left_letters, right_letters = (set(adjacent_letters) for adjacent_letters in index.adjacent_letters(current_string))
+    
     if current_string == "":
         proposed_strings = [letter for letter in letters]
+        if suffix_automaton is not None:
+            proposed_strings = [proposal for proposal in proposed_strings if basis_word_counts.get(proposal, 0) != 0]
 
     else:
         for letter in letters:
@@ -106,6 +195,12 @@ def generate_proposal_strings(current_string, letters, words_set = None):
                 else:
                     proposal_string = current_string + letter
             
+                if (suffix_automaton is not None) and (basis_word_counts.get(proposal_string, 0) == 0):
+                    continue
+                if (suffix_automaton is None) and (index is not None) and \
+                    (letter not in (left_letters if position == "left" else right_letters)):
+                    continue
+            
                 if words_set is not None:
                     # dont propose an existing word
                     if proposal_string not in words_set:
@@ -113,50 +208,233 @@ def generate_proposal_strings(current_string, letters, words_set = None):
                 else:
                     proposed_strings.add(proposal_string)
 
-        proposed_strings = list(proposed_strings)
+        # NOTE: sorted so that results don't depend on set ordering (i.e. same seed, same game)
+        proposed_strings = sorted(proposed_strings)
     
     return proposed_strings    
 
+def remove_halt_basis_words(basis_words_per_proposal, halt_words, max_word_len):
+    # these will contain basis words that are filtered to not have any halt words
+    # NOTE: words are immutable, so new sets are enough (no need for a deepcopy)
+    
+    if not halt_words:
+        return {proposal:set(basis_words) for proposal, basis_words in basis_words_per_proposal.items()}
+    
+    basis_words_nohalt_per_proposal = {}
+    
+    # make automaton out of halt words
+    A_halt_words = AUTOMATON_CACHE.get(halt_words)
+
+    # find basis words that contain halt words and have the proposal as a suffix or prefix
+    # these are the the basis words we want to remove
+    for proposal, basis_words_filtered in basis_words_per_proposal.items():
+        halt_basis_words = get_matched_words_all(A_halt_words, basis_words_filtered, max_word_len, proposal, 
+                                                edge_match_only = True)            
+        
+        # get set difference to remove halting basis words
+        basis_words_nohalt_per_proposal[proposal] = basis_words_filtered - halt_basis_words 
+    
+    return basis_words_nohalt_per_proposal
+
 def get_basis_words_per_proposal(proposal_strings, halt_words, basis_words, max_word_len):
+    # NOTE: an automaton without keywords can't be run, the suffix automata can prune every proposal
+    if not proposal_strings:
+        return {}, {}
+
     # make an aho automaton out of proposal strings
-    A_proposals = make_aho_automaton(proposal_strings)
+    A_proposals = AUTOMATON_CACHE.get(proposal_strings)
     
     # find basis words per proposal
     basis_words_per_proposal = get_matched_words_per_keyword(A_proposals, basis_words, max_word_len)
     
-    # these will contain basis words that are filtered to not have any halt words
-    basis_words_nohalt_per_proposal = copy.deepcopy(basis_words_per_proposal)
+    basis_words_nohalt_per_proposal = remove_halt_basis_words(basis_words_per_proposal, halt_words, max_word_len)
     
-    if halt_words:
-        # make automaton out of halt words
-        A_halt_words = make_aho_automaton(halt_words)
+    return basis_words_per_proposal, basis_words_nohalt_per_proposal
 
-        # find basis words that contain halt words and have the proposal as a suffix or prefix
-        # these are the the basis words we want to remove
-        for proposal, basis_words_filtered in basis_words_per_proposal.items():
-            halt_basis_words = get_matched_words_all(A_halt_words, basis_words_filtered, max_word_len, proposal, 
-                                                    edge_match_only = True)            
-            
-            # get set difference to remove halting basis words
-            basis_words_nohalt_per_proposal[proposal] -= halt_basis_words 
+# the functions below give the same basis words as the aho-corasick ones above,
+# but as sorted arrays of word IDs read from the precomputed substring index (see substring_index.py)
+
+def get_halt_word_len_mask(halt_modulus, max_word_len):
+    # bit k is set for the halt word lengths k (multiples of halt_modulus), see SubstringIndex.edge_word_ids_containing_words
+    return sum(1 << halt_word_len for halt_word_len in range(halt_modulus, max_word_len + 1, halt_modulus))
+
+def get_halt_edge_word_ids(proposal, halt_modulus, index):
+    # words starting with the proposal that contain a halt word also starting with the proposal,
+    # and words ending with the proposal that contain a halt word also ending with the proposal
+    # NOTE: read from the word length masks of the index, no halt word is searched in the words
+    return index.edge_word_ids_containing_words(proposal, get_halt_word_len_mask(halt_modulus, index.max_word_len))
+
+def get_halt_basis_word_ids(proposal, basis_word_ids, halt_modulus, index):
+    # same basis words as get_matched_words_all(A_halt_words, basis_words, max_word_len, proposal, edge_match_only = True)
     
-    return basis_words_per_proposal, basis_words_nohalt_per_proposal
+    if basis_word_ids.size == 0:
+        return basis_word_ids
+    
+    # case 1: the basis word is itself a halt word
+    is_halt_basis_word = index.word_lens[basis_word_ids] % halt_modulus == 0
+    
+    # case 2: the basis word starts with the proposal and contains a halt word that also starts with the proposal
+    # case 3: the basis word ends with the proposal and contains a halt word that also ends with the proposal
+    is_halt_basis_word |= np.isin(basis_word_ids, get_halt_edge_word_ids(proposal, halt_modulus, index), assume_unique = True)
+    
+    return basis_word_ids[is_halt_basis_word]
 
-def get_basis_words(current_string, n_players, max_word_len, words_set, letters):
-     
-    # basis words are words that you can still form towards when it's your turn
-    basis_words = [word for word in words_set if (len(word) > len(current_string) + 1)]
+def get_proposal_basis_word_ids(proposal, min_basis_word_len, halt_modulus, index):
+    basis_word_ids = index.word_ids(proposal, min_len = min_basis_word_len)
+    
+    halt_basis_word_ids = get_halt_basis_word_ids(proposal, basis_word_ids, halt_modulus, index)
+    basis_word_ids_nohalt = np.setdiff1d(basis_word_ids, halt_basis_word_ids, assume_unique = True)
+    
+    return basis_word_ids, basis_word_ids_nohalt
+
+def get_proposal_halt_basis_word_ids(proposal, min_basis_word_len, halt_modulus, index):
+    basis_word_ids = index.word_ids(proposal, min_len = min_basis_word_len)
+    halt_basis_word_ids = get_halt_basis_word_ids(proposal, basis_word_ids, halt_modulus, index)
     
+    return basis_word_ids, halt_basis_word_ids
+
+# (basis word count, halting basis word count, total letters of the basis words) of a proposal, same words as get_proposal_halt_basis_word_ids
+# with suffix_automaton, the basis words are counted from its length buckets and only the words starting or ending with the proposal are listed
+def get_proposal_basis_word_counts(proposal, min_basis_word_len, halt_modulus, index, suffix_automaton = None):
+    if suffix_automaton is None:
+        basis_word_ids, halt_basis_word_ids = get_proposal_halt_basis_word_ids(proposal, min_basis_word_len, halt_modulus, index)
+        return basis_word_ids.size, halt_basis_word_ids.size, int(index.word_lens[basis_word_ids].sum(dtype = np.int64))
+    
+    state = suffix_automaton.forward_state(proposal)
+    if state == -1:
+        return 0, 0, 0
+    word_len_counts = [(word_len, count) for word_len, count in suffix_automaton.forward.word_len_counts(state) if word_len >= min_basis_word_len]
+    n_basis_words = sum(count for _, count in word_len_counts)
+    if n_basis_words == 0:
+        return 0, 0, 0
+    n_basis_word_letters = sum(word_len*count for word_len, count in word_len_counts)
+    
+    # case 1: the basis word is itself a halt word
+    n_halt_basis_words = sum(count for word_len, count in word_len_counts if word_len % halt_modulus == 0)
+    
+    # case 2 and 3, as in get_halt_basis_word_ids
+    halt_edge_word_ids = get_halt_edge_word_ids(proposal, halt_modulus, index)
+    halt_edge_word_lens = index.word_lens[halt_edge_word_ids]
+    n_halt_edge_words = np.count_nonzero((halt_edge_word_lens >= min_basis_word_len) & (halt_edge_word_lens % halt_modulus != 0))
+    
+    return n_basis_words, n_halt_basis_words + n_halt_edge_words, n_basis_word_letters
+
+def get_basis_word_counts(current_string, n_players, words_set, letters, index, deadline = None, suffix_automaton = None):
+    """
+    Count-only version of get_basis_word_masks: the basis word count, halting basis word count and total letters of the basis words
+    of every proposal with basis words, by proposal. No word lists or masks are built, so there is nothing for the metagame ratios.
+    Stops at the deadline like get_basis_word_masks, is_complete tells if every proposal was counted.
+    """
+    
+    # same lengths as in get_basis_word_masks
+    min_basis_word_len = len(current_string) + 2
+    halt_modulus = len(current_string) + n_players + 1
+    
+    is_complete = True
+    basis_word_counts = {}
+    
+    for proposal in generate_proposal_strings(current_string, letters, words_set, suffix_automaton, index):
+        if basis_word_counts and is_past_deadline(deadline):
+            is_complete = False
+            break
+        
+        counts = get_proposal_basis_word_counts(proposal, min_basis_word_len, halt_modulus, index, suffix_automaton)
+        if counts[0] != 0:
+            basis_word_counts[proposal] = counts
+    
+    return basis_word_counts, is_complete
+
+def get_basis_word_masks(current_string, n_players, words_set, letters, index, pool = None, deadline = None, suffix_automaton = None):
+    """
+    Basis words and halting basis words of every proposal, as rows of boolean masks.
+    Every basis word contains the current string, so the columns of all the masks are
+    the words containing the current string (universe_word_ids).
+    Only proposals with basis words are kept.
+    If pool (a ProposalPool) is given, the proposals are spread over its workers.
+    If the deadline (a time.perf_counter() value) passes, the proposals scored so far are returned,
+    as soon as one of them has basis words. is_complete tells if every proposal was scored.
+    If suffix_automaton (a BidirectionalAutomaton) is given, proposals without basis words are dropped before they are scored.
+    """
+    
+    # same lengths as the basis words and halt words in get_basis_words
+    min_basis_word_len = len(current_string) + 2
+    halt_modulus = len(current_string) + n_players + 1
+    
+    universe_word_ids = index.word_ids(current_string)
+    
+    proposal_strings = generate_proposal_strings(current_string, letters, words_set, suffix_automaton, index)
+    if pool is not None:
+        halt_basis_word_ids_per_proposal = pool.imap_halt_basis_word_ids(proposal_strings, min_basis_word_len, halt_modulus)
+    else:
+        # NOTE: lazy, so that the proposals after the deadline aren't scored
+        halt_basis_word_ids_per_proposal = (get_proposal_halt_basis_word_ids(proposal, min_basis_word_len, halt_modulus, index)
+                                            for proposal in proposal_strings)
+    
+    is_complete = True
+    proposals = []
+    basis_masks = []
+    halt_masks = []
+    
+    for proposal, (basis_word_ids, halt_basis_word_ids) in zip(proposal_strings, halt_basis_word_ids_per_proposal):
+        
+        # NOTE: a proposal with basis words is needed, otherwise it looks like there's nothing left but to challenge
+        if proposals and is_past_deadline(deadline):
+            is_complete = False
+            break
+        
+        # don't keep proposals with no basis words
+        if basis_word_ids.size == 0:
+            continue
+        
+        basis_mask = np.zeros(universe_word_ids.size, dtype = bool)
+        basis_mask[np.searchsorted(universe_word_ids, basis_word_ids)] = True
+        halt_mask = np.zeros(universe_word_ids.size, dtype = bool)
+        halt_mask[np.searchsorted(universe_word_ids, halt_basis_word_ids)] = True
+        
+        proposals.append(proposal)
+        basis_masks.append(basis_mask)
+        halt_masks.append(halt_mask)
+    
+    basis_masks = np.array(basis_masks, dtype = bool).reshape(len(proposals), universe_word_ids.size)
+    halt_masks = np.array(halt_masks, dtype = bool).reshape(len(proposals), universe_word_ids.size)
+    
+    return proposals, universe_word_ids, basis_masks, halt_masks, is_complete
+
+def get_length_filtered_words(current_string, n_players, words_set):
+    # basis words are words that are long enough to still be formed after the next letter
     # halt words are words that will force you to lose in any of your next turns
-    halt_words = [word for word in words_set if len(word) % (len(current_string) + n_players + 1) == 0]
+    min_basis_word_len = len(current_string) + 2
+    halt_modulus = len(current_string) + n_players + 1
+    
+    if isinstance(words_set, WordSet):
+        # NOTE: unions of the lexicon's length buckets, cached per string length and number of players
+        return words_set.get_length_filtered_words(min_basis_word_len, halt_modulus)
     
-    # generate all possible ways to add a letter (i.e. get proposal strings)
-    proposal_strings = generate_proposal_strings(current_string, letters, words_set)
+    basis_words = [word for word in words_set if len(word) >= min_basis_word_len]
+    halt_words = [word for word in words_set if len(word) % halt_modulus == 0]
+    return basis_words, halt_words
+
+def get_basis_words(current_string, n_players, max_word_len, words_set, letters, index = None, suffix_automaton = None):
     
     # enumerate all basis words and nonhalt basis words per proposal
+    # basis words are words that you can still form towards when it's your turn
     # nonhalt basis words are basis words that don't contain halting words
-    # this enumeration is powered by the aho-corasick algorithm for speed
-    basis_words_per_proposal, basis_words_nohalt_per_proposal = get_basis_words_per_proposal(proposal_strings, halt_words, basis_words, max_word_len)
+    if index is not None:
+        # basis words are read from the substring index, no scan of the word list needed
+        proposals, universe_word_ids, basis_masks, halt_masks, _ = get_basis_word_masks(current_string, n_players, words_set, letters, index, 
+                                                                                        suffix_automaton = suffix_automaton)
+        basis_words_per_proposal = {proposal:index.words_of(universe_word_ids[basis_mask]) 
+                                    for proposal, basis_mask in zip(proposals, basis_masks)}
+        basis_words_nohalt_per_proposal = {proposal:index.words_of(universe_word_ids[basis_mask & ~halt_mask]) 
+                                           for proposal, basis_mask, halt_mask in zip(proposals, basis_masks, halt_masks)}
+    else:
+        basis_words, halt_words = get_length_filtered_words(current_string, n_players, words_set)
+        
+        # generate all possible ways to add a letter (i.e. get proposal strings)
+        proposal_strings = generate_proposal_strings(current_string, letters, words_set, suffix_automaton)
+        
+        # this enumeration is powered by the aho-corasick algorithm for speed
+        basis_words_per_proposal, basis_words_nohalt_per_proposal = get_basis_words_per_proposal(proposal_strings, halt_words, basis_words, max_word_len)
     
     return basis_words_per_proposal, basis_words_nohalt_per_proposal
 
@@ -204,6 +482,17 @@ def compute_basis_word_ratios(basis_words_per_proposal, basis_words_nohalt_per_p
         
     return basis_word_ratios
 
+# same ratios as compute_basis_word_ratios, counted on the boolean masks of get_basis_word_masks
+def compute_basis_word_ratios_from_masks(proposals, basis_masks, halt_masks):
+    
+    n_basis_words = np.count_nonzero(basis_masks, axis = 1)
+    n_basis_words_nohalt = np.count_nonzero(basis_masks & ~halt_masks, axis = 1)
+    
+    # NOTE: proposals without basis words were already dropped so there's no division by zero
+    basis_word_ratios = dict(zip(proposals, (n_basis_words_nohalt/n_basis_words).tolist()))
+    
+    return basis_word_ratios
+
 def get_random_max_ratio(basis_word_ratios, threshold = 0.01):
     # sort proposals in ascending order (will pop best proposals)
     sorted_basis_word_ratios = sorted(basis_word_ratios.items(), key = lambda x: x[1])
@@ -274,6 +563,16 @@ def optimize_stall(basis_words_per_proposal, verbose = VERBOSE):
         avg_len = sum(len_basis_words)/len(basis_words)
         avg_len_basis_words[proposal] = avg_len
         
+    return select_best_stall(avg_len_basis_words, verbose = verbose)
+
+# same as optimize_stall, on the boolean masks of get_basis_word_masks
+def optimize_stall_from_masks(proposals, universe_word_ids, basis_masks, word_lens, verbose = VERBOSE):
+    len_basis_words = np.where(basis_masks, word_lens[universe_word_ids].astype(np.int64), 0)
+    avg_len_basis_words = dict(zip(proposals, (len_basis_words.sum(axis = 1)/np.count_nonzero(basis_masks, axis = 1)).tolist()))
+    
+    return select_best_stall(avg_len_basis_words, verbose = verbose)
+
+def select_best_stall(avg_len_basis_words, verbose = VERBOSE):
     best_proposal = max(avg_len_basis_words, key = avg_len_basis_words.get)
     best_avg_len = avg_len_basis_words[best_proposal]
     
@@ -285,8 +584,12 @@ def optimize_stall(basis_words_per_proposal, verbose = VERBOSE):
 # confirming the basis word ratio
 # more for mathematical accuracy of basis word ratio simulation
 # no effect on winning the game
-def confirm_challenge_no_word_scenario(current_string, words_set):
-    matching_words = [word for word in words_set if current_string in word]
+def confirm_challenge_no_word_scenario(current_string, words_set, index = None):
+    if index is not None:
+        # NOTE: one binary search in the index instead of a scan of the words
+        matching_words = index.words_containing(current_string)
+    else:
+        matching_words = [word for word in words_set if current_string in word]
     
     # case if you were dealt with a very bad hand (i.e. forced to form a word)
     if matching_words:
@@ -301,7 +604,7 @@ def confirm_challenge_no_word_scenario(current_string, words_set):
 
 # using the nohalt intersection ratio is a metagame strategy
 def compute_nohalt_intersection_ratios(basis_words_per_proposal, basis_words_nohalt_per_proposal, 
-                                       n_players, max_word_len, words_set, letters):
+                                       n_players, max_word_len, words_set, letters, index = None, suffix_automaton = None):
     
     nohalt_intersection_ratios = {}
 
@@ -320,7 +623,8 @@ def compute_nohalt_intersection_ratios(basis_words_per_proposal, basis_words_noh
         
         # getting the opponent's basis words
         next_basis_words_per_proposal, next_basis_words_nohalt_per_proposal = get_basis_words(proposal, 
-                                                                                n_players, max_word_len, words_set, letters)
+                                                                                n_players, max_word_len, words_set, letters, index, 
+                                                                                suffix_automaton)
         
         # calculate the basis word ratio metric
         # given a proposal string, this is the proportion of basis words that are nonhalting
@@ -345,24 +649,234 @@ def compute_nohalt_intersection_ratios(basis_words_per_proposal, basis_words_noh
             else:
                 pass
             
-        # consolidating the nohalt_intersection_ratio into one number will depend on the assumption of the opponent's strategy
-        # nbwr means next_basis_word_ratio
-        # nhir means nohalt_intersection_ratio
+        nohalt_intersection_ratio = consolidate_nhi_ratios(nhi_ratios_list)
+        if nohalt_intersection_ratio is not None:
+            nohalt_intersection_ratios[proposal] = nohalt_intersection_ratio
+
+    return nohalt_intersection_ratios
+
+# same ratios as compute_nohalt_intersection_ratios, computed on the boolean masks of get_basis_word_masks
+# next proposals are kept as sorted word ID arrays, and their intersections are counted by looking them up in the masks
+# returns None if the deadline (a time.perf_counter() value) passes before every proposal is scored
+def compute_nohalt_intersection_ratios_from_masks(proposals, universe_word_ids, basis_masks, halt_masks, 
+                                                  n_players, words_set, letters, index, pool = None, deadline = None, 
+                                                  next_basis_word_ids_cache = None, suffix_automaton = None):
+    
+    basis_masks_nohalt = basis_masks & ~halt_masks
+    
+    if pool is not None:
+        # NOTE: the workers recompute the nonhalt basis words of their proposals, only the proposals are sent
+        nohalt_intersection_ratio_per_proposal = pool.map_nohalt_intersection_ratios(proposals, n_players, letters, deadline)
+        if nohalt_intersection_ratio_per_proposal is None:
+            return None
+    else:
+        # the same next proposal can come from two proposals (e.g. XAB from XA and AB) so only compute it once
+        if next_basis_word_ids_cache is None:
+            next_basis_word_ids_cache = {}
+        nohalt_intersection_ratio_per_proposal = []
+        for proposal, basis_mask_nohalt in zip(proposals, basis_masks_nohalt):
+            if is_past_deadline(deadline):
+                return None
+            nohalt_intersection_ratio_per_proposal.append(compute_proposal_nohalt_intersection_ratio(proposal, universe_word_ids, 
+                                                                                                     basis_mask_nohalt, n_players, 
+                                                                                                     words_set, letters, index, 
+                                                                                                     next_basis_word_ids_cache, 
+                                                                                                     suffix_automaton))
+    
+    nohalt_intersection_ratios = {}
+    for proposal, nohalt_intersection_ratio in zip(proposals, nohalt_intersection_ratio_per_proposal):
+        if nohalt_intersection_ratio is not None:
+            nohalt_intersection_ratios[proposal] = nohalt_intersection_ratio
+    
+    return nohalt_intersection_ratios
+
+# basis word count and nonhalt basis word columns of a proposal made from a string one letter shorter
+# same lengths as in get_basis_word_masks(proposal[:-1], ...), the columns are positions in universe_word_ids
+def get_nohalt_basis_word_columns(proposal, universe_word_ids, n_players, index, basis_word_columns_cache):
+    if proposal not in basis_word_columns_cache:
+        basis_word_ids, basis_word_ids_nohalt = get_proposal_basis_word_ids(proposal, len(proposal) + 1, len(proposal) + n_players, index)
+        # NOTE: basis words of the proposal also contain the current string, so they are columns of the masks
+        basis_word_columns_cache[proposal] = (basis_word_ids.size, np.searchsorted(universe_word_ids, basis_word_ids_nohalt))
+    return basis_word_columns_cache[proposal]
+
+# metagame ratio of a single proposal, the columns of basis_mask_nohalt are universe_word_ids
+# universe_word_ids must have every word containing the proposal
+def compute_proposal_nohalt_intersection_ratio(proposal, universe_word_ids, basis_mask_nohalt, n_players, words_set, letters, index,
+                                               next_basis_word_ids_cache = None, suffix_automaton = None):
+    
+    if next_basis_word_ids_cache is None:
+        next_basis_word_ids_cache = {}
+    
+    nhi_ratios_list = []
+    
+    for next_proposal in generate_proposal_strings(proposal, letters, words_set, suffix_automaton, index):
+        n_next_basis_words, next_basis_word_columns_nohalt = get_nohalt_basis_word_columns(next_proposal, universe_word_ids, n_players, 
+                                                                                           index, next_basis_word_ids_cache)
         
-        # assume that opponent will choose among sure wins first, and if none exists, will chose among where basis word is nonzero
-        nhi_ratios_list = [nhir for (nbwr, nhir) in nhi_ratios_list if nbwr == 1]
+        # opponent doesn't consider proposals with no basis words
+        if n_next_basis_words == 0:
+            continue
         
-        if not nhi_ratios_list:
-            # assume that opponent will choose randomly among proposals where his basis word ratio is nonzero
-            nhi_ratios_list = [nhir for (nbwr, nhir) in nhi_ratios_list if nbwr != 0]
+        next_basis_word_ratio = next_basis_word_columns_nohalt.size/n_next_basis_words
         
-        if len(nhi_ratios_list) != 0:
-            nohalt_intersection_ratios[proposal] = sum(nhi_ratios_list)/len(nhi_ratios_list) 
+        # get count of intersection of nohalting words between you and the next opponent
+        numerator = np.count_nonzero(basis_mask_nohalt[next_basis_word_columns_nohalt])
+        denominator = next_basis_word_columns_nohalt.size
+        
+        if denominator != 0:
+            nohalt_intersection_ratio = numerator/denominator
+            nhi_ratios_list.append((next_basis_word_ratio,nohalt_intersection_ratio))
+    
+    return consolidate_nhi_ratios(nhi_ratios_list)
 
-    return nohalt_intersection_ratios
+class SearchTimeout(Exception):
+    pass
+
+def compute_lookahead_ratios_from_masks(proposals, universe_word_ids, basis_masks, halt_masks, n_players, words_set, letters, index, 
+                                        search_depth, deadline = None, basis_word_columns_cache = None, suffix_automaton = None):
+    """
+    Metagame ratios looking search_depth plies ahead (search_depth = 2 gives compute_nohalt_intersection_ratios_from_masks).
+    
+    The metagame strategy assumes the next player picks uniformly among their sure wins (basis word ratio of 1),
+    and scores a proposal by the share of that player's nonhalt basis words that are also nonhalt basis words of the proposal.
+    This extends it to the following plies: every opponent picks uniformly among their sure wins (expectation),
+    we pick our best proposal when the string comes back to us (max), and the last string is scored like the next player's
+    proposal above. A player with no such proposal ends the line, which is then scored at the string handed to them.
+    
+    Values are memoized per string for each of our proposals, and the basis words per string are shared by all of them.
+    Lines that can't change a max are pruned (alpha-beta on our plies, Star1 on the expectations).
+    Our own proposals are all scored exactly, so the random tie-break of optimize_ratio stays the same.
+    
+    Raises SearchTimeout if the deadline (a time.perf_counter() value) passes.
+    
+    returns:
+        nohalt_intersection_ratios: dict. The ratio of every proposal whose next player has a sure win
+        n_nodes: int. Number of strings expanded (proposals generated and scored), including the current string
+    """
+    
+    if basis_word_columns_cache is None:
+        basis_word_columns_cache = {}
+    
+    search = {"universe_word_ids":universe_word_ids,
+              "n_players":n_players,
+              "words_set":words_set,
+              "letters":letters,
+              "index":index,
+              "suffix_automaton":suffix_automaton,
+              "deadline":deadline,
+              "basis_word_columns_cache":basis_word_columns_cache,
+              "n_nodes":1}
+    
+    basis_masks_nohalt = basis_masks & ~halt_masks
+    
+    nohalt_intersection_ratios = {}
+    for proposal, basis_mask_nohalt in zip(proposals, basis_masks_nohalt):
+        search["basis_mask_nohalt"] = basis_mask_nohalt
+        # NOTE: values depend on our nonhalt basis words, so they're only shared within the lines of one proposal
+        search["values"] = {}
+        
+        # same as consolidate_nhi_ratios, proposals where the next player has no sure win aren't scored
+        if not get_lookahead_children(proposal, 1, search):
+            continue
+        
+        nohalt_intersection_ratios[proposal] = search_lookahead_value(proposal, search_depth - 1, 1, 0.0, 1.0, search)
+    
+    return nohalt_intersection_ratios, search["n_nodes"]
+
+# the proposals a player considers when handed string, turn is the number of turns after ours
+def get_lookahead_children(string, turn, search):
+    children = []
+    for proposal in generate_proposal_strings(string, search["letters"], search["words_set"], search["suffix_automaton"], search["index"]):
+        n_basis_words, basis_word_columns_nohalt = get_nohalt_basis_word_columns(proposal, search["universe_word_ids"], search["n_players"], 
+                                                                                 search["index"], search["basis_word_columns_cache"])
+        if turn == 0:
+            # our proposals, as long as they can be scored
+            if basis_word_columns_nohalt.size != 0:
+                children.append(proposal)
+        elif (n_basis_words != 0) and (basis_word_columns_nohalt.size == n_basis_words):
+            # opponent's sure wins
+            children.append(proposal)
+    return children
+
+# share of the nonhalt basis words of proposal that are also our nonhalt basis words
+def get_lookahead_leaf_value(proposal, search):
+    _, basis_word_columns_nohalt = search["basis_word_columns_cache"][proposal]
+    return np.count_nonzero(search["basis_mask_nohalt"][basis_word_columns_nohalt])/basis_word_columns_nohalt.size
+
+# value of string handed to the player turn turns after us, looking depth more plies ahead
+# the value is exact if it's strictly between alpha and beta, otherwise it's a bound on the side it falls
+def search_lookahead_value(string, depth, turn, alpha, beta, search):
+    if depth == 0:
+        return get_lookahead_leaf_value(string, search)
+    
+    if string in search["values"]:
+        return search["values"][string]
+    
+    if is_past_deadline(search["deadline"]):
+        raise SearchTimeout()
+    
+    search["n_nodes"] += 1
+    children = get_lookahead_children(string, turn, search)
+    next_turn = (turn + 1) % search["n_players"]
+    
+    if not children:
+        # end of the line
+        value = get_lookahead_leaf_value(string, search)
+    
+    elif turn == 0:
+        # our turn, we pick our best proposal
+        value = 0.0
+        for child in children:
+            value = max(value, search_lookahead_value(child, depth - 1, next_turn, max(alpha, value), beta, search))
+            if value >= beta:
+                break
+    
+    else:
+        # opponent's turn, average over their sure wins
+        n_children = len(children)
+        total = 0.0
+        for i, child in enumerate(children):
+            n_left = n_children - i
+            # NOTE: values are between 0 and 1, stop once the average can't get above alpha or below beta
+            if total + n_left <= n_children*alpha:
+                break
+            if total >= n_children*beta:
+                break
+            child_alpha = n_children*alpha - total - (n_left - 1)
+            child_beta = n_children*beta - total
+            total += search_lookahead_value(child, depth - 1, next_turn, max(child_alpha, 0.0), min(child_beta, 1.0), search)
+        else:
+            n_left = 0
+        value = (total + n_left)/n_children if total + n_left <= n_children*alpha else total/n_children
+    
+    if alpha < value < beta:
+        search["values"][string] = value
+    return value
+
+def is_past_deadline(deadline):
+    return (deadline is not None) and (time.perf_counter() >= deadline)
+
+def consolidate_nhi_ratios(nhi_ratios_list):
+    # consolidating the nohalt_intersection_ratio into one number will depend on the assumption of the opponent's strategy
+    # nbwr means next_basis_word_ratio
+    # nhir means nohalt_intersection_ratio
+    
+    # assume that opponent will choose among sure wins first, and if none exists, will chose among where basis word is nonzero
+    nhi_ratios_list = [nhir for (nbwr, nhir) in nhi_ratios_list if nbwr == 1]
+    
+    if not nhi_ratios_list:
+        # assume that opponent will choose randomly among proposals where his basis word ratio is nonzero
+        nhi_ratios_list = [nhir for (nbwr, nhir) in nhi_ratios_list if nbwr != 0]
+    
+    if len(nhi_ratios_list) != 0:
+        # NOTE: fsum is exactly rounded, so the ratio doesn't depend on the order the next proposals were scored in
+        return math.fsum(nhi_ratios_list)/len(nhi_ratios_list)
+    else:
+        return None
 
 # hardcoded first turn based on running best proposals (within 1% ratio) on a given word set
-def quick_first_turn(n_players, words_set, use_metagame_strat, verbose = VERBOSE):
+# the proposals are letters of the Scrabble list, only the ones in letters are played (None if there are none)
+def quick_first_turn(n_players, words_set, use_metagame_strat, verbose = VERBOSE, index = None, with_basis_words = True, letters = None):
     
     if not use_metagame_strat:
         best_first_turn_dict = {
@@ -398,9 +912,18 @@ def quick_first_turn(n_players, words_set, use_metagame_strat, verbose = VERBOSE
     
     best_first_turn = best_first_turn_dict.get(n_players, default_first_turn)
     best_proposals, best_ratio = best_first_turn["proposals"], best_first_turn["ratio"]
+    if letters is not None:
+        best_proposals = [proposal for proposal in best_proposals if proposal in letters]
+        if not best_proposals:
+            return None
     
     best_proposal = random.choice(best_proposals)
-    best_proposal_basis_words = [word for word in words_set if best_proposal in word]
+    if not with_basis_words:
+        best_proposal_basis_words = None
+    elif index is not None:
+        best_proposal_basis_words = list(index.words_containing(best_proposal))
+    else:
+        best_proposal_basis_words = [word for word in words_set if best_proposal in word]
     
     if verbose:
         print("Found best proposal {} with {:.0f}% score".format(best_proposal, best_ratio*100))
@@ -410,40 +933,221 @@ def quick_first_turn(n_players, words_set, use_metagame_strat, verbose = VERBOSE
                        "best_proposal_basis_words":best_proposal_basis_words,
                       "best_proposal_basis_words_nohalt":best_proposal_basis_words,
                        "action_type":"add_to_start",
-                       "action_string":best_proposal}
+                       "action_string":best_proposal,
+                       "search_depth":0,
+                       "search_stats":[]}
     
     return output_summary
 
+# the expensive and deterministic part of find_best_proposal
+# the random choice between the best proposals is left to choose_best_proposal
+def score_proposals(current_string, n_players, max_word_len, words_set, letters, use_metagame_strat = False, index = None, pool = None, 
+                    deadline = None, search_depth = 2, search_stats = None, suffix_automaton = None):
+    """
+    deadline: float or None. A time.perf_counter() value to return by (anytime search)
+                        Proposals are scored until then (at least one with basis words), and the metagame ratios
+                        are dropped if they aren't all done by then
+    search_depth: int. Plies the metagame ratios look ahead (see compute_lookahead_ratios_from_masks), only used with an index
+                        Depths 3 and more are searched one after the other, the deepest one finished by the deadline is kept
+    search_stats: list or None. If given, a dict {"depth", "n_nodes", "seconds"} is appended for every depth finished
+    suffix_automaton: BidirectionalAutomaton or None. If given, proposals without basis words are pruned before any scoring
+                        (see generate_proposal_strings). The scores are the same
+    
+    returns:
+        scores: dict. json serializable, so it can be kept in a TranspositionCache. It contains the following:
+            "basis_word_ratios": dict. The basis word ratio of every proposal with basis words
+            "stall_proposal": str or None. The best stall, if all basis word ratios are 0
+            "nohalt_intersection_ratios": dict or None. The metagame ratios, if no sure win was found and use_metagame_strat is True
+            "depth": int. Number of plies the scores look ahead, 1 for the basis word ratios and 2 or more for the metagame ratios
+                        0 if the deadline passed before every proposal got a basis word ratio
+    """
+    
+    start_time = time.perf_counter()
+    
+    # getting the basis words per proposal based on our current string
+    # calculate the basis word ratio metric
+    # given a proposal string, this is the proportion of basis words that are nonhalting
+    if (index is not None) and (not use_metagame_strat):
+        # NOTE: the ratios only need counts, the masks are only built for the metagame ratios
+        basis_word_counts, is_complete = get_basis_word_counts(current_string, n_players, words_set, letters, index, deadline, 
+                                                               suffix_automaton)
+        basis_word_ratios = {proposal:(n_basis_words - n_halt_basis_words)/n_basis_words 
+                             for proposal, (n_basis_words, n_halt_basis_words, _) in basis_word_counts.items()}
+    elif index is not None:
+        proposals, universe_word_ids, basis_masks, halt_masks, is_complete = get_basis_word_masks(current_string, n_players, words_set, letters, 
+                                                                                                 index, pool, deadline, suffix_automaton)
+        basis_word_ratios = compute_basis_word_ratios_from_masks(proposals, basis_masks, halt_masks)
+    else:
+        basis_words_per_proposal, basis_words_nohalt_per_proposal = get_basis_words(current_string, n_players, max_word_len, words_set, letters, 
+                                                                                    suffix_automaton = suffix_automaton)
+        basis_word_ratios = compute_basis_word_ratios(basis_words_per_proposal, basis_words_nohalt_per_proposal)
+        is_complete = True
+    
+    # NOTE: this is the ratio optimize_ratio will find whatever proposal it picks
+    best_ratio = max(basis_word_ratios.values()) if basis_word_ratios else 1
+    
+    stall_proposal = None
+    nohalt_intersection_ratios = None
+    # NOTE: the depth of the strategy, unless the search runs out of time
+    if not use_metagame_strat:
+        search_depth = 1
+    elif index is None:
+        search_depth = 2
+    depth = search_depth
+    
+    if not is_complete:
+        # out of time, the best of the proposals scored so far
+        depth = 0
+    elif search_stats is not None:
+        search_stats.append({"depth":1, "n_nodes":1, "seconds":time.perf_counter() - start_time})
+    
+    # stalling scenario
+    # hope that a player makes a mistake along the way
+    if best_ratio == 0:
+        if (index is not None) and (not use_metagame_strat):
+            stall_proposal = select_best_stall({proposal:n_basis_word_letters/n_basis_words 
+                                                for proposal, (n_basis_words, _, n_basis_word_letters) in basis_word_counts.items()})
+        elif index is not None:
+            stall_proposal = optimize_stall_from_masks(proposals, universe_word_ids, basis_masks, index.word_lens)
+        else:
+            stall_proposal = optimize_stall(basis_words_per_proposal)
+        
+    # if no sure scenario found, can use a metagame strategy
+    elif (best_ratio != 1) and use_metagame_strat and is_complete:
+        
+        if index is not None:
+            start_time = time.perf_counter()
+            # NOTE: shared with the deeper searches, they look up the basis words of the same strings
+            basis_word_columns_cache = {}
+            nohalt_intersection_ratios = compute_nohalt_intersection_ratios_from_masks(proposals, universe_word_ids, basis_masks, halt_masks, 
+                                                                   n_players, words_set, letters, index, pool, deadline, 
+                                                                   basis_word_columns_cache, suffix_automaton)
+            if nohalt_intersection_ratios is None:
+                # out of time, fall back to the basis word ratios
+                depth = 1
+            elif search_stats is not None:
+                search_stats.append({"depth":2, "n_nodes":1 + len(proposals), "seconds":time.perf_counter() - start_time})
+            
+            # iterative deepening, keep the deepest search that finishes in time
+            for lookahead_depth in range(3, search_depth + 1):
+                if nohalt_intersection_ratios is None:
+                    break
+                start_time = time.perf_counter()
+                try:
+                    lookahead_ratios, n_nodes = compute_lookahead_ratios_from_masks(proposals, universe_word_ids, basis_masks, halt_masks, 
+                                                                                    n_players, words_set, letters, index, lookahead_depth, 
+                                                                                    deadline, basis_word_columns_cache, suffix_automaton)
+                except SearchTimeout:
+                    depth = lookahead_depth - 1
+                    break
+                nohalt_intersection_ratios = lookahead_ratios
+                if search_stats is not None:
+                    search_stats.append({"depth":lookahead_depth, "n_nodes":n_nodes, "seconds":time.perf_counter() - start_time})
+        elif is_past_deadline(deadline):
+            depth = 1
+        else:
+            nohalt_intersection_ratios = compute_nohalt_intersection_ratios(basis_words_per_proposal, basis_words_nohalt_per_proposal, 
+                                                                   n_players, max_word_len, words_set, letters, 
+                                                                   suffix_automaton = suffix_automaton)
+    
+    scores = {"basis_word_ratios":basis_word_ratios,
+              "stall_proposal":stall_proposal,
+              "nohalt_intersection_ratios":nohalt_intersection_ratios,
+              "depth":depth}
+    
+    return scores
+
+def choose_best_proposal(scores, verbose = VERBOSE):
+    
+    # find best proposal based which has the highest basis word ratio
+    best_proposal, best_ratio = optimize_ratio(scores["basis_word_ratios"], verbose = verbose)
+    
+    if best_ratio == 0:
+        best_proposal = scores["stall_proposal"]
+    elif scores["nohalt_intersection_ratios"]:
+        best_proposal, best_ratio = optimize_ratio(scores["nohalt_intersection_ratios"], verbose = verbose)
+    
+    return best_proposal, best_ratio
+
+# basis words and nonhalt basis words of a single proposal
+def get_proposal_basis_words(current_string, proposal, n_players, max_word_len, words_set, index = None):
+    if index is not None:
+        basis_word_ids, basis_word_ids_nohalt = get_proposal_basis_word_ids(proposal, len(current_string) + 2, 
+                                                                            len(current_string) + n_players + 1, index)
+        return index.words_of(basis_word_ids), index.words_of(basis_word_ids_nohalt)
+    
+    # same basis words and halt words as in get_basis_words
+    basis_words, halt_words = get_length_filtered_words(current_string, n_players, words_set)
+    basis_words_per_proposal, basis_words_nohalt_per_proposal = get_basis_words_per_proposal([proposal], halt_words, basis_words, max_word_len)
+    
+    return basis_words_per_proposal.get(proposal, set()), basis_words_nohalt_per_proposal.get(proposal, set())
+
 # this is our main function
 
 def find_best_proposal(current_string, n_players, max_word_len, words_set, letters, use_metagame_strat = False, 
-                       verbose = VERBOSE):
+                       verbose = VERBOSE, index = None, cache = None, opening_book = None, pool = None, deadline = None, 
+                       search_depth = 2, suffix_automaton = None, with_basis_words = True):
     """
     arguments:
         current_string: str. The string handed to you when it's your turn
         n_players: int. The number of Wordn't players
         max_word_len: int. The maximum length of the words in the word list
-        words_set: set. A set version of the wordlist (i.e. set(words))
+        words_set: set. A set version of the wordlist (i.e. set(words)). With an index it is only checked for membership,
+                        so the lexicon's CompactWords work too
         letters: str. A string containing the possible letters (i.e. 'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
         use_metagame_strat: bool. True if employing metagame strategy (i.e. guessing your opponent's strategy)
                         Current strategy used is assuming next player won't choose a proposal with halting words 
                         See the compute_nohalt_intersection_ratios for the metagame strategy
         verbose: bool. Will print proposal finding results if True
+        index: SubstringIndex or None. Precomputed substring index of the word list (see substring_index.py)
+                        If given, basis words and the metagame strategy are computed on word IDs from it instead of scanning words_set
+                        Without it, the aho-corasick fallback scans words_set (2-ply metagame only, no pool)
+        cache: TranspositionCache or None. Scores of previously seen strings (see transposition_cache.py)
+                        If given, the proposals are only scored once per string, only the random tie-break is redone
+        opening_book: OpeningBook or None. Precomputed scores of the first plies (see opening_book.py)
+                        If it has the current string, its scores are used. This also replaces the hardcoded first turn
+        pool: ProposalPool or None. Worker processes to score the proposals in parallel (see parallel_scoring.py)
+                        Only used with an index. Gives the same scores as the serial computation
+        deadline: float or None. A time.perf_counter() value to return by (anytime search)
+                        Returns the best proposal found by then, see score_proposals
+        search_depth: int. Plies the metagame strategy looks ahead, 2 is the next player only (see compute_lookahead_ratios_from_masks)
+                        Only used with an index
+        suffix_automaton: BidirectionalAutomaton or None. Suffix automata of the word list (see suffix_automaton.py)
+                        If given, proposals without basis words are pruned before they are scored. Gives the same scores
+        with_basis_words: bool. If False, the basis words of the best proposal aren't listed (they are None in the output summary)
+                        Scoring only counts basis words, so this skips the only lists of words of the move
         
     returns:
         output_summary: dict. dictionary containing all the outputs needed. It contains the following:
             "best_proposal": str or None. The best found proposal for the current_string
             "best_ratio": float or None. The basis word ratio of the best found proposal
             "best_proposal_basis_words": set or None. The list of basis words corresponding to the best_proposal
+            "search_depth": int. Number of plies the scores looked ahead, 0 if there was no search (first turn or challenge)
+            "search_stats": list. {"depth", "n_nodes", "seconds"} of every depth searched, empty if there was no search
             
             "action_type": str. A requirement of the Wordn't Agent. Refer to Wordn't Agent docstring
             "action_str": str or None. A requirement of the Wordn't Agent. Refer to Wordn't Agent docstring
     """
     
-    if current_string == "":
+    strategy = "metagame" if use_metagame_strat else "ratio"
+    if (index is None) or (not use_metagame_strat):
+        search_depth = 2 if use_metagame_strat else 1
+    elif search_depth != 2:
+        # NOTE: scores of other depths are kept apart, the opening books only have depth 2
+        strategy = "metagame_{}".format(search_depth)
+    
+    # look for scores that were already computed
+    scores = opening_book.get(n_players, strategy, current_string) if opening_book is not None else None
+    if (scores is None) and (cache is not None):
+        scores = cache.get(n_players, strategy, current_string)
+    
+    if (current_string == "") and (scores is None):
         # hardcoded first turn so no more waiting time
-        output_summary = quick_first_turn(n_players, words_set, use_metagame_strat)
-        return output_summary
+        output_summary = quick_first_turn(n_players, words_set, use_metagame_strat, index = index, with_basis_words = with_basis_words, 
+                                          letters = letters)
+        # NOTE: with another alphabet, the empty string may have to be scored like any other
+        if output_summary is not None:
+            return output_summary
         
     # challenge if word already exists
     if current_string in words_set:
@@ -455,37 +1159,31 @@ def find_best_proposal(current_string, n_players, max_word_len, words_set, lette
                        "best_proposal_basis_words":None,
                         "best_proposal_basis_words_nohalt":None,
                        "action_type":"challenge_is_word",
-                       "action_string":None}    
+                       "action_string":None,
+                       "search_depth":0,
+                       "search_stats":[]}    
         
         return output_summary
     
-    # getting the basis words per proposal based on our current string
-    basis_words_per_proposal, basis_words_nohalt_per_proposal = get_basis_words(current_string, n_players, max_word_len, words_set, letters)
+    search_stats = []
+    if scores is None:
+        scores = score_proposals(current_string, n_players, max_word_len, words_set, letters, use_metagame_strat, index, pool, deadline, 
+                                 search_depth, search_stats, suffix_automaton)
+        # NOTE: scores cut short by the deadline aren't kept, the next search of this string may get deeper
+        if (cache is not None) and (scores["depth"] == search_depth):
+            cache.put(n_players, strategy, current_string, scores)
     
-    # calculate the basis word ratio metric
-    # given a proposal string, this is the proportion of basis words that are nonhalting
-    basis_word_ratios = compute_basis_word_ratios(basis_words_per_proposal, basis_words_nohalt_per_proposal)
- 
-    # find best proposal based which has the highest basis word ratio
-    best_proposal, best_ratio = optimize_ratio(basis_word_ratios, verbose = verbose)
-    
-    # stalling scenario
-    # hope that a player makes a mistake along the way
-    if best_ratio == 0:
-        best_proposal = optimize_stall(basis_words_per_proposal)
-        
-    # if no sure scenario found, can use a metagame strategy
-    elif (best_ratio != 1) and use_metagame_strat:
-        
-        nohalt_intersection_ratios = compute_nohalt_intersection_ratios(basis_words_per_proposal, basis_words_nohalt_per_proposal, 
-                                                                   n_players, max_word_len, words_set, letters)
-        if nohalt_intersection_ratios:
-            best_proposal, best_ratio = optimize_ratio(nohalt_intersection_ratios, verbose = verbose)
+    best_proposal, best_ratio = choose_best_proposal(scores, verbose = verbose)
 
     # challenge scenario
     # either you're dealt with an instant lose hand or the current_string is illegal
     if best_proposal is None:
-        best_ratio, best_proposal_basis_words = confirm_challenge_no_word_scenario(current_string, words_set)
+        if with_basis_words or (index is None):
+            best_ratio, best_proposal_basis_words = confirm_challenge_no_word_scenario(current_string, words_set, index)
+        else:
+            # same ratio as confirm_challenge_no_word_scenario
+            start, end = index.suffix_range(current_string)
+            best_ratio, best_proposal_basis_words = (0 if end > start else None), None
         best_proposal_basis_words_nohalt = None
         
         # wordnt bot requirements
@@ -493,8 +1191,12 @@ def find_best_proposal(current_string, n_players, max_word_len, words_set, lette
         action_string = None
     else:
         # keep the basis words in case you get challenged
-        best_proposal_basis_words = basis_words_per_proposal[best_proposal]
-        best_proposal_basis_words_nohalt = basis_words_nohalt_per_proposal[best_proposal]
+        # NOTE: they are only listed for the best proposal, scoring only needs their counts
+        if with_basis_words:
+            best_proposal_basis_words, best_proposal_basis_words_nohalt = get_proposal_basis_words(current_string, best_proposal, n_players, 
+                                                                                                   max_word_len, words_set, index)
+        else:
+            best_proposal_basis_words, best_proposal_basis_words_nohalt = None, None
         
         # wordnt bot requirements
         action_type, action_string = get_wordnt_action(current_string, best_proposal)
@@ -504,6 +1206,8 @@ def find_best_proposal(current_string, n_players, max_word_len, words_set, lette
                        "best_proposal_basis_words":best_proposal_basis_words,
                        "best_proposal_basis_words_nohalt":best_proposal_basis_words_nohalt,
                        "action_type":action_type,
-                       "action_string":action_string}
+                       "action_string":action_string,
+                       "search_depth":scores.get("depth", search_depth),
+                       "search_stats":search_stats}
     
-    return output_summary
\ No newline at end of file
+    return output_summary
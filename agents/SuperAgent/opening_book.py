@@ -0,0 +1,104 @@
+import os
+import gzip
+import json
+from .best_proposal_finder import score_proposals, generate_proposal_strings
+
+DEFAULT_OPENING_BOOK_DIR = "./data/opening_books"
+
+# books that were already loaded in this process, keyed by absolute path of the book file
+_OPENING_BOOK_CACHE = {}
+
+class OpeningBook:
+    '''
+    Precomputed scores of find_best_proposal for the first plies of a game,
+    for one lexicon, one number of players and one strategy.
+    Entries map a current string to the output of score_proposals.
+    '''
+
+    def __init__(self, digest, n_players, strategy, n_plies, entries):
+        self.digest = digest
+        self.n_players = n_players
+        self.strategy = strategy
+        self.n_plies = n_plies
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return "OpeningBook({} players, {}, {} plies, {} strings)".format(self.n_players, self.strategy, self.n_plies, len(self.entries))
+
+    def get(self, n_players, strategy, current_string):
+        '''
+        Same interface as TranspositionCache.get
+        '''
+        if (n_players != self.n_players) or (strategy != self.strategy):
+            return None
+        return self.entries.get(current_string)
+
+    def save(self, book_file):
+        os.makedirs(os.path.dirname(book_file) or ".", exist_ok = True)
+        with gzip.open(book_file, "wt") as f:
+            json.dump({"digest": self.digest,
+                       "n_players": self.n_players,
+                       "strategy": self.strategy,
+                       "n_plies": self.n_plies,
+                       "entries": self.entries}, f, separators = (",", ":"))
+
+    @classmethod
+    def load(cls, book_file):
+        with gzip.open(book_file, "rt") as f:
+            book = json.load(f)
+        return cls(book["digest"], book["n_players"], book["strategy"], book["n_plies"], book["entries"])
+
+def get_opening_book_file(book_dir, n_players, strategy):
+    return os.path.join(book_dir, "{}_players_{}.json.gz".format(n_players, strategy))
+
+def build_opening_book(lexicon, index, n_players, use_metagame_strat, n_plies, verbose = False):
+    '''
+    Score every string that can be handed to a player in the first n_plies plies of a game.
+    The empty string is ply 1, strings of one letter are ply 2, and so on.
+    '''
+    strategy = "metagame" if use_metagame_strat else "ratio"
+    entries = {}
+
+    strings = [""]
+    for ply in range(n_plies):
+        next_strings = set()
+        for current_string in strings:
+            # NOTE: no scores needed when the string is already a word, the agent just challenges
+            if current_string in lexicon.words_set:
+                continue
+
+            entries[current_string] = score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words_set, lexicon.letters,
+                                                      use_metagame_strat, index)
+
+            # the next player can be handed any proposal that is still a substring of a word
+            for proposal in generate_proposal_strings(current_string, lexicon.letters):
+                start, end = index.suffix_range(proposal)
+                if end > start:
+                    next_strings.add(proposal)
+
+        if verbose:
+            print("ply {}: {} strings, {} scored so far".format(ply + 1, len(strings), len(entries)))
+        strings = sorted(next_strings)
+
+    return OpeningBook(lexicon.digest, n_players, strategy, n_plies, entries)
+
+def load_opening_book(lexicon, n_players, strategy, book_dir = DEFAULT_OPENING_BOOK_DIR):
+    '''
+    Load the opening book for this lexicon, number of players and strategy, or None if there is none.
+    '''
+    book_file = os.path.abspath(get_opening_book_file(book_dir, n_players, strategy))
+    if book_file in _OPENING_BOOK_CACHE:
+        book = _OPENING_BOOK_CACHE[book_file]
+    elif os.path.exists(book_file):
+        book = OpeningBook.load(book_file)
+        _OPENING_BOOK_CACHE[book_file] = book
+    else:
+        return None
+
+    if book.digest != lexicon.digest:
+        # NOTE: book was built for another word list
+        return None
+    return book
@@ -0,0 +1,98 @@
+import time
+import atexit
+import multiprocessing
+import numpy as np
+from .best_proposal_finder import get_proposal_halt_basis_word_ids, get_proposal_basis_word_ids, compute_proposal_nohalt_intersection_ratio
+
+# pools that were already started in this process, keyed by (lexicon digest, n_workers)
+_PROPOSAL_POOLS = {}
+
+# lexicon and index of a worker process, set once by _init_worker
+_WORKER_STATE = {}
+
+def _init_worker(lexicon, index):
+    _WORKER_STATE["lexicon"] = lexicon
+    _WORKER_STATE["index"] = index
+
+def _halt_basis_word_ids_task(args):
+    proposal, min_basis_word_len, halt_modulus = args
+    return get_proposal_halt_basis_word_ids(proposal, min_basis_word_len, halt_modulus, _WORKER_STATE["index"])
+
+def _nohalt_intersection_ratio_task(args):
+    proposal, n_players, letters = args
+    # NOTE: only membership checks of the generated proposals, the hashed CompactWords are enough
+    words_set = _WORKER_STATE["lexicon"].words
+    index = _WORKER_STATE["index"]
+    
+    # columns of the proposal's masks, and its nonhalt basis words, as in get_basis_word_masks(current_string, ...)
+    universe_word_ids = index.word_ids(proposal)
+    _, nohalt_basis_word_ids = get_proposal_basis_word_ids(proposal, len(proposal) + 1, len(proposal) + n_players, index)
+    basis_mask_nohalt = np.zeros(universe_word_ids.size, dtype = bool)
+    basis_mask_nohalt[np.searchsorted(universe_word_ids, nohalt_basis_word_ids)] = True
+    
+    return compute_proposal_nohalt_intersection_ratio(proposal, universe_word_ids, basis_mask_nohalt, n_players, words_set, letters, index)
+
+class ProposalPool:
+    '''
+    Worker processes that score the proposals of find_best_proposal in parallel.
+    Every worker holds the same read-only lexicon and substring index, only proposal strings
+    and word IDs are sent between processes. Results come back in proposal order,
+    so the scores are the same as the serial computation.
+    '''
+
+    def __init__(self, lexicon, index, n_workers):
+        self.digest = lexicon.digest
+        self.n_workers = n_workers
+        if "fork" in multiprocessing.get_all_start_methods():
+            # NOTE: with fork the workers share the parent's lexicon and index pages, nothing is pickled
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        # NOTE: the workers check the proposals they generate against the words, hash them once here instead of once per worker
+        lexicon.words.build_hash_table()
+        self._pool = context.Pool(n_workers, initializer = _init_worker, initargs = (lexicon, index))
+
+    def __repr__(self):
+        return "ProposalPool({} workers)".format(self.n_workers)
+
+    def _chunksize(self, n_tasks):
+        # a few chunks per worker, the proposals don't all take the same time
+        return max(1, n_tasks//(4*self.n_workers))
+
+    def imap_halt_basis_word_ids(self, proposals, min_basis_word_len, halt_modulus):
+        '''
+        (basis word IDs, halting basis word IDs) of every proposal in order, see get_proposal_halt_basis_word_ids
+        Results are yielded as they come, so the caller can stop early.
+        '''
+        tasks = [(proposal, min_basis_word_len, halt_modulus) for proposal in proposals]
+        return self._pool.imap(_halt_basis_word_ids_task, tasks, chunksize = self._chunksize(len(tasks)))
+
+    def map_nohalt_intersection_ratios(self, proposals, n_players, letters, deadline = None):
+        '''
+        Metagame ratio (or None) of every proposal, see compute_proposal_nohalt_intersection_ratio
+        Returns None if the deadline (a time.perf_counter() value) passes first.
+        '''
+        tasks = [(proposal, n_players, letters) for proposal in proposals]
+        result = self._pool.map_async(_nohalt_intersection_ratio_task, tasks, chunksize = self._chunksize(len(tasks)))
+        # NOTE: tasks that are cut short keep their workers busy until they are done, their results are dropped
+        result.wait(None if deadline is None else max(0, deadline - time.perf_counter()))
+        if not result.ready():
+            return None
+        return result.get()
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+def load_proposal_pool(lexicon, index, n_workers):
+    '''
+    Get a pool of n_workers scoring processes for a lexicon, starting it at most once per process
+    so that all the agents of a process share it. Pools are closed when the process exits.
+    '''
+    key = (lexicon.digest, n_workers)
+    pool = _PROPOSAL_POOLS.get(key)
+    if pool is None:
+        pool = ProposalPool(lexicon, index, n_workers)
+        atexit.register(pool.close)
+        _PROPOSAL_POOLS[key] = pool
+    return pool
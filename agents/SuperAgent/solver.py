@@ -0,0 +1,151 @@
+import os
+import json
+import numpy as np
+
+DEFAULT_SOLVED_TABLE_DIR = "./data/solved_tables"
+
+# tables that were already solved or loaded in this process, keyed by (lexicon digest, n_players)
+_SOLVED_TABLE_CACHE = {}
+
+class SolvedTable:
+    '''
+    Exact solution of Wordn't for one lexicon and one number of players.
+
+    A state is the current string plus the turn offset d of the player to move,
+    relative to a player P (d = 0 means P is to move). Every other player is assumed
+    to play against P, so P "wins" a state if it can make sure that somebody else loses.
+    Under perfect play a player only hands over strings that are substrings of a word but not words,
+    and the player who can't do that loses. So for every such string S:
+        P wins (S, 0) if any extension of S is a win for P at offset 1
+        P wins (S, d) for d != 0 if all extensions of S are wins for P at offset d + 1 (mod n_players)
+    For two players this is the exact game value.
+
+    Results are stored as one bitmask per string (bit d set if P wins at offset d),
+    in arrays of fixed width byte strings sorted per string length.
+    '''
+
+    def __init__(self, digest, n_players, strings_per_len, masks_per_len):
+        self.digest = digest
+        self.n_players = n_players
+        self._strings_per_len = strings_per_len
+        self._masks_per_len = masks_per_len
+
+    def __len__(self):
+        return sum(len(strings) for strings in self._strings_per_len.values())
+
+    def __repr__(self):
+        return "SolvedTable({} players, {} strings)".format(self.n_players, len(self))
+
+    @property
+    def nbytes(self):
+        return sum(self._strings_per_len[length].nbytes + self._masks_per_len[length].nbytes for length in self._strings_per_len)
+
+    @classmethod
+    def solve(cls, lexicon, n_players):
+        words_set = lexicon.words_set
+        # bit 0 is an "any" over extensions, the other bits are an "all" over extensions
+        no_extension_mask = ((1 << n_players) - 1) & ~1
+
+        strings_per_len = {}
+        masks_per_len = {}
+
+        # the extensions of a string are one letter longer, so solve the longest strings first
+        extension_masks = {}
+        for length in range(lexicon.max_word_len, -1, -1):
+            substrings = {word[i:i + length] for word_len, words in lexicon.words_by_len.items() if word_len >= length
+                          for word in words for i in range(word_len - length + 1)}
+            masks = {string:no_extension_mask for string in substrings if string not in words_set}
+
+            for extension, extension_mask in extension_masks.items():
+                # bit d of the rotated mask is bit d + 1 of the extension's mask
+                rotated_mask = (extension_mask >> 1) | ((extension_mask & 1) << (n_players - 1))
+                for string in (extension[1:], extension[:-1]):
+                    if string in masks:
+                        masks[string] = (masks[string] | (rotated_mask & 1)) & (rotated_mask | 1)
+
+            strings = sorted(masks)
+            # NOTE: utf-8 takes more than a byte for letters outside of ASCII, the width is the longest encoding
+            strings_bytes = [string.encode() for string in strings]
+            strings_per_len[length] = np.array(strings_bytes, dtype = "S{}".format(max(map(len, strings_bytes), default = 1) or 1))
+            masks_per_len[length] = np.array([masks[string] for string in strings], dtype = np.uint16)
+            extension_masks = masks
+
+        return cls(lexicon.digest, n_players, strings_per_len, masks_per_len)
+
+    def save(self, table_file):
+        os.makedirs(os.path.dirname(table_file) or ".", exist_ok = True)
+        arrays = {}
+        for length in self._strings_per_len:
+            arrays["strings_{}".format(length)] = self._strings_per_len[length]
+            arrays["masks_{}".format(length)] = self._masks_per_len[length]
+        meta = json.dumps({"digest": self.digest, "n_players": self.n_players})
+        np.savez_compressed(table_file, meta = np.array(meta), **arrays)
+
+    @classmethod
+    def load(cls, table_file):
+        with np.load(table_file) as data:
+            meta = json.loads(str(data["meta"]))
+            lengths = [int(key.split("_")[1]) for key in data.files if key.startswith("strings_")]
+            strings_per_len = {length:data["strings_{}".format(length)] for length in lengths}
+            masks_per_len = {length:data["masks_{}".format(length)] for length in lengths}
+        return cls(meta["digest"], meta["n_players"], strings_per_len, masks_per_len)
+
+    def get_mask(self, string):
+        '''
+        Bitmask of the turn offsets where P wins when handed string,
+        or None if string is a word or not a substring of any word.
+        '''
+        strings = self._strings_per_len.get(len(string))
+        if strings is None:
+            return None
+        key = string.encode()
+        i = np.searchsorted(strings, key)
+        if (i < len(strings)) and (strings[i] == key):
+            return int(self._masks_per_len[len(string)][i])
+        return None
+
+    def is_win(self, string, turn_offset = 0):
+        '''
+        True if P wins when string is handed to the player turn_offset turns after P.
+        '''
+        mask = self.get_mask(string)
+        if mask is None:
+            return None
+        return bool((mask >> (turn_offset % self.n_players)) & 1)
+
+    def winning_proposals(self, current_string, letters):
+        '''
+        Proposals that make sure the player to move doesn't lose.
+        '''
+        winning_proposals = []
+        proposals = [letter + current_string for letter in letters] + [current_string + letter for letter in letters]
+        for proposal in set(proposals):
+            if self.is_win(proposal, 1):
+                winning_proposals.append(proposal)
+        return winning_proposals
+
+def get_solved_table_file(table_dir, n_players):
+    return os.path.join(table_dir, "{}_players.npz".format(n_players))
+
+def load_solved_table(lexicon, n_players, table_dir = DEFAULT_SOLVED_TABLE_DIR):
+    '''
+    Get the solved table of a lexicon and number of players, solving it at most once per process.
+    If table_dir holds a table of this lexicon (see solve_game.py) it is loaded, otherwise the game is solved in memory.
+    '''
+    key = (lexicon.digest, n_players)
+    table = _SOLVED_TABLE_CACHE.get(key)
+    if table is not None:
+        return table
+
+    table_file = get_solved_table_file(table_dir, n_players)
+    if os.path.exists(table_file):
+        table = SolvedTable.load(table_file)
+        if table.digest != lexicon.digest:
+            # NOTE: table was solved for another word list
+            table = None
+
+    if table is None:
+        table = SolvedTable.solve(lexicon, n_players)
+
+    _SOLVED_TABLE_CACHE[key] = table
+    return table
@@ -0,0 +1,301 @@
+import os
+import bisect
+import json
+import random
+import numpy as np
+
+DEFAULT_INDEX_DIR = "./data/substring_index"
+
+# indexes that were already loaded in this process, keyed by lexicon digest
+_INDEX_CACHE = {}
+
+# longest words the word length masks can hold, bit k of a uint64 is length k
+MAX_MASK_WORD_LEN = 63
+
+class SubstringIndex:
+    '''
+    Maps every substring that occurs in the lexicon to the IDs of the words containing it.
+    Word IDs are positions in lexicon.words.
+
+    The postings are stored as a suffix array over the words: one entry (word ID, offset) per suffix,
+    sorted by suffix. The entries of all suffixes starting with a substring are contiguous,
+    so the postings of any substring are a slice found by binary search.
+
+    It also has a table of the words inside the words, aligned with the bytes of the words buffer:
+    bit k of word_start_len_masks[i] (word_end_len_masks[i]) is set if the k letters starting (ending) at byte i are a word.
+    So which words start or end at an occurrence of a substring, and at which lengths, are read at the suffix array entries
+    of the substring without looking at any letters.
+    A lexicon with words longer than MAX_MASK_WORD_LEN has no such table, the contained words are then looked up in the buffer.
+
+    All the arrays are plain integer arrays and are memory-mapped when loaded from disk.
+    '''
+
+    def __init__(self, words, suffix_word_ids, suffix_offsets, digest = None, word_start_len_masks = None, word_end_len_masks = None):
+        # words are the lexicon's CompactWords, suffixes are compared as bytes of its buffer
+        self.words = words
+        # NOTE: plain ndarray views of memory-mapped arrays, np.memmap indexing is slow in the binary searches
+        self._suffix_word_ids = np.asarray(suffix_word_ids)
+        self._suffix_offsets = np.asarray(suffix_offsets)
+        self.word_lens = words.lens
+        self.max_word_len = int(words.lens.max()) if len(words) else 0
+        self.digest = digest
+        if ((word_start_len_masks is None) or (word_end_len_masks is None)) and (self.max_word_len <= MAX_MASK_WORD_LEN):
+            word_start_len_masks, word_end_len_masks = make_word_len_masks(words)
+        self._word_start_len_masks = None if word_start_len_masks is None else np.asarray(word_start_len_masks)
+        self._word_end_len_masks = None if word_end_len_masks is None else np.asarray(word_end_len_masks)
+        self._buffer_bytes = np.frombuffer(words.buffer, dtype = np.uint8)
+        # NOTE: memoryview indexing returns python ints, much faster than numpy scalars in the binary searches
+        self._suffix_word_ids_view = memoryview(self._suffix_word_ids)
+        self._suffix_offsets_view = memoryview(self._suffix_offsets)
+        self._word_starts_view = memoryview(words.starts)
+        # the basis word and halt word lookups of a proposal search the same substring several times in a row
+        self._last_suffix_range = (None, 0, 0)
+        # words of every length as fixed width byte strings, only used without the word length masks
+        self._length_words = {}
+
+    def __len__(self):
+        return len(self._suffix_word_ids)
+
+    @classmethod
+    def build(cls, lexicon):
+        words = lexicon.words
+        word_lens = words.lens
+
+        suffix_word_ids = np.repeat(np.arange(len(words), dtype = np.uint32), word_lens)
+        word_starts = np.repeat(np.cumsum(word_lens, dtype = np.int64) - word_lens, word_lens)
+        # NOTE: one byte per offset unless a word has 256 letters or more, offset + substring length never wraps around either
+        suffix_offsets = (np.arange(len(suffix_word_ids), dtype = np.int64) - word_starts).astype(np.min_scalar_type(lexicon.max_word_len))
+
+        # NOTE: fixed width byte strings are zero padded, so shorter suffixes sort first like str comparison
+        words_bytes = bytes(words.buffer).split(b"\n") if len(words) else []
+        suffixes = np.array([word_bytes[i:] for word_bytes in words_bytes for i in range(len(word_bytes))], 
+                            dtype = "S{}".format(max(lexicon.max_word_len, 1)))
+        order = np.argsort(suffixes, kind = "stable")
+
+        return cls(words, suffix_word_ids[order], suffix_offsets[order], lexicon.digest)
+
+    def save(self, index_dir):
+        os.makedirs(index_dir, exist_ok = True)
+        np.save(os.path.join(index_dir, "suffix_word_ids.npy"), self._suffix_word_ids)
+        np.save(os.path.join(index_dir, "suffix_offsets.npy"), self._suffix_offsets)
+        for name, word_len_masks in [("word_start_len_masks.npy", self._word_start_len_masks), 
+                                     ("word_end_len_masks.npy", self._word_end_len_masks)]:
+            if word_len_masks is not None:
+                np.save(os.path.join(index_dir, name), word_len_masks)
+            elif os.path.exists(os.path.join(index_dir, name)):
+                # NOTE: masks of an index saved there before would be loaded with this one
+                os.remove(os.path.join(index_dir, name))
+        with open(os.path.join(index_dir, "meta.json"), "w") as f:
+            json.dump({"digest": self.digest, "n_words": len(self.words)}, f)
+
+    @classmethod
+    def load(cls, index_dir, lexicon, mmap = True):
+        with open(os.path.join(index_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta["digest"] != lexicon.digest:
+            raise ValueError("index at {} was built for a different lexicon".format(index_dir))
+
+        mmap_mode = "r" if mmap else None
+        suffix_word_ids = np.load(os.path.join(index_dir, "suffix_word_ids.npy"), mmap_mode = mmap_mode)
+        suffix_offsets = np.load(os.path.join(index_dir, "suffix_offsets.npy"), mmap_mode = mmap_mode)
+        # NOTE: indexes saved before the word length masks existed get them built in memory
+        word_len_masks = [np.load(os.path.join(index_dir, name), mmap_mode = mmap_mode) 
+                          if os.path.exists(os.path.join(index_dir, name)) else None
+                          for name in ["word_start_len_masks.npy", "word_end_len_masks.npy"]]
+        return cls(lexicon.words, suffix_word_ids, suffix_offsets, lexicon.digest, *word_len_masks)
+
+    def _suffix_prefix(self, i, n):
+        # first n bytes of suffix i, followed by the next word if the suffix is shorter
+        # NOTE: the newline between words sorts before any letter, so comparisons with a substring are the same as on str
+        start = self._word_starts_view[self._suffix_word_ids_view[i]] + self._suffix_offsets_view[i]
+        return self.words.buffer[start:start + n]
+
+    def suffix_range(self, substring, lo = 0, hi = None):
+        '''
+        Range of suffix array entries whose suffix starts with substring.
+        '''
+        is_full_range = (lo == 0) and (hi is None)
+        last_substring, last_start, last_end = self._last_suffix_range
+        if is_full_range and (last_substring == substring):
+            return last_start, last_end
+        
+        if hi is None:
+            hi = len(self._suffix_word_ids)
+        substring_bytes = self.words.codec.encode(substring)
+        n = len(substring_bytes)
+        key = lambda i: self._suffix_prefix(i, n)
+        start = bisect.bisect_left(range(hi), substring_bytes, lo = lo, key = key)
+        end = bisect.bisect_right(range(hi), substring_bytes, lo = start, key = key)
+        
+        if is_full_range:
+            self._last_suffix_range = (substring, start, end)
+        return start, end
+
+    def word_ids(self, substring, min_len = None):
+        '''
+        Sorted IDs of the words containing substring, optionally only words with at least min_len letters.
+        '''
+        start, end = self.suffix_range(substring)
+        word_ids = np.unique(self._suffix_word_ids[start:end])
+        if min_len is not None:
+            word_ids = word_ids[self.word_lens[word_ids] >= min_len]
+        return word_ids
+
+    def prefix_word_ids(self, substring):
+        '''
+        Sorted IDs of the words starting with substring.
+        '''
+        start, end = self.suffix_range(substring)
+        # NOTE: a word has only one suffix at offset 0, so no duplicates
+        return np.sort(self._suffix_word_ids[start:end][self._suffix_offsets[start:end] == 0])
+
+    def suffix_word_ids(self, substring):
+        '''
+        Sorted IDs of the words ending with substring.
+        '''
+        start, end = self.suffix_range(substring)
+        word_ids = self._suffix_word_ids[start:end]
+        is_suffix = self._suffix_offsets[start:end] + len(substring) == self.word_lens[word_ids]
+        return np.sort(word_ids[is_suffix])
+
+    def adjacent_letters(self, substring):
+        '''
+        (letters right before substring, letters right after substring) in the words containing it, as sorted strings.
+        All of them are read from the bytes around the suffix array entries of substring, with one binary search.
+        '''
+        start, end = self.suffix_range(substring)
+        word_ids = self._suffix_word_ids[start:end]
+        offsets = self._suffix_offsets[start:end].astype(np.int64)
+        positions = self.words.starts[word_ids].astype(np.int64) + offsets
+        
+        left_letters = np.unique(self._buffer_bytes[positions[offsets > 0] - 1])
+        right_letters = np.unique(self._buffer_bytes[positions[offsets + len(substring) < self.word_lens[word_ids]] + len(substring)])
+        return self.words.codec.decode(left_letters.tobytes()), self.words.codec.decode(right_letters.tobytes())
+
+    def edge_word_ids_containing_words(self, substring, word_len_mask):
+        '''
+        Sorted IDs of the words that start with substring and contain a word starting at an occurrence of substring,
+        or that end with substring and contain a word ending at an occurrence of substring.
+        Only contained words whose length k has bit k set in word_len_mask count.
+        '''
+        start, end = self.suffix_range(substring)
+        word_ids = self._suffix_word_ids[start:end]
+        offsets = self._suffix_offsets[start:end].astype(np.int64)
+        positions = self.words.starts[word_ids].astype(np.int64) + offsets
+        
+        # the same word can contain substring several times, it is enough that one of the occurrences has a contained word
+        if self._word_start_len_masks is not None:
+            starts_word = (self._word_start_len_masks[positions] & word_len_mask) != 0
+            ends_word = (self._word_end_len_masks[positions + len(substring) - 1] & word_len_mask) != 0
+        else:
+            starts_word, ends_word = self._find_contained_words(word_ids, offsets, positions, len(substring), word_len_mask)
+        is_prefix = offsets == 0
+        is_suffix = offsets + len(substring) == self.word_lens[word_ids]
+        
+        return np.union1d(np.intersect1d(word_ids[starts_word], word_ids[is_prefix]),
+                          np.intersect1d(word_ids[ends_word], word_ids[is_suffix]))
+
+    def _find_contained_words(self, word_ids, offsets, positions, n, word_len_mask):
+        # same as reading the word length masks at the occurrences of a substring of n letters (see edge_word_ids_containing_words),
+        # but the contained words of every length in word_len_mask are looked up among the words of that length
+        letters_left = self.word_lens[word_ids].astype(np.int64) - offsets
+        starts_word = np.zeros(len(positions), dtype = bool)
+        ends_word = np.zeros(len(positions), dtype = bool)
+        for length in range(1, self.max_word_len + 1):
+            if not (word_len_mask >> length) & 1:
+                continue
+            fits = letters_left >= length
+            starts_word[fits] |= self._is_word_at(positions[fits], length)
+            fits = offsets + n >= length
+            ends_word[fits] |= self._is_word_at(positions[fits] + n - length, length)
+        return starts_word, ends_word
+
+    def _is_word_at(self, positions, length):
+        # if the length bytes at each position of the buffer are a word, positions must have length letters left in their word
+        length_words = self._length_words.get(length)
+        if length_words is None:
+            word_starts = self.words.starts[self.words.ids_of_len(length)].astype(np.int64)
+            length_words = self._buffer_bytes[word_starts[:, None] + np.arange(length)].view("S{}".format(length)).ravel()
+            self._length_words[length] = length_words
+        substrings = self._buffer_bytes[positions[:, None] + np.arange(length)].view("S{}".format(length)).ravel()
+        return np.isin(substrings, length_words)
+
+    def witness(self, substring, rng = random):
+        '''
+        A word containing substring, or None if there is none. Found with the binary search of suffix_range,
+        whatever the number of words containing substring.
+        The word is picked at random among the suffixes starting with substring, with rng (a random.Random or the random module).
+        '''
+        start, end = self.suffix_range(substring)
+        if start == end:
+            return None
+        return self.words[self._suffix_word_ids_view[rng.randrange(start, end)]]
+
+    def words_of(self, word_ids):
+        '''
+        Set of the words with the given IDs.
+        '''
+        return set(self.words.words_of(word_ids))
+
+    def words_containing(self, substring, min_len = None):
+        '''
+        Set of words containing substring, optionally only words with at least min_len letters.
+        '''
+        return self.words_of(self.word_ids(substring, min_len))
+
+def make_word_len_masks(words):
+    '''
+    (word_start_len_masks, word_end_len_masks) of CompactWords, see SubstringIndex.
+    Every length is done at once: the substrings of that length at every byte are looked up among the words of that length.
+    '''
+    buffer = np.frombuffer(words.buffer, dtype = np.uint8)
+    max_word_len = int(words.lens.max()) if len(words) else 0
+    if max_word_len > MAX_MASK_WORD_LEN:
+        raise ValueError("words of {} letters are too long for the word length masks (at most {})".format(max_word_len, MAX_MASK_WORD_LEN))
+    mask_dtype = next(dtype for dtype in [np.uint16, np.uint32, np.uint64] if max_word_len < np.iinfo(dtype).bits)
+    word_start_len_masks = np.zeros(len(buffer), dtype = mask_dtype)
+    word_end_len_masks = np.zeros(len(buffer), dtype = mask_dtype)
+    if max_word_len == 0:
+        return word_start_len_masks, word_end_len_masks
+    
+    word_starts = words.starts[:-1].astype(np.int64)
+    word_lens = words.lens.astype(np.int64)
+    # letters left in the word from every byte (0 on the newlines)
+    byte_word_ids = np.repeat(np.arange(len(words)), word_lens + 1)[:len(buffer)]
+    letters_left = word_starts[byte_word_ids] + word_lens[byte_word_ids] - np.arange(len(buffer))
+    padded_buffer = np.concatenate([buffer, np.zeros(max_word_len, dtype = np.uint8)])
+    
+    for length in range(1, max_word_len + 1):
+        word_ids = words.ids_of_len(length)
+        if word_ids.size == 0:
+            continue
+        length_words = padded_buffer[word_starts[word_ids, None] + np.arange(length)].view("S{}".format(length)).ravel()
+        positions = np.flatnonzero(letters_left >= length)
+        substrings = padded_buffer[positions[:, None] + np.arange(length)].view("S{}".format(length)).ravel()
+        positions = positions[np.isin(substrings, length_words)]
+        word_start_len_masks[positions] |= mask_dtype(1 << length)
+        word_end_len_masks[positions + length - 1] |= mask_dtype(1 << length)
+    
+    return word_start_len_masks, word_end_len_masks
+
+def load_substring_index(lexicon, index_dir = None):
+    '''
+    Get the substring index of a lexicon, building it at most once per process.
+    If index_dir holds an index of this lexicon (see build_substring_index.py) it is memory-mapped,
+    otherwise the index is built in memory.
+    '''
+    index = _INDEX_CACHE.get(lexicon.digest)
+    if index is not None:
+        return index
+
+    if (index_dir is not None) and os.path.exists(os.path.join(index_dir, "meta.json")):
+        try:
+            index = SubstringIndex.load(index_dir, lexicon)
+        except ValueError:
+            index = None
+
+    if index is None:
+        index = SubstringIndex.build(lexicon)
+
+    _INDEX_CACHE[lexicon.digest] = index
+    return index
@@ -0,0 +1,276 @@
+import os
+import json
+from array import array
+import numpy as np
+from lexicon import LetterCodec
+
+DEFAULT_AUTOMATON_DIR = "./data/suffix_automaton"
+
+# automata that were already loaded in this process, keyed by lexicon digest
+_AUTOMATON_CACHE = {}
+
+class SuffixAutomaton:
+    '''
+    Suffix automaton (DAWG) of a list of words (as bytes, see LetterCodec): every substring of a word is one path
+    from the initial state 0, one transition per letter byte, and substrings that occur at the same places end at the same state.
+    So a string occurs in some word if and only if its letters can be walked from state 0, in O(len(string)).
+
+    Every state also has the number of words containing its substrings, bucketed by word length
+    (sparse rows of (length, count) for the lengths that occur), so counts of words with a minimum length
+    or a length multiple of the halt modulus are read without listing the words.
+
+    Transitions and counts are stored as plain integer arrays in compressed rows and are memory-mapped when loaded from disk.
+    '''
+
+    _ARRAYS = ["transition_starts", "transition_letters", "transition_targets", "count_starts", "count_lens", "count_counts"]
+
+    def __init__(self, transition_starts, transition_letters, transition_targets, count_starts, count_lens, count_counts):
+        self.transition_starts = np.asarray(transition_starts)
+        self.transition_letters = np.asarray(transition_letters)
+        self.transition_targets = np.asarray(transition_targets)
+        self.count_starts = np.asarray(count_starts)
+        self.count_lens = np.asarray(count_lens)
+        self.count_counts = np.asarray(count_counts)
+        # NOTE: bytes.find and memoryview indexing work on python ints, much faster than numpy scalars in the walks
+        self._transition_starts = memoryview(self.transition_starts)
+        self._transition_letters = self.transition_letters.tobytes()
+        self._transition_targets = memoryview(self.transition_targets)
+        self._count_starts = memoryview(self.count_starts)
+        self._count_lens = memoryview(self.count_lens)
+        self._count_counts = memoryview(self.count_counts)
+
+    def __len__(self):
+        return len(self.transition_starts) - 1
+
+    def __repr__(self):
+        return "SuffixAutomaton({} states, {} transitions)".format(len(self), len(self.transition_targets))
+
+    @classmethod
+    def build(cls, words):
+        '''
+        Online construction of the automaton of all the words (generalized suffix automaton), then the counts:
+        every state reached by a prefix of a word and its suffix links are the substrings of the word, each counted once per word.
+        '''
+        transitions = [{}]
+        links = [-1]
+        lens = [0]
+
+        def add_state(length, link, state_transitions):
+            transitions.append(state_transitions)
+            links.append(link)
+            lens.append(length)
+            return len(lens) - 1
+
+        def clone_state(state, length):
+            clone = add_state(length, links[state], dict(transitions[state]))
+            links[state] = clone
+            return clone
+
+        def extend(last, letter):
+            state = transitions[last].get(letter)
+            if state is not None:
+                # the substring already occurs, split its state if it also ends elsewhere
+                if lens[state] == lens[last] + 1:
+                    return state
+                clone = clone_state(state, lens[last] + 1)
+                previous = last
+                while (previous != -1) and (transitions[previous].get(letter) == state):
+                    transitions[previous][letter] = clone
+                    previous = links[previous]
+                return clone
+
+            new_state = add_state(lens[last] + 1, 0, {})
+            previous = last
+            while (previous != -1) and (letter not in transitions[previous]):
+                transitions[previous][letter] = new_state
+                previous = links[previous]
+            if previous != -1:
+                state = transitions[previous][letter]
+                if lens[previous] + 1 == lens[state]:
+                    links[new_state] = state
+                else:
+                    clone = clone_state(state, lens[previous] + 1)
+                    while (previous != -1) and (transitions[previous].get(letter) == state):
+                        transitions[previous][letter] = clone
+                        previous = links[previous]
+                    links[new_state] = clone
+            return new_state
+
+        for word in words:
+            last = 0
+            for letter in word:
+                last = extend(last, letter)
+
+        # (state, word length) of every word containing every state, the word ID marks the states already counted
+        last_word_ids = [-1]*len(lens)
+        count_states = array("I")
+        count_word_lens = array("I")
+        for word_id, word in enumerate(words):
+            state = 0
+            for letter in word:
+                state = transitions[state][letter]
+                suffix_state = state
+                while (suffix_state > 0) and (last_word_ids[suffix_state] != word_id):
+                    last_word_ids[suffix_state] = word_id
+                    count_states.append(suffix_state)
+                    count_word_lens.append(len(word))
+                    suffix_state = links[suffix_state]
+
+        transition_counts = np.fromiter(map(len, transitions), dtype = np.int64, count = len(transitions))
+        transition_starts = np.concatenate([[0], np.cumsum(transition_counts)]).astype(np.uint32)
+        transition_letters = np.zeros(transition_starts[-1], dtype = np.uint8)
+        transition_targets = np.zeros(transition_starts[-1], dtype = np.uint32)
+        i = 0
+        for state_transitions in transitions:
+            for letter in sorted(state_transitions):
+                transition_letters[i] = letter
+                transition_targets[i] = state_transitions[letter]
+                i += 1
+
+        max_word_len = max(map(len, words), default = 0)
+        keys, counts = np.unique(np.frombuffer(count_states, dtype = np.uint32).astype(np.int64)*(max_word_len + 1) +
+                                 np.frombuffer(count_word_lens, dtype = np.uint32), return_counts = True)
+        count_row_states = keys//(max_word_len + 1)
+        count_starts = np.searchsorted(count_row_states, np.arange(len(lens) + 1)).astype(np.uint32)
+        # NOTE: one byte per length unless a word has 256 letters or more
+        count_lens = (keys % (max_word_len + 1)).astype(np.min_scalar_type(max_word_len))
+
+        return cls(transition_starts, transition_letters, transition_targets, count_starts, count_lens, counts.astype(np.uint32))
+
+    def save(self, automaton_dir):
+        os.makedirs(automaton_dir, exist_ok = True)
+        for name in self._ARRAYS:
+            np.save(os.path.join(automaton_dir, "{}.npy".format(name)), getattr(self, name))
+
+    @classmethod
+    def load(cls, automaton_dir, mmap = True):
+        mmap_mode = "r" if mmap else None
+        return cls(*[np.load(os.path.join(automaton_dir, "{}.npy".format(name)), mmap_mode = mmap_mode) for name in cls._ARRAYS])
+
+    def next_state(self, state, letter):
+        '''
+        State of the substring of state extended by letter (a byte) on the right, or -1 if it doesn't occur.
+        '''
+        start = self._transition_starts[state]
+        i = self._transition_letters.find(letter, start, self._transition_starts[state + 1])
+        if i == -1:
+            return -1
+        return self._transition_targets[i]
+
+    def walk(self, string, state = 0):
+        '''
+        State of string (bytes, read from state), or -1 if it doesn't occur in any word.
+        '''
+        for letter in string:
+            state = self.next_state(state, letter)
+            if state == -1:
+                break
+        return state
+
+    def word_len_counts(self, state):
+        '''
+        (word length, number of words) of the words containing the substrings of state, by increasing length.
+        '''
+        if state == 0:
+            raise ValueError("the initial state is the empty string, count the words of the lexicon instead")
+        start, end = self._count_starts[state], self._count_starts[state + 1]
+        return zip(self._count_lens[start:end].tolist(), self._count_counts[start:end].tolist())
+
+    def count_words(self, state, min_len = 0, modulus = None):
+        '''
+        Number of words containing the substrings of state that have at least min_len letters,
+        and only lengths that are a multiple of modulus if it is given.
+        '''
+        return sum(count for word_len, count in self.word_len_counts(state)
+                   if (word_len >= min_len) and ((modulus is None) or (word_len % modulus == 0)))
+
+class BidirectionalAutomaton:
+    '''
+    Suffix automata of the words (forward) and of the reversed words (backward).
+    Right extensions of a string are transitions of the forward automaton, left extensions are transitions of the backward
+    automaton from the reversed string, so all the one-letter extensions of a string are found in O(len(string) + letters).
+    Strings are encoded with the codec of the lexicon's words.
+    '''
+
+    def __init__(self, forward, backward, digest = None, codec = None):
+        self.forward = forward
+        self.backward = backward
+        self.digest = digest
+        self.codec = codec if codec is not None else LetterCodec()
+
+    def __repr__(self):
+        return "BidirectionalAutomaton({} + {} states)".format(len(self.forward), len(self.backward))
+
+    @classmethod
+    def build(cls, lexicon):
+        words = bytes(lexicon.words.buffer).split(b"\n") if len(lexicon.words) else []
+        return cls(SuffixAutomaton.build(words), SuffixAutomaton.build([word[::-1] for word in words]), lexicon.digest, 
+                   lexicon.words.codec)
+
+    def save(self, automaton_dir):
+        self.forward.save(os.path.join(automaton_dir, "forward"))
+        self.backward.save(os.path.join(automaton_dir, "backward"))
+        with open(os.path.join(automaton_dir, "meta.json"), "w") as f:
+            json.dump({"digest": self.digest}, f)
+
+    @classmethod
+    def load(cls, automaton_dir, lexicon, mmap = True):
+        with open(os.path.join(automaton_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta["digest"] != lexicon.digest:
+            raise ValueError("automaton at {} was built for a different lexicon".format(automaton_dir))
+        return cls(SuffixAutomaton.load(os.path.join(automaton_dir, "forward"), mmap),
+                   SuffixAutomaton.load(os.path.join(automaton_dir, "backward"), mmap), lexicon.digest, lexicon.words.codec)
+
+    def forward_state(self, string):
+        '''
+        State of string in the forward automaton, or -1 if it doesn't occur in any word.
+        '''
+        return self.forward.walk(self.codec.encode(string))
+
+    def count_words(self, string, min_len = 0, modulus = None):
+        '''
+        Number of words containing string (a non-empty string), see SuffixAutomaton.count_words
+        '''
+        state = self.forward_state(string)
+        return 0 if state == -1 else self.forward.count_words(state, min_len, modulus)
+
+    def extension_counts(self, current_string, letters, min_len = 0, modulus = None):
+        '''
+        Number of words containing each one-letter extension of current_string (letter + current_string and current_string + letter),
+        counted like count_words. Extensions that don't occur in any word are left out.
+        '''
+        extension_counts = {}
+        for automaton, make_extension in [(self.backward, lambda letter: letter + current_string),
+                                          (self.forward, lambda letter: current_string + letter)]:
+            string_bytes = self.codec.encode(current_string)
+            state = automaton.walk(string_bytes if automaton is self.forward else string_bytes[::-1])
+            if state == -1:
+                continue
+            for letter in letters:
+                next_state = automaton.next_state(state, self.codec.encode(letter)[0])
+                if next_state != -1:
+                    extension_counts[make_extension(letter)] = automaton.count_words(next_state, min_len, modulus)
+        return extension_counts
+
+def load_suffix_automaton(lexicon, automaton_dir = None):
+    '''
+    Get the suffix automata of a lexicon, building them at most once per process.
+    If automaton_dir holds automata of this lexicon (see build_suffix_automaton.py) they are memory-mapped,
+    otherwise they are built in memory (a few seconds).
+    '''
+    automaton = _AUTOMATON_CACHE.get(lexicon.digest)
+    if automaton is not None:
+        return automaton
+
+    if (automaton_dir is not None) and os.path.exists(os.path.join(automaton_dir, "meta.json")):
+        try:
+            automaton = BidirectionalAutomaton.load(automaton_dir, lexicon)
+        except ValueError:
+            automaton = None
+
+    if automaton is None:
+        automaton = BidirectionalAutomaton.build(lexicon)
+
+    _AUTOMATON_CACHE[lexicon.digest] = automaton
+    return automaton
@@ -0,0 +1,114 @@
+import os
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_SIZE = 100000
+
+# caches that were already opened in this process, keyed by (lexicon digest, cache file)
+_TRANSPOSITION_CACHES = {}
+
+class TranspositionCache:
+    '''
+    Remembers the scored proposals of find_best_proposal across games.
+    For a fixed lexicon, the scores only depend on (n_players, strategy, current_string),
+    the random tie-break between the best proposals is done again at every lookup.
+
+    Entries are kept in memory with least recently used eviction (max_size entries).
+    If cache_file is given, entries are also stored in an sqlite database that
+    several processes can read and write at the same time.
+    The cache can be shared by agents playing in several threads (see server.py).
+    '''
+
+    def __init__(self, digest, cache_file = None, max_size = DEFAULT_MAX_SIZE):
+        self.digest = digest
+        self.cache_file = cache_file
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._connection = None
+        self._connection_pid = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_connection(self):
+        # NOTE: sqlite connections can't be shared with forked processes, so open one per process
+        if self._connection_pid != os.getpid():
+            # NOTE: threads use the connection one at a time, under the lock
+            self._connection = sqlite3.connect(self.cache_file, timeout = 30, check_same_thread = False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS scores "
+                "(digest TEXT, n_players INTEGER, strategy TEXT, current_string TEXT, scores TEXT, "
+                "PRIMARY KEY (digest, n_players, strategy, current_string))"
+            )
+            self._connection.commit()
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def get(self, n_players, strategy, current_string):
+        '''
+        Get the scores stored for a state, or None if there are none.
+        '''
+        key = (n_players, strategy, current_string)
+        with self._lock:
+            scores = self._entries.get(key)
+
+            if scores is None and self.cache_file is not None:
+                row = self._get_connection().execute(
+                    "SELECT scores FROM scores WHERE digest = ? AND n_players = ? AND strategy = ? AND current_string = ?",
+                    (self.digest, n_players, strategy, current_string)
+                ).fetchone()
+                if row is not None:
+                    scores = json.loads(row[0])
+                    self._remember(key, scores)
+
+            if scores is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        return scores
+
+    def put(self, n_players, strategy, current_string, scores):
+        '''
+        Store the scores of a state. scores must be json serializable.
+        '''
+        with self._lock:
+            self._remember((n_players, strategy, current_string), scores)
+
+            if self.cache_file is not None:
+                connection = self._get_connection()
+                connection.execute(
+                    "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+                    (self.digest, n_players, strategy, current_string, json.dumps(scores))
+                )
+                connection.commit()
+
+    def _remember(self, key, scores):
+        self._entries[key] = scores
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last = False)
+
+    def clear(self):
+        '''
+        Forget the entries kept in memory. The database file is kept.
+        '''
+        with self._lock:
+            self._entries.clear()
+
+def load_transposition_cache(lexicon, cache_file = None, max_size = DEFAULT_MAX_SIZE):
+    '''
+    Get the transposition cache of a lexicon, opening it at most once per process
+    so that all the agents of a process share it.
+    '''
+    key = (lexicon.digest, None if cache_file is None else os.path.abspath(cache_file))
+    cache = _TRANSPOSITION_CACHES.get(key)
+    if cache is None:
+        cache = TranspositionCache(lexicon.digest, cache_file, max_size)
+        _TRANSPOSITION_CACHES[key] = cache
+    return cache
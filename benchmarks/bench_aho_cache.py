@@ -0,0 +1,63 @@
+'''
+Per-move time the automaton and haystack caches of best_proposal_finder save on the Aho-Corasick path (no substring index).
+Every string is scored twice with the caches emptied first (cold, everything is built as before the caches)
+and once more with the caches kept from earlier moves (warm). The cold moves are profiled to show the time spent
+building automata and haystacks.
+
+Run from the repository root:
+    python -m benchmarks.bench_aho_cache [n_players]
+'''
+import sys
+import time
+import cProfile
+import pstats
+from agents.SuperAgent import best_proposal_finder
+from agents.SuperAgent.best_proposal_finder import score_proposals, AUTOMATON_CACHE, HAYSTACK_CACHE
+from lexicon import load_lexicon
+
+STRINGS = ["QU", "ZZ", "TION", "AB", "XY", "ING"]
+METAGAME_STRINGS = ["AT", "ON", "UR"]
+
+def time_move(lexicon, n_players, current_string, use_metagame_strat, profile = None):
+    start_time = time.perf_counter()
+    if profile is not None:
+        profile.enable()
+    score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words_set, lexicon.letters, use_metagame_strat)
+    if profile is not None:
+        profile.disable()
+    return time.perf_counter() - start_time
+
+def main():
+    n_players = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    lexicon = load_lexicon()
+    # NOTE: the length buckets are built once per process whatever the caches do
+    lexicon.words_set.words_by_len
+
+    profile = cProfile.Profile()
+    print(f"{n_players} players, scored without a substring index")
+    print(f"{'string':>6} {'strategy':>8} {'cold':>7} {'warm':>7}")
+    total_cold = total_warm = 0
+    for use_metagame_strat, strings in [(False, STRINGS), (True, METAGAME_STRINGS)]:
+        for current_string in strings:
+            AUTOMATON_CACHE.clear()
+            HAYSTACK_CACHE.clear()
+            cold = time_move(lexicon, n_players, current_string, use_metagame_strat, profile)
+            warm = time_move(lexicon, n_players, current_string, use_metagame_strat)
+            total_cold += cold
+            total_warm += warm
+            strategy = "metagame" if use_metagame_strat else "ratio"
+            print(f"{current_string:>6} {strategy:>8} {cold:>7.3f} {warm:>7.3f}")
+
+    n_moves = len(STRINGS) + len(METAGAME_STRINGS)
+    print(f"mean per move: cold {total_cold / n_moves:.3f}s, warm {total_warm / n_moves:.3f}s "
+          f"({1 - total_warm / total_cold:.0%} less)")
+    print(f"last move: automata {AUTOMATON_CACHE!r}, haystacks {HAYSTACK_CACHE!r}")
+
+    # time of the cold moves spent in the builds the caches skip
+    stats = pstats.Stats(profile)
+    for (file_name, _, function_name), (_, _, _, cumulative_time, _) in stats.stats.items():
+        if (file_name == best_proposal_finder.__file__) and (function_name in ("make_aho_automaton", "make_haystack")):
+            print(f"cold moves, {function_name}: {cumulative_time:.3f}s of {total_cold:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+'''
+Micro-benchmark of WordntEnv._is_word.
+Compares the old list-backed lookup and the hashed set against the current hashed lookup in the compact lexicon (see CompactWords.hash_table).
+
+Run from the repository root:
+    python -m benchmarks.bench_is_word
+'''
+import random
+import timeit
+from game_env import WordntEnv
+
+N_CALLS = 200
+
+def main():
+    env = WordntEnv(3)
+    words = list(env.lexicon.words)
+
+    random.seed(0)
+    queries = random.sample(words, N_CALLS // 2) + ["QXZV" + word for word in random.sample(words, N_CALLS // 2)]
+    random.shuffle(queries)
+
+    def is_word_list(string_):
+        # NOTE: what _is_word did before, a linear scan over a list
+        return string_.upper() in words
+
+    def run(is_word):
+        for query in queries:
+            is_word(query)
+
+    list_time = min(timeit.repeat(lambda: run(is_word_list), number = 1, repeat = 3)) / N_CALLS
+    words_set = env.lexicon.words_set
+    set_time = min(timeit.repeat(lambda: run(lambda string_: string_.upper() in words_set), number = 100, repeat = 3)) / (100 * N_CALLS)
+    compact_time = min(timeit.repeat(lambda: run(env._is_word), number = 100, repeat = 3)) / (100 * N_CALLS)
+
+    print(f"words in lexicon: {len(words)}")
+    print(f"before (list scan):   {list_time * 1e6:10.2f} us per call")
+    print(f"hashed set:           {set_time * 1e6:10.2f} us per call")
+    print(f"after (compact):      {compact_time * 1e6:10.2f} us per call")
+    print(f"speedup:              {list_time / compact_time:10.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+'''
+Peak memory and time of building a lexicon snapshot from a large word list, each way measured in a fresh process.
+    in memory:  read every line into a list, then CompactWords.from_words and Lexicon.save (how snapshots were built before)
+    streaming:  build_lexicon_snapshot, at most chunk_size distinct words in memory
+
+The word list is synthetic (random words drawn from the lexicon's letter frequencies, with duplicates),
+gzipped and split in two files like concatenated dictionaries.
+
+Run from the repository root:
+    python -m benchmarks.bench_lexicon_build [n_words] [chunk_size]
+'''
+import os
+import sys
+import gzip
+import json
+import random
+import tempfile
+import subprocess
+from lexicon import DEFAULT_CHUNK_SIZE, DEFAULT_LETTERS
+
+CHILD_CODE = '''
+import json, sys, time, resource
+from lexicon import Lexicon, CompactWords, build_lexicon_snapshot, open_words_file
+
+mode, snapshot_dir, chunk_size, words_files = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4:]
+start_time = time.perf_counter()
+if mode == "streaming":
+    build_lexicon_snapshot(words_files, snapshot_dir, chunk_size = chunk_size)
+else:
+    words = []
+    for words_file in words_files:
+        with open_words_file(words_file) as f:
+            words.extend(line.strip().upper() for line in f)
+    Lexicon(CompactWords.from_words(word for word in words if word)).save(snapshot_dir)
+build_time = time.perf_counter() - start_time
+
+print(json.dumps({"build_time": build_time, "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+                  "digest": Lexicon.load(snapshot_dir).digest}))
+'''
+
+def write_word_lists(words_dir, n_words):
+    random.seed(0)
+    words_files = []
+    for i in range(2):
+        words_file = os.path.join(words_dir, "words{}.txt.gz".format(i))
+        with gzip.open(words_file, "wt") as f:
+            for _ in range(n_words // 2):
+                f.write("".join(random.choices(DEFAULT_LETTERS, k = random.randint(3, 12))) + "\n")
+        words_files.append(words_file)
+    return words_files
+
+def measure(mode, snapshot_dir, chunk_size, words_files):
+    output = subprocess.run([sys.executable, "-c", CHILD_CODE, mode, snapshot_dir, str(chunk_size)] + words_files,
+                            check = True, capture_output = True, text = True).stdout
+    return json.loads(output)
+
+def main():
+    n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CHUNK_SIZE
+
+    with tempfile.TemporaryDirectory() as words_dir:
+        words_files = write_word_lists(words_dir, n_words)
+        results = {mode:measure(mode, os.path.join(words_dir, mode.replace(" ", "_")), chunk_size, words_files)
+                   for mode in ["in memory", "streaming"]}
+
+    print(f"{n_words} lines in {len(words_files)} gzipped files, chunks of {chunk_size} words")
+    for mode, result in results.items():
+        print(f"{mode:10s} build {result['build_time']:6.1f} s   peak RSS {result['max_rss'] / 2**20:7.1f} MiB")
+    assert results["in memory"]["digest"] == results["streaming"]["digest"]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+'''
+Startup time and memory of the lexicon, each way of loading it measured in a fresh process.
+    text:           build it from the text word list
+    text + set:     same, plus the hashed words_set (what every process paid before the compact format)
+    snapshot:       memory-map a compact snapshot (see Lexicon.save)
+
+Memory is the growth of the resident set size from loading the lexicon and looking up a few words.
+
+Run from the repository root:
+    python -m benchmarks.bench_lexicon_memory
+'''
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from lexicon import load_lexicon, DEFAULT_WORDS_FILE
+
+N_LOOKUPS = 1000
+
+CHILD_CODE = '''
+import json, sys, time, random
+from lexicon import Lexicon
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * {page_size}
+
+mode, path = sys.argv[1], sys.argv[2]
+rss_before = rss()
+start_time = time.perf_counter()
+lexicon = Lexicon.load(path) if mode == "snapshot" else Lexicon.from_file(path)
+if mode == "text + set":
+    lexicon.words_set
+load_time = time.perf_counter() - start_time
+
+random.seed(0)
+queries = [lexicon.words[random.randrange(len(lexicon))] for _ in range({n_lookups})]
+start_time = time.perf_counter()
+n_found = sum(query in lexicon for query in queries)
+lookup_time = (time.perf_counter() - start_time) / len(queries)
+
+print(json.dumps({{"load_time": load_time, "lookup_time": lookup_time, "rss": rss() - rss_before, "n_found": n_found}}))
+'''
+
+def measure(mode, path):
+    code = CHILD_CODE.format(page_size = os.sysconf("SC_PAGE_SIZE"), n_lookups = N_LOOKUPS)
+    output = subprocess.run([sys.executable, "-c", code, mode, path], check = True, capture_output = True, text = True).stdout
+    return json.loads(output)
+
+def main():
+    words_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_WORDS_FILE
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        lexicon = load_lexicon(words_file)
+        lexicon.save(snapshot_dir)
+        print(f"{lexicon}, snapshot of {sum(os.path.getsize(os.path.join(snapshot_dir, name)) for name in os.listdir(snapshot_dir)) / 2**20:.1f} MiB")
+
+        results = {mode:measure(mode, path) for mode, path in [("text", words_file), ("text + set", words_file), ("snapshot", snapshot_dir)]}
+
+    for mode, result in results.items():
+        print(f"{mode:12s} load {result['load_time'] * 1000:8.1f} ms   RSS +{result['rss'] / 2**20:6.1f} MiB   "
+              f"lookup {result['lookup_time'] * 1e6:5.1f} us")
+    print(f"snapshot vs text + set: {results['text + set']['load_time'] / results['snapshot']['load_time']:.0f}x faster startup, "
+          f"{results['text + set']['rss'] / max(results['snapshot']['rss'], 1):.0f}x less memory")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+'''
+Cost of the Super Agent's metagame search per lookahead depth.
+Scores a few strings at every depth up to max_depth and reports nodes expanded and seconds per depth,
+to pick a search_depth (and time_budget) for a deployment.
+Strings with a sure win (or none at all) stop at depth 1, the metagame search isn't needed there.
+
+Run from the repository root:
+    python -m benchmarks.bench_lookahead_depth [n_players] [max_depth]
+'''
+import sys
+from agents.SuperAgent.best_proposal_finder import score_proposals
+from agents.SuperAgent.substring_index import load_substring_index, DEFAULT_INDEX_DIR
+from lexicon import load_lexicon
+
+STRINGS = ["ON", "AT", "RE", "IN", "ER", "AN"]
+
+def main():
+    n_players = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    max_depth = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    lexicon = load_lexicon()
+    index = load_substring_index(lexicon, DEFAULT_INDEX_DIR)
+
+    print(f"{n_players} players")
+    print(f"{'string':>6} {'depth':>5} {'nodes':>7} {'seconds':>8}")
+    for current_string in STRINGS:
+        words_set = index.words_containing(current_string)
+        search_stats = []
+        score_proposals(current_string, n_players, lexicon.max_word_len, words_set, lexicon.letters,
+                                 use_metagame_strat = True, index = index, search_depth = max_depth, search_stats = search_stats)
+        for stats in search_stats:
+            print(f"{current_string:>6} {stats['depth']:>5} {stats['n_nodes']:>7} {stats['seconds']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+'''
+Scaling benchmark of the parallel tournament runner.
+Plays the same seeded games with 1, 2, 4, 8, 16 and 32 workers and reports throughput.
+Worker counts above the number of cores are still run, but can't be expected to scale.
+
+Run from the repository root:
+    python -m benchmarks.bench_tournament_scaling [n_games]
+'''
+import os
+import sys
+import time
+from agents import SuperAgent
+from lexicon import load_lexicon
+from tournament import run_parallel_tournament, run_tournament
+
+WORKER_COUNTS = [1, 2, 4, 8, 16, 32]
+LINEUP = [(SuperAgent, "A"), (SuperAgent, "B"), (SuperAgent, "C")]
+
+def main():
+    n_games = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    lexicon = load_lexicon()
+
+    # NOTE: warm up the shared caches so every run starts from the same state
+    run_tournament(LINEUP, 1, lexicon = lexicon)
+
+    print(f"{n_games} games per run, {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'seconds':>8} {'games/s':>8} {'speedup':>8} {'efficiency':>10}")
+    base_time = None
+    for n_workers in WORKER_COUNTS:
+        start_time = time.time()
+        for _ in run_parallel_tournament(LINEUP, n_games, n_workers, lexicon = lexicon):
+            pass
+        elapsed = time.time() - start_time
+
+        if base_time is None:
+            base_time = elapsed
+        speedup = base_time / elapsed
+        print(f"{n_workers:>7} {elapsed:>8.2f} {n_games / elapsed:>8.1f} {speedup:>8.2f} {speedup / n_workers:>10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+'''
+Build a lexicon snapshot (see Lexicon.save) from one or more word lists, in bounded memory.
+Lists can be gzipped (.gz) and are read as one: words are uppercased, deduplicated,
+and words with characters outside of the letters are left out. Without --letters, the alphabet is
+the letters and digits the words use, accented letters included
+(up to 128 characters outside of ASCII).
+Pass the snapshot to the agents and the environment with the lexicon_dir kwarg.
+
+usage: python build_lexicon.py words_file [words_file ...] [--lexicon-dir DIR] [--letters LETTERS] [--chunk-size N]
+'''
+import argparse
+import time
+from lexicon import build_lexicon_snapshot, DEFAULT_LEXICON_DIR, DEFAULT_CHUNK_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description = "Build a lexicon snapshot from word lists.")
+    parser.add_argument("words_files", nargs = "+")
+    parser.add_argument("--lexicon-dir", default = DEFAULT_LEXICON_DIR)
+    parser.add_argument("--letters", default = None, help = "alphabet, by default the letters and digits the words use")
+    parser.add_argument("--chunk-size", type = int, default = DEFAULT_CHUNK_SIZE, help = "distinct words held in memory at once")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    stats = build_lexicon_snapshot(args.words_files, args.lexicon_dir, args.letters, args.chunk_size)
+    print(f"Read {stats['n_lines']} lines, kept {stats['n_words']} words, left out {stats['n_invalid']} with other characters "
+          f"in {time.time() - start_time:.1f}s. Saved to {args.lexicon_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+'''
+Precompute opening books for the Super Agent.
+A book holds the scores of every string a player can be handed in the first plies of a game,
+so the agent's early moves become lookups.
+
+usage: python build_opening_book.py --n-players 2 3 4 5 6 --plies 2
+'''
+import argparse
+import time
+from lexicon import load_lexicon, DEFAULT_WORDS_FILE
+from agents.SuperAgent.substring_index import load_substring_index, DEFAULT_INDEX_DIR
+from agents.SuperAgent.opening_book import build_opening_book, get_opening_book_file, DEFAULT_OPENING_BOOK_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description = "Precompute opening books for the Super Agent.")
+    parser.add_argument("--words-file", default = DEFAULT_WORDS_FILE)
+    parser.add_argument("--index-dir", default = DEFAULT_INDEX_DIR)
+    parser.add_argument("--book-dir", default = DEFAULT_OPENING_BOOK_DIR)
+    parser.add_argument("--n-players", type = int, nargs = "+", default = list(range(2, 12)))
+    parser.add_argument("--plies", type = int, default = 1, help = "number of plies to precompute, 1 is only the first turn")
+    parser.add_argument("--strategy", choices = ["metagame", "ratio"], default = "metagame")
+    args = parser.parse_args()
+
+    lexicon = load_lexicon(args.words_file)
+    index = load_substring_index(lexicon, args.index_dir)
+
+    for n_players in args.n_players:
+        start_time = time.time()
+        book = build_opening_book(lexicon, index, n_players, args.strategy == "metagame", args.plies, verbose = True)
+        book_file = get_opening_book_file(args.book_dir, n_players, args.strategy)
+        book.save(book_file)
+        print(f"{book} built in {time.time() - start_time:.1f}s. Saved to {book_file}")
+
+if __name__ == "__main__":
+    main()
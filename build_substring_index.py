@@ -0,0 +1,23 @@
+'''
+Build the substring index used by the Super Agent and save it to disk.
+The agent memory-maps it at startup instead of building it in every process.
+
+usage: python build_substring_index.py [words_file] [index_dir]
+'''
+import sys
+import time
+from lexicon import load_lexicon, DEFAULT_WORDS_FILE
+from agents.SuperAgent.substring_index import SubstringIndex, DEFAULT_INDEX_DIR
+
+def main():
+    words_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_WORDS_FILE
+    index_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_INDEX_DIR
+
+    start_time = time.time()
+    lexicon = load_lexicon(words_file)
+    index = SubstringIndex.build(lexicon)
+    index.save(index_dir)
+    print(f"Indexed {len(index)} suffixes of {len(lexicon)} words in {time.time() - start_time:.1f}s. Saved to {index_dir}")
+
+if __name__ == "__main__":
+    main()
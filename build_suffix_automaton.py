@@ -0,0 +1,23 @@
+'''
+Build the suffix automata used by the Super Agent (with use_suffix_automaton = True) and save them to disk.
+The agent memory-maps them at startup instead of building them in every process.
+
+usage: python build_suffix_automaton.py [words_file] [automaton_dir]
+'''
+import sys
+import time
+from lexicon import load_lexicon, DEFAULT_WORDS_FILE
+from agents.SuperAgent.suffix_automaton import BidirectionalAutomaton, DEFAULT_AUTOMATON_DIR
+
+def main():
+    words_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_WORDS_FILE
+    automaton_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_AUTOMATON_DIR
+
+    start_time = time.time()
+    lexicon = load_lexicon(words_file)
+    automaton = BidirectionalAutomaton.build(lexicon)
+    automaton.save(automaton_dir)
+    print(f"Built {automaton!r} of {len(lexicon)} words in {time.time() - start_time:.1f}s. Saved to {automaton_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 from copy import copy
+from lexicon import load_lexicon
 
 class WordntEnv:
 
@@ -15,12 +16,12 @@ class WordntEnv:
 
     def __init__(self, n_players, **kwargs):
         self.n_players = n_players
-        words_file = kwargs.get("words_file", "./data/wordnt_words.txt")
-
-        self._words = []
-        with open(words_file, "r") as f:
-            for line in f:
-                self._words.append(line.strip())
+        # NOTE: pass the same lexicon to the agents so the word list is only loaded once
+        self.lexicon = kwargs.get("lexicon", None)
+        if self.lexicon is None:
+            self.lexicon = load_lexicon(kwargs.get("words_file", None), kwargs.get("lexicon_dir", None))
+        # NOTE: hashed lookup in the compact word buffer (see CompactWords), no python str per word is built
+        self._words = self.lexicon.words
 
         self.reset()
 
@@ -126,6 +127,9 @@ class WordntEnv:
             # NOTE: for adding characters, string must have length of 1
             if len(string_) != 1:
                 return False
+            # NOTE: only letters of the lexicon's alphabet
+            if string_.upper() not in self.lexicon.letters:
+                return False
 
         if not action_type.startswith("challenge"):
             # NOTE: for non-challenge actions, string should not be none
@@ -0,0 +1,501 @@
+import os
+import json
+import gzip
+import heapq
+import bisect
+import tempfile
+from array import array
+import mmap as mmap_module
+import hashlib
+from functools import cached_property
+import numpy as np
+
+DEFAULT_WORDS_FILE = "./data/wordnt_words.txt"
+# NOTE: lexicons derive their letters from their words unless they are given, this is the alphabet of the Scrabble list
+DEFAULT_LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+DEFAULT_LEXICON_DIR = "./data/lexicon"
+# distinct words held in memory at once by build_lexicon_snapshot, the rest wait in sorted runs on disk
+DEFAULT_CHUNK_SIZE = 1000000
+
+# bytes of the words buffer counted at a time when finding its letters
+_LETTER_COUNT_CHUNK_SIZE = 2**24
+
+# lexicons that were already loaded in this process, keyed by absolute paths of the words files and snapshot dir
+_LEXICON_CACHE = {}
+
+class _EncodeTable(dict):
+    # str.translate table of LetterCodec: ASCII characters are kept, unknown characters become byte 0
+    def __missing__(self, code_point):
+        if code_point < 128:
+            raise LookupError(code_point)
+        return 0
+
+class LetterCodec:
+    '''
+    One byte per letter, so that lengths and offsets in a words buffer are counted in letters.
+    ASCII characters are their own byte, the other letters of the alphabet (symbols, up to 128 of them)
+    get the bytes from 128 on in sorted order, so the bytes sort like the letters.
+    Characters that aren't in the alphabet are encoded as byte 0, which no word has, so they are never found.
+    '''
+
+    def __init__(self, letters = ""):
+        symbols = sorted({letter for letter in letters if not letter.isascii()})
+        if len(symbols) > 128:
+            raise ValueError("at most 128 letters outside of ASCII fit in one byte each, got {}".format(len(symbols)))
+        self.symbols = "".join(symbols)
+        self._encode_table = _EncodeTable({ord(symbol):128 + i for i, symbol in enumerate(symbols)})
+        self._decode_table = {128 + i:ord(symbol) for i, symbol in enumerate(symbols)}
+
+    def __repr__(self):
+        return "LetterCodec({!r})".format(self.symbols)
+
+    def __reduce__(self):
+        return (LetterCodec, (self.symbols,))
+
+    def encode(self, string):
+        if string.isascii():
+            return string.encode()
+        return string.translate(self._encode_table).encode("latin-1")
+
+    def decode(self, string_bytes):
+        if not self.symbols:
+            return string_bytes.decode()
+        return string_bytes.decode("latin-1").translate(self._decode_table)
+
+class CompactWords:
+    '''
+    Sorted, unique words stored in one bytes buffer (one byte per letter, see LetterCodec, separated by newlines)
+    plus an array of word start offsets.
+    The ID of a word is its position, the same as in a sorted tuple of the words.
+    Behaves like a read-only sequence of str, with hashed membership and substring queries on the buffer.
+
+    Saved as two files (words.bin and starts.npy) that are memory-mapped when loaded,
+    so processes loading the same files share their pages.
+    '''
+
+    def __init__(self, buffer, starts = None, codec = None):
+        if starts is None:
+            # NOTE: the last start is one past the end, as if the buffer ended with a newline
+            newlines = np.flatnonzero(np.frombuffer(buffer, dtype = np.uint8) == ord("\n"))
+            starts = np.concatenate([[0], newlines + 1, [len(buffer) + 1]]).astype(np.uint32) if len(buffer) else np.zeros(1, np.uint32)
+        self.buffer = buffer
+        self.starts = np.asarray(starts)
+        self.codec = codec if codec is not None else LetterCodec()
+        # NOTE: memoryview indexing returns python ints, much faster than numpy scalars in the binary search
+        self._starts = memoryview(self.starts)
+        self._bytes = np.frombuffer(buffer, dtype = np.uint8)
+        # NOTE: same width as the starts, so no word length can wrap around
+        self.lens = (np.diff(self.starts.astype(np.int64)) - 1).astype(np.uint32)
+
+    @classmethod
+    def from_words(cls, words, codec = None):
+        if codec is None:
+            codec = LetterCodec()
+        words = sorted(set(words))
+        return cls(codec.encode("\n".join(words)), codec = codec)
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __repr__(self):
+        return "CompactWords({} words, {} bytes)".format(len(self), len(self.buffer))
+
+    def __reduce__(self):
+        return (CompactWords, (bytes(self.buffer), np.array(self.starts), self.codec))
+
+    def _word_bytes(self, word_id):
+        return self.buffer[self._starts[word_id]:self._starts[word_id + 1] - 1]
+
+    def __getitem__(self, word_id):
+        if word_id < 0:
+            word_id += len(self)
+        if not (0 <= word_id < len(self)):
+            raise IndexError("word ID out of range")
+        return self.codec.decode(self._word_bytes(word_id))
+
+    def words_of(self, word_ids):
+        '''
+        List of the words with the given IDs.
+        '''
+        buffer, starts, decode = self.buffer, self._starts, self.codec.decode
+        return [decode(buffer[starts[word_id]:starts[word_id + 1] - 1]) for word_id in np.asarray(word_ids).tolist()]
+
+    def __iter__(self):
+        for word_bytes in bytes(self.buffer).split(b"\n") if len(self) else []:
+            yield self.codec.decode(word_bytes)
+
+    def find(self, word):
+        '''
+        ID of word, or -1 if it isn't in the words.
+        '''
+        word_bytes = self.codec.encode(word)
+        word_id = bisect.bisect_left(range(len(self)), word_bytes, key = self._word_bytes)
+        if (word_id < len(self)) and (self._word_bytes(word_id) == word_bytes):
+            return word_id
+        return -1
+
+    @cached_property
+    def hash_table(self):
+        # open addressing table of word ID + 1 (0 is an empty slot) by hash of the word bytes, at least twice as many slots as words
+        # NOTE: a few bytes per word instead of a python str per word, built once per process (hash() of bytes is salted per process)
+        n_slots = 1 << (2*len(self)).bit_length()
+        table = array("I", bytes(4*n_slots))
+        mask = n_slots - 1
+        for word_id, word_bytes in enumerate(bytes(self.buffer).split(b"\n") if len(self) else []):
+            slot = hash(word_bytes) & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = word_id + 1
+        return table, mask
+
+    def build_hash_table(self):
+        '''
+        Build the hash table of membership tests now rather than on the first one, e.g. before a timed move.
+        Later calls return the same (table, mask).
+        '''
+        return self.hash_table
+
+    def __contains__(self, word):
+        if not isinstance(word, str):
+            return False
+        word_bytes = self.codec.encode(word)
+        table, mask = self.hash_table
+        slot = hash(word_bytes) & mask
+        while table[slot]:
+            if self._word_bytes(table[slot] - 1) == word_bytes:
+                return True
+            slot = (slot + 1) & mask
+        return False
+
+    def ids_of_len(self, length):
+        '''
+        Sorted IDs of the words with length letters.
+        '''
+        return np.flatnonzero(self.lens == length)
+
+    def ids_containing(self, substring):
+        '''
+        Sorted IDs of the words containing substring, found by scanning the buffer.
+        '''
+        pattern = np.frombuffer(self.codec.encode(substring), dtype = np.uint8)
+        if len(pattern) == 0:
+            return np.arange(len(self))
+        positions = np.flatnonzero(self._bytes[:len(self._bytes) - len(pattern) + 1] == pattern[0])
+        for i in range(1, len(pattern)):
+            positions = positions[self._bytes[positions + i] == pattern[i]]
+        return np.unique(np.searchsorted(self.starts, positions, side = "right") - 1)
+
+    def save(self, words_dir):
+        os.makedirs(words_dir, exist_ok = True)
+        with open(os.path.join(words_dir, "words.bin"), "wb") as f:
+            f.write(self.buffer)
+        np.save(os.path.join(words_dir, "starts.npy"), self.starts)
+
+    @classmethod
+    def load(cls, words_dir, mmap = True, codec = None):
+        with open(os.path.join(words_dir, "words.bin"), "rb") as f:
+            if mmap and os.fstat(f.fileno()).st_size:
+                # NOTE: slices of an mmap are bytes, the mapping stays valid after the file is closed
+                buffer = mmap_module.mmap(f.fileno(), 0, access = mmap_module.ACCESS_READ)
+            else:
+                buffer = f.read()
+        starts = np.load(os.path.join(words_dir, "starts.npy"), mmap_mode = "r" if mmap else None)
+        return cls(buffer, starts, codec)
+
+class WordSet(frozenset):
+    '''
+    Hashed set of words that also keeps them partitioned by length (words_by_len, sorted tuples).
+    The basis words and halt words of a turn only depend on word lengths, so they are unions of these buckets,
+    built once per (min_basis_word_len, halt_modulus) and then shared by every turn with the same string length and table size.
+    '''
+
+    @classmethod
+    def from_words_by_len(cls, words_by_len):
+        word_set = cls(word for words in words_by_len.values() for word in words)
+        # NOTE: same str objects as the buckets, nothing is decoded twice
+        word_set.__dict__["words_by_len"] = words_by_len
+        return word_set
+
+    @cached_property
+    def words_by_len(self):
+        words_by_len = {}
+        for word in self:
+            words_by_len.setdefault(len(word), []).append(word)
+        return {length: tuple(sorted(words_by_len[length])) for length in sorted(words_by_len)}
+
+    @cached_property
+    def _length_filtered_words_cache(self):
+        return {}
+
+    def get_length_filtered_words(self, min_basis_word_len, halt_modulus):
+        '''
+        (basis words, halt words): the words with at least min_basis_word_len letters
+        and the words whose length is a multiple of halt_modulus, as tuples in order of length.
+        '''
+        key = (min_basis_word_len, halt_modulus)
+        length_filtered_words = self._length_filtered_words_cache.get(key)
+        if length_filtered_words is None:
+            basis_words = tuple(word for length, words in self.words_by_len.items() if length >= min_basis_word_len for word in words)
+            halt_words = tuple(word for length, words in self.words_by_len.items() if length % halt_modulus == 0 for word in words)
+            length_filtered_words = (basis_words, halt_words)
+            self._length_filtered_words_cache[key] = length_filtered_words
+        return length_filtered_words
+
+class Lexicon:
+    '''
+    Immutable word list shared by the game environment and all the agents.
+    Build it once per process (see load_lexicon) and hand the same object to everyone.
+
+    The words are kept as CompactWords (see above), word IDs are positions in lexicon.words.
+    words_set and words_by_len hold a python str per word, they are only built the first time they are used.
+    '''
+
+    def __init__(self, words, letters = None):
+        if not isinstance(words, CompactWords):
+            words = set(words)
+            words = CompactWords.from_words(words, LetterCodec((letters or "") + "".join(words)))
+        elif not set(words.codec.symbols).issuperset(letter for letter in letters or "" if not letter.isascii()):
+            raise ValueError("letters {!r} aren't all in the codec of the words, {!r}".format(letters, words.codec))
+        if letters is None:
+            letters = get_buffer_letters(words.buffer, words.codec)
+
+        object.__setattr__(self, "words", words)
+        object.__setattr__(self, "max_word_len", int(words.lens.max()) if len(words) else 0)
+        object.__setattr__(self, "letters", letters)
+        # NOTE: identifies the word list, used to check that prebuilt indexes belong to this lexicon
+        object.__setattr__(self, "digest", hashlib.sha1(words.buffer).hexdigest())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Lexicon is immutable")
+
+    def __repr__(self):
+        return "Lexicon({} words, max_word_len={})".format(len(self.words), self.max_word_len)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __reduce__(self):
+        return (Lexicon, (self.words, self.letters))
+
+    @cached_property
+    def words_set(self):
+        '''
+        Hashed set of the words (a WordSet, see above), for hot membership loops.
+        '''
+        return WordSet.from_words_by_len(self.words_by_len)
+
+    @cached_property
+    def words_by_len(self):
+        return {length: tuple(self.words_of_len(length)) for length in np.unique(self.words.lens).tolist()}
+
+    def words_of_len(self, length):
+        '''
+        Iterate over the words with length letters, in sorted order.
+        '''
+        yield from self.words.words_of(self.words.ids_of_len(length))
+
+    def words_containing(self, substring):
+        '''
+        Set of the words containing substring.
+        '''
+        return set(self.words.words_of(self.words.ids_containing(substring)))
+
+    @classmethod
+    def from_file(cls, words_file, letters = None):
+        '''
+        Read a plain text word list (one word per line, gzipped if it ends with .gz).
+        '''
+        return cls.from_files([words_file], letters)
+
+    @classmethod
+    def from_files(cls, words_files, letters = None, chunk_size = DEFAULT_CHUNK_SIZE):
+        '''
+        Read several word lists as one, in bounded memory (see build_lexicon_snapshot).
+        '''
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            build_lexicon_snapshot(words_files, snapshot_dir, letters, chunk_size)
+            return cls.load(snapshot_dir, mmap = False)
+
+    def save(self, snapshot_dir):
+        '''
+        Persist the lexicon in the compact format, for fast startup and pages shared between processes.
+        '''
+        self.words.save(snapshot_dir)
+        with open(os.path.join(snapshot_dir, "meta.json"), "w") as f:
+            json.dump({"digest": self.digest, "letters": self.letters, "symbols": self.words.codec.symbols, 
+                       "n_words": len(self.words)}, f)
+
+    @classmethod
+    def load(cls, snapshot_dir, mmap = True):
+        '''
+        Load a lexicon saved with .save(), memory-mapped unless mmap is False.
+        '''
+        with open(os.path.join(snapshot_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+        # NOTE: the bytes of the letters outside of ASCII are their positions in symbols
+        codec = LetterCodec(meta.get("symbols", ""))
+        lexicon = cls(CompactWords.load(snapshot_dir, mmap, codec), meta["letters"])
+        if lexicon.digest != meta["digest"]:
+            raise ValueError("{} is not a valid lexicon snapshot".format(snapshot_dir))
+        return lexicon
+
+def get_buffer_letters(buffer, codec = None):
+    '''
+    Sorted characters of a words buffer (see CompactWords) written with codec, as a string.
+    '''
+    if codec is None:
+        codec = LetterCodec()
+    byte_counts = np.zeros(256, dtype = np.int64)
+    for start in range(0, len(buffer), _LETTER_COUNT_CHUNK_SIZE):
+        byte_counts += np.bincount(np.frombuffer(buffer[start:start + _LETTER_COUNT_CHUNK_SIZE], dtype = np.uint8), minlength = 256)
+    byte_counts[ord("\n")] = 0
+    return codec.decode(np.flatnonzero(byte_counts).astype(np.uint8).tobytes())
+
+def open_words_file(words_file):
+    '''
+    Open a word list for reading as text, decompressing it if it is gzipped (name ending with .gz).
+    '''
+    if words_file.endswith(".gz"):
+        return gzip.open(words_file, "rt", encoding = "utf-8")
+    return open(words_file, "r", encoding = "utf-8")
+
+def _write_sorted_run(words, runs_dir, runs):
+    run_file = os.path.join(runs_dir, "run{}.txt".format(len(runs)))
+    with open(run_file, "w", encoding = "utf-8") as f:
+        f.writelines(word + "\n" for word in sorted(words))
+    runs.append(run_file)
+    words.clear()
+
+def _read_run(run_file):
+    with open(run_file, "r", encoding = "utf-8") as f:
+        for line in f:
+            yield line[:-1]
+
+def build_lexicon_snapshot(words_files, snapshot_dir, letters = None, chunk_size = DEFAULT_CHUNK_SIZE):
+    '''
+    Write the lexicon of one or more word lists (one word per line, gzipped if the name ends with .gz) to snapshot_dir,
+    in the compact format of Lexicon.save, without ever holding all the words in memory.
+    Words are stripped and uppercased, duplicates (also across files) are kept once,
+    and words with a character that isn't in letters (uppercased too) are left out.
+    Without letters, words are kept if they are made of letters and digits (accented letters too),
+    and the letters are the ones they use. Letters outside of ASCII get one byte each (see LetterCodec).
+
+    At most chunk_size distinct words are held at a time: every full chunk is sorted into a run file,
+    then the runs are merged straight into the words buffer. The word offsets also go through a file,
+    so memory doesn't grow with the number of words.
+    Returns the number of lines read, words kept and words left out.
+    '''
+    if letters is None:
+        is_valid_word = str.isalnum
+    else:
+        letters = letters.upper()
+        if (len(set(letters)) != len(letters)) or not all(letter.isprintable() and not letter.isspace() for letter in letters):
+            raise ValueError("letters must be distinct printable characters without spaces, got {!r}".format(letters))
+        # NOTE: raises before anything is read if the letters don't fit in one byte each
+        LetterCodec(letters)
+        is_valid_word = set(letters).issuperset
+    os.makedirs(snapshot_dir, exist_ok = True)
+    stats = {"n_lines": 0, "n_words": 0, "n_invalid": 0}
+
+    with tempfile.TemporaryDirectory(dir = snapshot_dir) as runs_dir:
+        runs = []
+        chunk = set()
+        symbols = set()
+        for words_file in words_files:
+            with open_words_file(words_file) as f:
+                for line in f:
+                    stats["n_lines"] += 1
+                    word = line.strip().upper()
+                    if not word:
+                        continue
+                    if not is_valid_word(word):
+                        stats["n_invalid"] += 1
+                        continue
+                    if not word.isascii():
+                        symbols.update(letter for letter in word if not letter.isascii())
+                    chunk.add(word)
+                    if len(chunk) >= chunk_size:
+                        _write_sorted_run(chunk, runs_dir, runs)
+        if chunk or not runs:
+            _write_sorted_run(chunk, runs_dir, runs)
+
+        # NOTE: same bytes as CompactWords.save of the sorted words, so the digest is the same as with Lexicon.save
+        codec = LetterCodec((letters or "") + "".join(symbols))
+        digest = hashlib.sha1()
+        starts_file = os.path.join(runs_dir, "starts.bin")
+        with open(os.path.join(snapshot_dir, "words.bin"), "wb") as words_f, open(starts_file, "wb") as starts_f:
+            n_bytes = 0
+            last_word = None
+            starts = array("I")
+            for word in heapq.merge(*[_read_run(run_file) for run_file in runs]):
+                if word == last_word:
+                    continue
+                word_bytes = codec.encode(word) if last_word is None else b"\n" + codec.encode(word)
+                starts.append(n_bytes + (0 if last_word is None else 1))
+                words_f.write(word_bytes)
+                digest.update(word_bytes)
+                n_bytes += len(word_bytes)
+                last_word = word
+                stats["n_words"] += 1
+                if len(starts) >= chunk_size:
+                    starts.tofile(starts_f)
+                    del starts[:]
+            # NOTE: the last start is one past the end, as if the buffer ended with a newline
+            starts.append(n_bytes + 1 if stats["n_words"] else 0)
+            starts.tofile(starts_f)
+
+        starts = np.lib.format.open_memmap(os.path.join(snapshot_dir, "starts.npy"), mode = "w+", dtype = np.uint32,
+                                           shape = (stats["n_words"] + 1,))
+        starts[:] = np.memmap(starts_file, dtype = np.uint32, mode = "r")
+        starts.flush()
+        del starts
+
+    if letters is None:
+        letters = ""
+        with open(os.path.join(snapshot_dir, "words.bin"), "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap_module.mmap(f.fileno(), 0, access = mmap_module.ACCESS_READ) as buffer:
+                    letters = get_buffer_letters(buffer, codec)
+
+    # NOTE: written last, a snapshot without meta.json is never loaded
+    with open(os.path.join(snapshot_dir, "meta.json"), "w") as f:
+        json.dump({"digest": digest.hexdigest(), "letters": letters, "symbols": codec.symbols, "n_words": stats["n_words"]}, f)
+    return stats
+
+def load_lexicon(words_file = None, snapshot_dir = None):
+    '''
+    Get the lexicon for words_file (a path or a list of paths read as one word list, DEFAULT_WORDS_FILE if not given)
+    and snapshot_dir, building it at most once per process.
+    If snapshot_dir is given, the lexicon is memory-mapped from it when it is newer than the words files
+    (or they don't exist), otherwise the snapshot is (re)written from the words files with build_lexicon_snapshot and loaded.
+    A custom snapshot_dir without words_file is loaded as it is, it is never rebuilt from the default words file.
+    '''
+    is_default_words_file = words_file is None
+    if is_default_words_file:
+        words_file = DEFAULT_WORDS_FILE
+    words_files = [words_file] if isinstance(words_file, str) else list(words_file)
+    key = (tuple(os.path.abspath(path) for path in words_files), None if snapshot_dir is None else os.path.abspath(snapshot_dir))
+    lexicon = _LEXICON_CACHE.get(key)
+    if lexicon is not None:
+        return lexicon
+
+    snapshot_meta_file = None if snapshot_dir is None else os.path.join(snapshot_dir, "meta.json")
+    is_custom_snapshot = (snapshot_dir is not None) and (os.path.abspath(snapshot_dir) != os.path.abspath(DEFAULT_LEXICON_DIR))
+    if (snapshot_meta_file is not None) and os.path.exists(snapshot_meta_file) and \
+        ((is_default_words_file and is_custom_snapshot) or 
+         all(os.path.getmtime(snapshot_meta_file) >= os.path.getmtime(path) for path in words_files if os.path.exists(path))):
+        lexicon = Lexicon.load(snapshot_dir)
+    elif snapshot_dir is not None:
+        build_lexicon_snapshot(words_files, snapshot_dir)
+        lexicon = Lexicon.load(snapshot_dir)
+    else:
+        lexicon = Lexicon.from_files(words_files)
+
+    _LEXICON_CACHE[key] = lexicon
+    return lexicon
@@ -0,0 +1,159 @@
+'''
+Load test of server.py. Opens many tables over a few connections, plays every client seat with a cheap
+random legal player and reports moves per second (client and bot moves) and the latency of the client's moves,
+from sending the action until the server hands the table back (so including the bots' moves in between).
+
+usage: python load_test_client.py --tables 1000 --games 5 --n-players 3 --connections 4
+'''
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import numpy as np
+from agents.SuperAgent.substring_index import load_substring_index, DEFAULT_INDEX_DIR
+from lexicon import load_lexicon, DEFAULT_WORDS_FILE
+from server import DEFAULT_PORT
+
+class RandomPlayer:
+    '''
+    Adds a random letter that keeps the string a substring of a word without forming one,
+    challenges when it can't, and always wins challenges it can.
+    '''
+
+    def __init__(self, lexicon, index):
+        self.lexicon = lexicon
+        self.index = index
+
+    def get_action(self, state):
+        current_string = state["current_string"]
+
+        if (state["last_action"] is not None) and (state["last_action"][0] == "challenge_no_word"):
+            word = self.index.witness(current_string)
+            return "claim_word", word if word is not None else current_string
+
+        if (len(current_string) >= 3) and (current_string in self.lexicon):
+            return "challenge_is_word", None
+
+        actions = []
+        for letter in self.lexicon.letters:
+            for action_type, proposal in [("add_to_start", letter + current_string), ("add_to_end", current_string + letter)]:
+                start, end = self.index.suffix_range(proposal)
+                if (end > start) and (proposal not in self.lexicon):
+                    actions.append((action_type, letter))
+        if not actions:
+            return "challenge_no_word", None
+        return random.choice(actions)
+
+class Connection:
+    '''
+    One connection to the server, shared by many tables. Routes the server's messages to the table waiting for them.
+    '''
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.table_messages = {}
+        # new_table requests waiting for their table, by tag
+        self.new_tables = {}
+        self._tags = itertools.count()
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message["op"] == "table":
+                self.table_messages[message["table_id"]] = asyncio.Queue()
+                self.new_tables.pop(message["tag"]).set_result(message["table_id"])
+            elif message["op"] == "error" and message["table_id"] is None:
+                raise RuntimeError(message["message"])
+            else:
+                await self.table_messages[message["table_id"]].put(message)
+
+    def send(self, request):
+        self.writer.write((json.dumps(request) + "\n").encode())
+
+    async def new_table(self, n_players, n_clients):
+        tag = next(self._tags)
+        self.new_tables[tag] = asyncio.get_running_loop().create_future()
+        self.send({"op": "new_table", "n_players": n_players, "n_clients": n_clients, "tag": tag})
+        return await self.new_tables[tag]
+
+async def play_table(connection, player, n_players, n_clients, n_games, latencies, totals):
+    table_id = await connection.new_table(n_players, n_clients)
+    table_messages = connection.table_messages[table_id]
+
+    for game in range(n_games):
+        if game > 0:
+            connection.send({"op": "new_game", "table_id": table_id})
+        message = await table_messages.get()
+
+        while message["op"] == "turn":
+            action_type, string_ = player.get_action(message["state"])
+            start_time = time.perf_counter()
+            connection.send({"op": "action", "table_id": table_id, "action_type": action_type, "string": string_})
+            message = await table_messages.get()
+            latencies.append(time.perf_counter() - start_time)
+
+        if message["op"] == "error":
+            raise RuntimeError(message["message"])
+        totals["games"] += 1
+        totals["moves"] += message["n_moves"]
+
+    connection.send({"op": "close_table", "table_id": table_id})
+
+async def run_load_test(host, port, player, n_tables, n_games, n_players, n_clients, n_connections):
+    connections = []
+    listeners = []
+    for _ in range(n_connections):
+        reader, writer = await asyncio.open_connection(host, port, limit = 2**20)
+        connection = Connection(reader, writer)
+        connections.append(connection)
+        listeners.append(asyncio.create_task(connection.listen()))
+
+    latencies = []
+    totals = {"games": 0, "moves": 0}
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*[play_table(connections[i % n_connections], player, n_players, n_clients, n_games, latencies, totals)
+                           for i in range(n_tables)])
+    elapsed = time.perf_counter() - start_time
+
+    for connection, listener in zip(connections, listeners):
+        listener.cancel()
+        connection.writer.close()
+
+    return elapsed, latencies, totals
+
+def main():
+    parser = argparse.ArgumentParser(description = "Load test a Wordn't server (see server.py).")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = DEFAULT_PORT)
+    parser.add_argument("--words-file", default = DEFAULT_WORDS_FILE)
+    parser.add_argument("--index-dir", default = DEFAULT_INDEX_DIR)
+    parser.add_argument("--tables", type = int, default = 100, help = "concurrent tables")
+    parser.add_argument("--games", type = int, default = 5, help = "games per table")
+    parser.add_argument("--n-players", type = int, default = 3)
+    parser.add_argument("--n-clients", type = int, default = 1, help = "seats per table played by this client")
+    parser.add_argument("--connections", type = int, default = 4)
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    lexicon = load_lexicon(args.words_file)
+    player = RandomPlayer(lexicon, load_substring_index(lexicon, args.index_dir))
+
+    elapsed, latencies, totals = asyncio.run(run_load_test(args.host, args.port, player, args.tables, args.games,
+                                                           args.n_players, args.n_clients, args.connections))
+
+    print(f"{args.tables} tables, {totals['games']} games, {totals['moves']} moves in {elapsed:.1f}s")
+    print(f"{totals['moves'] / elapsed:.1f} moves/s, {totals['games'] / elapsed:.1f} games/s")
+    if latencies:
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"client move latency: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -20,14 +20,29 @@ def main():
         )
 
 def play_game(env, players, verbosity = 1):
-    state = env.reset()
-    loser = None
-
     n_players = len(players)
-    players = [player[0](name = player[1], n_players = n_players) for player in players]
+    players = [player[0](name = player[1], n_players = n_players, lexicon = env.lexicon) for player in players]
     play_order = [i for i in range(len(players))]
     random.shuffle(play_order)
+
+    loser, _ = play_ordered_game(env, players, play_order, verbosity)
+
+    return loser
+
+def play_ordered_game(env, players, play_order, verbosity = 1):
+    '''
+    Play one game with already created players, taking turns in play_order.
+    Returns the index of the loser in players and the final state of the game.
+    If an agent raises an error, it loses and the loss condition is "agent_error".
+    '''
+    state = env.reset()
+    loser = None
+
     ordered_players = [players[order] for order in play_order]
+    for player in ordered_players:
+        # NOTE: players are reused across games, custom bots might not have a reset
+        if hasattr(player, "reset"):
+            player.reset()
 
     if verbosity > 0:
         pretty_print_state(state, ordered_players)
@@ -38,8 +53,9 @@ def play_game(env, players, verbosity = 1):
     while not state["done"]:
         current_player_idx = state["current_turn"]
         current_agent = ordered_players[current_player_idx]
-        print("-------------------")
-        print(f"It's {current_agent.name}'s turn...'")
+        if verbosity > 0:
+            print("-------------------")
+            print(f"It's {current_agent.name}'s turn...'")
 
         try:
             action_type, string_ = current_agent.get_action(state)
@@ -47,6 +63,7 @@ def play_game(env, players, verbosity = 1):
             if verbosity > 0:
                 print(f"{current_agent.name} lost the game due to an error in the agent.")
             loser = play_order[current_player_idx]
+            state = dict(state, done = True, loser = current_player_idx, loss_condition = "agent_error")
             break
 
         new_state = env.play_action(action_type, string_)
@@ -58,9 +75,10 @@ def play_game(env, players, verbosity = 1):
 
     if loser is None:
         loser = play_order[state["loser"]]
-        print(f"{players[loser].name} lost!")
+        if verbosity > 0:
+            print(f"{players[loser].name} lost!")
 
-    return loser
+    return loser, state
 
 
 def prettify_action(action_type, string_):
@@ -0,0 +1,228 @@
+'''
+Asyncio server hosting many Wordn't tables in one process.
+Every table has its own WordntEnv and its own bots, only the lexicon and the bots' read-only indexes
+and caches are shared. Bot moves run on a thread pool, so a slow move only holds up its own table
+and the event loop keeps serving the others. Give the bots a time_budget to bound their moves.
+
+The protocol is one JSON object per line over TCP. A connection can open any number of tables
+and only sees its own tables, which are closed when it disconnects.
+
+client -> server:
+    {"op": "new_table", "n_players": 3, "n_clients": 1, "tag": 0}    the client plays n_clients seats, bots play the others
+    {"op": "new_game", "table_id": 7}                         start another game on the same table and seats
+    {"op": "action", "table_id": 7, "action_type": "add_to_end", "string": "A"}
+    {"op": "close_table", "table_id": 7}
+    {"op": "stats"}
+
+server -> client:
+    {"op": "table", "table_id": 7, "seats": [2], "tag": 0}    seats are the turns (in play order) of the client,
+                                                              tag is the optional tag of the new_table request
+    {"op": "turn", "table_id": 7, "seat": 2, "state": {...}, "n_moves": 4}
+    {"op": "game_over", "table_id": 7, "state": {...}, "n_moves": 9}
+    {"op": "stats", "tables": 1000, "moves": 123456, "bot_moves": 100000}
+    {"op": "error", "table_id": 7, "message": "..."}
+
+After "table" and "new_game", bots play until one of the client's seats is to move ("turn") or the game is over.
+After "action", the same happens from the client's move.
+
+usage: python server.py --port 8765 --bot SuperAgent:time_budget=0.05 --bot-threads 8
+'''
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from game_env import WordntEnv
+from lexicon import load_lexicon, DEFAULT_WORDS_FILE
+from tournament import parse_lineup
+
+DEFAULT_PORT = 8765
+MAX_PLAYERS = 11
+
+class Table:
+    '''
+    One game table: its environment, the seats played by the client and the bots of the other seats.
+    Requests of a table are handled one at a time.
+    '''
+
+    def __init__(self, table_id, env, client_seats, bots):
+        self.table_id = table_id
+        self.env = env
+        self.client_seats = client_seats
+        self.bots = bots
+        self.state = env.get_state()
+        self.n_moves = 0
+        self.lock = asyncio.Lock()
+
+    def new_game(self):
+        self.state = self.env.reset()
+        self.n_moves = 0
+        for bot in self.bots.values():
+            if hasattr(bot, "reset"):
+                bot.reset()
+
+class WordntServer:
+    '''
+    bot is a (agent class, kwargs) tuple, every bot seat gets its own agent.
+    '''
+
+    def __init__(self, lexicon, bot, bot_threads = 8):
+        self.lexicon = lexicon
+        self.bot_class, self.bot_kwargs = bot
+        self.executor = ThreadPoolExecutor(bot_threads)
+        self._table_ids = itertools.count()
+        self.n_tables = 0
+        self.n_moves = 0
+        self.n_bot_moves = 0
+
+        # NOTE: loads the indexes and caches the bots share before any thread needs them
+        self._create_bot(0, 2)
+
+    def _create_bot(self, seat, n_players):
+        return self.bot_class(name = "Bot {}".format(seat + 1), n_players = n_players, lexicon = self.lexicon, **self.bot_kwargs)
+
+    def new_table(self, n_players, n_clients):
+        if not (2 <= n_players <= MAX_PLAYERS) or not (0 <= n_clients <= n_players):
+            raise ValueError("invalid table size")
+
+        seats = list(range(n_players))
+        random.shuffle(seats)
+        client_seats = sorted(seats[:n_clients])
+        bots = {seat:self._create_bot(seat, n_players) for seat in seats[n_clients:]}
+
+        table = Table(next(self._table_ids), WordntEnv(n_players, lexicon = self.lexicon), client_seats, bots)
+        self.n_tables += 1
+        return table
+
+    def _apply_action(self, table, action_type, string_):
+        table.state = table.env.play_action(action_type, string_)
+        table.n_moves += 1
+        self.n_moves += 1
+
+    async def play_bots(self, table):
+        '''
+        Let the bots play until a client seat is to move or the game is over.
+        '''
+        loop = asyncio.get_running_loop()
+        while (not table.state["done"]) and (table.state["current_turn"] in table.bots):
+            seat = table.state["current_turn"]
+            try:
+                action_type, string_ = await loop.run_in_executor(self.executor, table.bots[seat].get_action, table.state)
+            except Exception:
+                # NOTE: same as play_ordered_game, the bot loses
+                table.state = dict(table.state, done = True, loser = seat, loss_condition = "agent_error")
+                break
+            self._apply_action(table, action_type, string_)
+            self.n_bot_moves += 1
+
+    def get_update(self, table):
+        if table.state["done"]:
+            return {"op": "game_over", "table_id": table.table_id, "state": table.state, "n_moves": table.n_moves}
+        return {"op": "turn", "table_id": table.table_id, "seat": table.state["current_turn"], "state": table.state,
+                "n_moves": table.n_moves}
+
+    async def handle_request(self, request, tables):
+        op = request.get("op")
+
+        if op == "stats":
+            return {"op": "stats", "tables": self.n_tables, "moves": self.n_moves, "bot_moves": self.n_bot_moves}
+
+        if op == "new_table":
+            table = self.new_table(int(request.get("n_players", 3)), int(request.get("n_clients", 1)))
+            tables[table.table_id] = table
+            async with table.lock:
+                await self.play_bots(table)
+                return [{"op": "table", "table_id": table.table_id, "seats": table.client_seats, "tag": request.get("tag")},
+                        self.get_update(table)]
+
+        table = tables.get(request.get("table_id"))
+        if table is None:
+            raise ValueError("no table {}".format(request.get("table_id")))
+
+        if op == "close_table":
+            # NOTE: waits for the request the table is handling, e.g. its bots' moves
+            async with table.lock:
+                if tables.pop(table.table_id, None) is not None:
+                    self.n_tables -= 1
+            return None
+
+        async with table.lock:
+            if op == "new_game":
+                table.new_game()
+            elif op == "action":
+                if table.state["done"] or (table.state["current_turn"] not in table.client_seats):
+                    raise ValueError("not your turn")
+                self._apply_action(table, request.get("action_type"), request.get("string"))
+            else:
+                raise ValueError("unknown op {}".format(op))
+
+            await self.play_bots(table)
+            return self.get_update(table)
+
+    async def _handle_line(self, line, tables, writer):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            responses = {"op": "error", "table_id": None, "message": "requests must be JSON objects"}
+        else:
+            try:
+                responses = await self.handle_request(request, tables)
+            except Exception as error:
+                responses = {"op": "error", "table_id": request.get("table_id"), "message": str(error)}
+
+        if responses is None:
+            return
+        if isinstance(responses, dict):
+            responses = [responses]
+        if not writer.is_closing():
+            writer.write("".join(json.dumps(response) + "\n" for response in responses).encode())
+
+    async def handle_connection(self, reader, writer):
+        # tables of this connection
+        tables = {}
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # NOTE: every request runs in its own task, so a table waiting on its bots doesn't hold up the others
+                task = asyncio.create_task(self._handle_line(line, tables, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for task in list(pending):
+                task.cancel()
+            self.n_tables -= len(tables)
+            tables.clear()
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, limit = 2**20)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Host Wordn't tables over TCP (newline-delimited JSON).")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = DEFAULT_PORT)
+    parser.add_argument("--words-file", default = DEFAULT_WORDS_FILE)
+    parser.add_argument("--bot", default = "SuperAgent", help = "bot class and kwargs, as a tournament.py lineup spec")
+    parser.add_argument("--bot-threads", type = int, default = 8, help = "threads playing the bots' moves")
+    args = parser.parse_args()
+
+    lexicon = load_lexicon(args.words_file)
+    bot_class, _, bot_kwargs = parse_lineup([args.bot])[0]
+
+    server = WordntServer(lexicon, (bot_class, bot_kwargs), args.bot_threads)
+    print(f"Serving Wordn't tables on {args.host}:{args.port}")
+    asyncio.run(server.serve(args.host, args.port))
+
+if __name__ == "__main__":
+    main()
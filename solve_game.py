@@ -0,0 +1,39 @@
+'''
+Solve Wordn't exactly for the given numbers of players and save the solved tables.
+Reports solve time, table size and memory for each number of players.
+
+usage: python solve_game.py --n-players 2 3 4 5 6
+'''
+import argparse
+import os
+import resource
+import time
+from lexicon import load_lexicon, DEFAULT_WORDS_FILE
+from agents.SuperAgent.solver import SolvedTable, get_solved_table_file, DEFAULT_SOLVED_TABLE_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description = "Solve Wordn't exactly.")
+    parser.add_argument("--words-file", default = DEFAULT_WORDS_FILE)
+    parser.add_argument("--table-dir", default = DEFAULT_SOLVED_TABLE_DIR)
+    parser.add_argument("--n-players", type = int, nargs = "+", default = list(range(2, 12)))
+    args = parser.parse_args()
+
+    lexicon = load_lexicon(args.words_file)
+
+    print(f"{'players':>7} {'solve time':>10} {'strings':>9} {'table MB':>8} {'file MB':>7} {'peak RSS MB':>11} {'first player':>12}")
+    for n_players in args.n_players:
+        start_time = time.time()
+        table = SolvedTable.solve(lexicon, n_players)
+        solve_time = time.time() - start_time
+
+        table_file = get_solved_table_file(args.table_dir, n_players)
+        table.save(table_file)
+
+        # NOTE: ru_maxrss is in KB on linux
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        first_player = "wins" if table.is_win("", 0) else "loses"
+        print(f"{n_players:>7} {solve_time:>9.1f}s {len(table):>9} {table.nbytes / 2**20:>8.1f} "
+              f"{os.path.getsize(table_file) / 2**20:>7.1f} {peak_rss:>11.0f} {first_player:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+'''
+Frozen copy of the scorer of best_proposal_finder.py before the substring index (Aho-Corasick over the word list).
+The equivalence tests compare the optimized scorer against it, do not optimize it.
+Only the functions the tests use are kept, and they are copied as they were except where a NOTE says otherwise.
+'''
+import ahocorasick as ahc
+import copy
+import math
+
+def make_aho_automaton(keywords):
+    A = ahc.Automaton()  # initialize
+    for (cat, key) in enumerate(keywords):
+        A.add_word(key, (cat, key)) # add keys and categories
+    A.make_automaton() # generate automaton
+    return A
+
+def get_words_list_window(keyword, end_index, max_word_len, words_string, words_set):
+    window_start_index = max(0,end_index - max_word_len)
+    window_end_index = min(end_index + max_word_len - 1, len(words_string))
+
+    words_string_window = words_string[window_start_index:window_end_index]
+    words_string_window = words_string_window.split(" ")
+    words_list_window = [word for word in words_string_window if (keyword in word) and (word in words_set)]
+
+    return words_list_window
+
+# returns a dictionary
+def get_matched_words_per_keyword(A_keywords, words, max_word_len):
+    words_string = " " + " ".join(words) + " "
+    words_set = set(words)
+
+    matched_words_per_keyword = {}
+
+    for end_index, (_, keyword) in A_keywords.iter(words_string):
+        words_list_window = get_words_list_window(keyword, end_index, max_word_len, words_string, words_set)
+
+        if keyword not in matched_words_per_keyword.keys():
+            matched_words_per_keyword[keyword] = set(words_list_window)
+        else:
+            matched_words_per_keyword[keyword].update(words_list_window)
+
+    return matched_words_per_keyword
+
+# returns a set
+def get_matched_words_all(A_keywords, words, max_word_len, proposal, edge_match_only = False):
+    words_string = " " + " ".join(words) + " "
+    words_set = set(words)
+
+    matched_words = set()
+
+    for end_index, (_, keyword) in A_keywords.iter(words_string):
+        # keywords are the halt words
+        words_list_window = get_words_list_window(keyword, end_index, max_word_len, words_string, words_set)
+
+        if edge_match_only:
+            words_list_window_filtered = []
+            for halt_basis_word in words_list_window:
+                # case 1
+                if halt_basis_word == keyword:
+                    words_list_window_filtered.append(halt_basis_word)
+                # case 2
+                elif (proposal == halt_basis_word[:len(proposal)]) and (proposal == keyword[:len(proposal)]):
+                    words_list_window_filtered.append(halt_basis_word)
+                # case 3
+                elif (proposal == halt_basis_word[-len(proposal):]) and (proposal == keyword[-len(proposal):]):
+                    words_list_window_filtered.append(halt_basis_word)
+                else:
+                    pass
+            words_list_window = words_list_window_filtered
+
+        matched_words.update(words_list_window)
+
+    return matched_words
+
+def generate_proposal_strings(current_string, letters, words_set = None):
+    proposed_strings = set()
+
+    if current_string == "":
+        proposed_strings = [letter for letter in letters]
+
+    else:
+        for letter in letters:
+            for position in ["left", "right"]:
+                if position == "left":
+                    proposal_string = letter + current_string
+                else:
+                    proposal_string = current_string + letter
+
+                if words_set is not None:
+                    # dont propose an existing word
+                    if proposal_string not in words_set:
+                        proposed_strings.add(proposal_string)
+                else:
+                    proposed_strings.add(proposal_string)
+
+        proposed_strings = list(proposed_strings)
+
+    return proposed_strings
+
+def get_basis_words_per_proposal(proposal_strings, halt_words, basis_words, max_word_len):
+    # make an aho automaton out of proposal strings
+    A_proposals = make_aho_automaton(proposal_strings)
+
+    # find basis words per proposal
+    basis_words_per_proposal = get_matched_words_per_keyword(A_proposals, basis_words, max_word_len)
+
+    # these will contain basis words that are filtered to not have any halt words
+    basis_words_nohalt_per_proposal = copy.deepcopy(basis_words_per_proposal)
+
+    if halt_words:
+        # make automaton out of halt words
+        A_halt_words = make_aho_automaton(halt_words)
+
+        # find basis words that contain halt words and have the proposal as a suffix or prefix
+        # these are the the basis words we want to remove
+        for proposal, basis_words_filtered in basis_words_per_proposal.items():
+            halt_basis_words = get_matched_words_all(A_halt_words, basis_words_filtered, max_word_len, proposal,
+                                                    edge_match_only = True)
+
+            # get set difference to remove halting basis words
+            basis_words_nohalt_per_proposal[proposal] -= halt_basis_words
+
+    return basis_words_per_proposal, basis_words_nohalt_per_proposal
+
+def get_basis_words(current_string, n_players, max_word_len, words_set, letters):
+
+    # basis words are words that you can still form towards when it's your turn
+    basis_words = [word for word in words_set if (len(word) > len(current_string) + 1)]
+
+    # halt words are words that will force you to lose in any of your next turns
+    halt_words = [word for word in words_set if len(word) % (len(current_string) + n_players + 1) == 0]
+
+    # generate all possible ways to add a letter (i.e. get proposal strings)
+    proposal_strings = generate_proposal_strings(current_string, letters, words_set)
+
+    # enumerate all basis words and nonhalt basis words per proposal
+    basis_words_per_proposal, basis_words_nohalt_per_proposal = get_basis_words_per_proposal(proposal_strings, halt_words, basis_words, max_word_len)
+
+    return basis_words_per_proposal, basis_words_nohalt_per_proposal
+
+def compute_basis_word_ratios(basis_words_per_proposal, basis_words_nohalt_per_proposal):
+
+    basis_word_ratios = {}
+
+    for proposal in basis_words_per_proposal.keys():
+        basis_words = basis_words_per_proposal[proposal]
+        basis_words_nohalt = basis_words_nohalt_per_proposal[proposal]
+
+        if basis_words:
+            basis_word_ratio = len(basis_words_nohalt)/len(basis_words)
+            basis_word_ratios[proposal] = basis_word_ratio
+
+        # don't consider proposals with no basis words
+        else:
+            pass
+
+    return basis_word_ratios
+
+# average basis word length per proposal, optimize_stall picks the max
+# NOTE: the averages are compared, the proposal max picks among ties depends on the set order of the proposals
+def get_avg_len_basis_words(basis_words_per_proposal):
+    avg_len_basis_words = {}
+    for proposal, basis_words in basis_words_per_proposal.items():
+
+        len_basis_words = [len(word) for word in basis_words]
+        avg_len = sum(len_basis_words)/len(basis_words)
+        avg_len_basis_words[proposal] = avg_len
+
+    return avg_len_basis_words
+
+# using the nohalt intersection ratio is a metagame strategy
+def compute_nohalt_intersection_ratios(basis_words_per_proposal, basis_words_nohalt_per_proposal,
+                                       n_players, max_word_len, words_set, letters):
+
+    nohalt_intersection_ratios = {}
+
+    for proposal in basis_words_per_proposal.keys():
+
+        nhi_ratios_list = []
+
+        basis_words_nohalt = basis_words_nohalt_per_proposal[proposal]
+
+        # getting the opponent's basis words
+        next_basis_words_per_proposal, next_basis_words_nohalt_per_proposal = get_basis_words(proposal,
+                                                                                n_players, max_word_len, words_set, letters)
+
+        # calculate the basis word ratio metric
+        # given a proposal string, this is the proportion of basis words that are nonhalting
+        next_basis_word_ratios = compute_basis_word_ratios(next_basis_words_per_proposal, next_basis_words_nohalt_per_proposal)
+
+        for next_proposal in next_basis_word_ratios.keys():
+            next_basis_word_ratio = next_basis_word_ratios[next_proposal]
+            next_basis_words_nohalt = next_basis_words_nohalt_per_proposal[next_proposal]
+
+            # get count of intersection of nohalting words between you and the next opponent
+            numerator = len(next_basis_words_nohalt.intersection(basis_words_nohalt))
+            denominator = len(next_basis_words_nohalt)
+
+            if denominator != 0:
+                nohalt_intersection_ratio = numerator/denominator
+                nhi_ratios_list.append((next_basis_word_ratio,nohalt_intersection_ratio))
+
+            # opponent doesn't consider proposals with no basis words
+            else:
+                pass
+
+        # assume that opponent will choose among sure wins first, and if none exists, will chose among where basis word is nonzero
+        nhi_ratios_list = [nhir for (nbwr, nhir) in nhi_ratios_list if nbwr == 1]
+
+        if not nhi_ratios_list:
+            # assume that opponent will choose randomly among proposals where his basis word ratio is nonzero
+            nhi_ratios_list = [nhir for (nbwr, nhir) in nhi_ratios_list if nbwr != 0]
+
+        if len(nhi_ratios_list) != 0:
+            # NOTE: was sum, whose rounding depended on the set order of the next proposals (i.e. on PYTHONHASHSEED)
+            # fsum is exactly rounded like the optimized scorer, so the ratios can be compared exactly
+            nohalt_intersection_ratios[proposal] = math.fsum(nhi_ratios_list)/len(nhi_ratios_list)
+
+    return nohalt_intersection_ratios
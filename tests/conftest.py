@@ -0,0 +1,46 @@
+'''
+The fixed small lexicon the tests run on, and its substring index and suffix automata.
+'''
+import random
+import pytest
+
+from lexicon import Lexicon
+from agents.SuperAgent.substring_index import SubstringIndex
+from agents.SuperAgent.suffix_automaton import BidirectionalAutomaton
+
+N_WORDS = 400
+LETTERS = "ABCDEFG"
+MAX_WORD_LEN = 9
+
+def make_words(seed = 1, n_words = N_WORDS, letters = LETTERS, max_word_len = MAX_WORD_LEN):
+    # NOTE: few letters, so words often contain other words and the halting cases are all exercised
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < n_words:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(2, max_word_len))))
+    return sorted(words)
+
+def get_states(words_set):
+    # strings of one to three letters of the words that aren't words
+    # NOTE: all of them have proposals that aren't words, the baseline can't score a string without any
+    return sorted({word[i:i + k] for word in words_set for k in (1, 2, 3) for i in range(len(word) - k + 1)} - words_set)
+
+@pytest.fixture(scope = "session")
+def lexicon():
+    return Lexicon(make_words())
+
+@pytest.fixture(scope = "session")
+def index(lexicon):
+    return SubstringIndex.build(lexicon)
+
+@pytest.fixture(scope = "session")
+def suffix_automaton(lexicon):
+    return BidirectionalAutomaton.build(lexicon)
+
+@pytest.fixture(scope = "session")
+def words_set(lexicon):
+    return set(lexicon.words)
+
+@pytest.fixture(scope = "session")
+def states(words_set):
+    return get_states(words_set)
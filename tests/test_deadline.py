@@ -0,0 +1,47 @@
+'''
+Moves of find_best_proposal under a deadline.
+'''
+import time
+import random
+
+from agents.SuperAgent import best_proposal_finder as finder
+
+def find_best_proposal(current_string, lexicon, index, deadline, search_depth, seed = 0):
+    random.seed(seed)
+    return finder.find_best_proposal(current_string, 3, lexicon.max_word_len, lexicon.words, lexicon.letters, True, index = index, 
+                                     deadline = deadline, search_depth = search_depth)
+
+def test_expired_deadline(lexicon, index, states):
+    # a move is still made when the time is up, and it is a legal one
+    for current_string in states + [""] + list(lexicon.words)[::10]:
+        for search_depth in (2, 3):
+            output_summary = find_best_proposal(current_string, lexicon, index, time.perf_counter() - 1, search_depth)
+            action_type, action_string = output_summary["action_type"], output_summary["action_string"]
+            key = (current_string, search_depth, action_type)
+            if current_string in lexicon.words:
+                assert action_type == "challenge_is_word", key
+            elif action_type == "challenge_no_word":
+                # NOTE: only when no proposal has basis words, which doesn't take any time to find out
+                assert find_best_proposal(current_string, lexicon, index, None, search_depth)["action_type"] == action_type, key
+            else:
+                assert action_string in lexicon.letters, key
+                proposal = current_string + action_string if action_type == "add_to_end" else action_string + current_string
+                assert action_type in ("add_to_end", "add_to_start"), key
+                assert proposal == output_summary["best_proposal"], key
+                assert proposal not in lexicon.words, key
+                start, end = index.suffix_range(proposal)
+                assert end > start, key
+
+def test_generous_deadline(lexicon, index, states):
+    # a deadline that doesn't pass makes the same moves as no deadline
+    for current_string in states[::3]:
+        for search_depth in (2, 3):
+            output_summary = find_best_proposal(current_string, lexicon, index, None, search_depth, seed = len(current_string))
+            deadline_output_summary = find_best_proposal(current_string, lexicon, index, time.perf_counter() + 3600, search_depth, 
+                                                         seed = len(current_string))
+            # NOTE: only the timings of the search differ
+            for output in (output_summary, deadline_output_summary):
+                for stats in output["search_stats"]:
+                    stats.pop("seconds")
+            assert deadline_output_summary == output_summary, (current_string, search_depth)
+            assert output_summary["search_depth"] == search_depth
@@ -0,0 +1,224 @@
+'''
+The optimized scorer of best_proposal_finder.py must give the same results as the baseline scorer (see baseline_scorer.py).
+Both are run on a fixed small lexicon, on every string of one to three letters of its words that isn't a word.
+
+Run with python -m pytest -q from the repository root.
+'''
+import pytest
+
+from agents.SuperAgent import best_proposal_finder as finder
+from . import baseline_scorer as baseline
+
+N_PLAYERS = (2, 3, 4)
+
+@pytest.fixture(scope = "module")
+def baseline_scores(lexicon, words_set, states):
+    # basis words and ratios of the baseline scorer, by (current string, number of players)
+    scores = {}
+    for current_string in states:
+        for n_players in N_PLAYERS:
+            basis_words_per_proposal, basis_words_nohalt_per_proposal = baseline.get_basis_words(current_string, n_players, lexicon.max_word_len,
+                                                                                                   words_set, lexicon.letters)
+            scores[current_string, n_players] = {
+                "basis_words_per_proposal":basis_words_per_proposal,
+                "basis_words_nohalt_per_proposal":basis_words_nohalt_per_proposal,
+                "basis_word_ratios":baseline.compute_basis_word_ratios(basis_words_per_proposal, basis_words_nohalt_per_proposal),
+                "avg_len_basis_words":baseline.get_avg_len_basis_words(basis_words_per_proposal),
+                "nohalt_intersection_ratios":baseline.compute_nohalt_intersection_ratios(basis_words_per_proposal,
+                                                                                         basis_words_nohalt_per_proposal, n_players,
+                                                                                         lexicon.max_word_len, words_set, lexicon.letters),
+            }
+    return scores
+
+def test_states_exercise_the_metagame(baseline_scores):
+    # the scorer only computes the metagame ratios when no proposal is a sure win
+    assert len(baseline_scores) > 900
+    assert sum(any(0 < ratio < 1 for ratio in scores["basis_word_ratios"].values()) for scores in baseline_scores.values()) > 300
+    assert sum(bool(scores["nohalt_intersection_ratios"]) for scores in baseline_scores.values()) > 800
+
+def test_index_basis_words(lexicon, index, baseline_scores):
+    for (current_string, n_players), scores in baseline_scores.items():
+        basis_words = finder.get_basis_words(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters, index = index)
+        assert basis_words == (scores["basis_words_per_proposal"], scores["basis_words_nohalt_per_proposal"]), (current_string, n_players)
+
+def test_index_metagame_scores(lexicon, index, baseline_scores):
+    for (current_string, n_players), scores in baseline_scores.items():
+        got = finder.score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters,
+                                     use_metagame_strat = True, index = index, search_depth = 2)
+        key = (current_string, n_players)
+
+        assert got["basis_word_ratios"] == scores["basis_word_ratios"], key
+
+        best_ratio = max(scores["basis_word_ratios"].values()) if scores["basis_word_ratios"] else 1
+        if best_ratio == 0:
+            # any of the proposals with the longest basis words on average, the baseline breaks ties in set order
+            avg_len_basis_words = scores["avg_len_basis_words"]
+            assert avg_len_basis_words[got["stall_proposal"]] == max(avg_len_basis_words.values()), key
+        elif best_ratio != 1:
+            assert got["nohalt_intersection_ratios"] == scores["nohalt_intersection_ratios"], key
+
+def test_basis_word_masks(lexicon, index, baseline_scores):
+    for (current_string, n_players), scores in baseline_scores.items():
+        proposals, universe_word_ids, basis_masks, halt_masks, is_complete = finder.get_basis_word_masks(current_string, n_players, lexicon.words,
+                                                                                                         lexicon.letters, index)
+        key = (current_string, n_players)
+        assert is_complete, key
+
+        # one row per proposal with basis words, the columns are the words containing the current string
+        assert set(proposals) == set(scores["basis_words_per_proposal"]), key
+        assert index.words_of(universe_word_ids) == {word for word in lexicon.words if current_string in word}, key
+        for proposal, basis_mask, halt_mask in zip(proposals, basis_masks, halt_masks):
+            assert index.words_of(universe_word_ids[basis_mask]) == scores["basis_words_per_proposal"][proposal], (key, proposal)
+            assert index.words_of(universe_word_ids[basis_mask & ~halt_mask]) == scores["basis_words_nohalt_per_proposal"][proposal], (key, proposal)
+
+        assert finder.compute_basis_word_ratios_from_masks(proposals, basis_masks, halt_masks) == scores["basis_word_ratios"], key
+        if proposals:
+            stall_proposal = finder.optimize_stall_from_masks(proposals, universe_word_ids, basis_masks, index.word_lens)
+            assert scores["avg_len_basis_words"][stall_proposal] == max(scores["avg_len_basis_words"].values()), key
+        assert finder.compute_nohalt_intersection_ratios_from_masks(proposals, universe_word_ids, basis_masks, halt_masks, n_players, lexicon.words,
+                                                                    lexicon.letters, index) == scores["nohalt_intersection_ratios"], key
+
+def test_aho_corasick_basis_words(lexicon, words_set, baseline_scores):
+    # the fallback without an index, on the cached automata and haystacks
+    finder.AUTOMATON_CACHE.clear()
+    finder.HAYSTACK_CACHE.clear()
+    for (current_string, n_players), scores in baseline_scores.items():
+        basis_words = finder.get_basis_words(current_string, n_players, lexicon.max_word_len, words_set, lexicon.letters)
+        assert basis_words == (scores["basis_words_per_proposal"], scores["basis_words_nohalt_per_proposal"]), (current_string, n_players)
+    
+def test_single_letter_proposals(lexicon, index, words_set):
+    # the baseline lost the max_word_len long words whose only occurrence of a single letter proposal is their first letter,
+    # the Aho-Corasick path keeps them like the index path
+    for n_players in N_PLAYERS:
+        basis_words = finder.get_basis_words("", n_players, lexicon.max_word_len, words_set, lexicon.letters)
+        assert basis_words == finder.get_basis_words("", n_players, lexicon.max_word_len, lexicon.words, lexicon.letters, index = index), n_players
+        
+        baseline_basis_words_per_proposal, _ = baseline.get_basis_words("", n_players, lexicon.max_word_len, words_set, lexicon.letters)
+        for letter, basis_words in basis_words[0].items():
+            lost_words = {word for word in basis_words if (len(word) == lexicon.max_word_len) and (word.rfind(letter) == 0)}
+            assert baseline_basis_words_per_proposal.get(letter, set()) == basis_words - lost_words, (n_players, letter)
+
+def test_suffix_automaton_counts(lexicon, words_set, suffix_automaton, states):
+    for current_string in states:
+        for extension, count in suffix_automaton.extension_counts(current_string, lexicon.letters, min_len = len(current_string) + 2).items():
+            assert count == sum(extension in word for word in words_set if len(word) >= len(current_string) + 2), extension
+        
+        # extensions that occur in no word are left out
+        extensions = {letter + current_string for letter in lexicon.letters} | {current_string + letter for letter in lexicon.letters}
+        assert set(suffix_automaton.extension_counts(current_string, lexicon.letters)) == \
+            {extension for extension in extensions if any(extension in word for word in words_set)}, current_string
+
+def test_suffix_automaton_pruning(lexicon, index, suffix_automaton, baseline_scores):
+    # the pruned proposals are the ones without basis words, the scores are the same
+    for (current_string, n_players), scores in baseline_scores.items():
+        key = (current_string, n_players)
+        proposals = finder.generate_proposal_strings(current_string, lexicon.letters, lexicon.words, suffix_automaton)
+        assert set(proposals) == set(scores["basis_words_per_proposal"]), key
+        
+        for use_metagame_strat in (False, True):
+            for search_depth in (2, 3):
+                got = finder.score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters, use_metagame_strat,
+                                             index, search_depth = search_depth, suffix_automaton = suffix_automaton)
+                expected = finder.score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters,
+                                                  use_metagame_strat, index, search_depth = search_depth)
+                assert got == expected, (key, use_metagame_strat, search_depth)
+        
+        # the fallback without an index prunes the same way
+        basis_words = finder.get_basis_words(current_string, n_players, lexicon.max_word_len, set(lexicon.words), lexicon.letters,
+                                             suffix_automaton = suffix_automaton)
+        assert basis_words == (scores["basis_words_per_proposal"], scores["basis_words_nohalt_per_proposal"]), key
+
+def test_halt_word_len_masks(lexicon, index, baseline_scores):
+    # the halting basis words read from the word length masks of the index, against the baseline's search of the halt words
+    for (current_string, n_players), scores in baseline_scores.items():
+        halt_modulus = len(current_string) + n_players + 1
+        halt_words = [word for word in lexicon.words if len(word) % halt_modulus == 0]
+        A_halt_words = baseline.make_aho_automaton(halt_words)
+        
+        for proposal, basis_words in scores["basis_words_per_proposal"].items():
+            key = (current_string, n_players, proposal)
+            halt_basis_words = baseline.get_matched_words_all(A_halt_words, basis_words, lexicon.max_word_len, proposal, edge_match_only = True)
+            
+            basis_word_ids = index.word_ids(proposal, min_len = len(current_string) + 2)
+            assert index.words_of(finder.get_halt_basis_word_ids(proposal, basis_word_ids, halt_modulus, index)) == halt_basis_words, key
+            
+            # words starting (ending) with the proposal that contain a halt word also starting (ending) with it, whatever their length
+            prefix_halt_words = [halt_word for halt_word in halt_words if halt_word.startswith(proposal)]
+            suffix_halt_words = [halt_word for halt_word in halt_words if halt_word.endswith(proposal)]
+            halt_edge_words = {word for word in lexicon.words if word.startswith(proposal) and any(halt_word in word for halt_word in prefix_halt_words)}
+            halt_edge_words |= {word for word in lexicon.words if word.endswith(proposal) and any(halt_word in word for halt_word in suffix_halt_words)}
+            assert index.words_of(finder.get_halt_edge_word_ids(proposal, halt_modulus, index)) == halt_edge_words, key
+
+def test_halt_counts(lexicon, index, suffix_automaton, baseline_scores):
+    # the counts of the ratio strategy, with and without the suffix automata
+    for (current_string, n_players), scores in baseline_scores.items():
+        for proposal, basis_words in scores["basis_words_per_proposal"].items():
+            expected = (len(basis_words), len(basis_words - scores["basis_words_nohalt_per_proposal"][proposal]), sum(map(len, basis_words)))
+            for automaton in (None, suffix_automaton):
+                counts = finder.get_proposal_basis_word_counts(proposal, len(current_string) + 2, len(current_string) + n_players + 1, index,
+                                                               automaton)
+                assert counts == expected, (current_string, n_players, proposal, automaton)
+
+def get_brute_force_lookahead_ratios(current_string, n_players, letters, words_set, basis_words_nohalt_per_proposal, search_depth):
+    # compute_lookahead_ratios_from_masks without pruning or masks, straight from the words
+    # every string is a proposal made from a string one letter shorter, with its basis words and halting basis words
+    basis_words_cache = {}
+    def get_basis_words(string):
+        if string not in basis_words_cache:
+            halt_modulus = len(string) + n_players
+            basis_words = {word for word in words_set if (string in word) and (len(word) >= len(string) + 1)}
+            halt_words = [word for word in words_set if len(word) % halt_modulus == 0]
+            halt_basis_words = {word for word in basis_words if (len(word) % halt_modulus == 0) or
+                                (word.startswith(string) and any(halt_word.startswith(string) and (halt_word in word) for halt_word in halt_words)) or
+                                (word.endswith(string) and any(halt_word.endswith(string) and (halt_word in word) for halt_word in halt_words))}
+            basis_words_cache[string] = (basis_words, basis_words - halt_basis_words)
+        return basis_words_cache[string]
+    
+    def get_children(string, turn):
+        proposals = sorted({letter + string for letter in letters} | {string + letter for letter in letters})
+        children = []
+        for proposal in proposals:
+            if proposal in words_set:
+                continue
+            basis_words, basis_words_nohalt = get_basis_words(proposal)
+            if (turn == 0) and basis_words_nohalt:
+                children.append(proposal)
+            elif (turn != 0) and basis_words and (basis_words_nohalt == basis_words):
+                children.append(proposal)
+        return children
+    
+    def get_value(string, depth, turn, our_basis_words_nohalt):
+        children = get_children(string, turn) if depth > 0 else []
+        if not children:
+            _, basis_words_nohalt = get_basis_words(string)
+            return len(basis_words_nohalt & our_basis_words_nohalt)/len(basis_words_nohalt)
+        values = [get_value(child, depth - 1, (turn + 1) % n_players, our_basis_words_nohalt) for child in children]
+        if turn == 0:
+            return max(values)
+        # NOTE: summed in order like the search, so the averages are the same floats
+        total = 0.0
+        for value in values:
+            total += value
+        return total/len(values)
+    
+    lookahead_ratios = {}
+    for proposal, our_basis_words_nohalt in basis_words_nohalt_per_proposal.items():
+        if get_children(proposal, 1):
+            lookahead_ratios[proposal] = get_value(proposal, search_depth - 1, 1, our_basis_words_nohalt)
+    return lookahead_ratios
+
+@pytest.mark.parametrize("search_depth", [3, 4, 5, 6])
+def test_lookahead_search(lexicon, index, words_set, baseline_scores, search_depth):
+    # the pruned search against the full expectimax tree, on the strings that get metagame ratios
+    n_checked = 0
+    for (current_string, n_players), scores in baseline_scores.items():
+        if not (0 < max(scores["basis_word_ratios"].values(), default = 1) < 1):
+            continue
+        got = finder.score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters, use_metagame_strat = True,
+                                     index = index, search_depth = search_depth)
+        assert got["depth"] == search_depth
+        expected = get_brute_force_lookahead_ratios(current_string, n_players, lexicon.letters, words_set,
+                                                    scores["basis_words_nohalt_per_proposal"], search_depth)
+        assert got["nohalt_intersection_ratios"] == expected, (current_string, n_players)
+        n_checked += bool(expected)
+    assert n_checked > 20
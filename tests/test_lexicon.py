@@ -0,0 +1,91 @@
+'''
+Lexicon, CompactWords and the snapshot builder.
+'''
+import os
+import gzip
+import random
+import pytest
+
+from lexicon import Lexicon, build_lexicon_snapshot
+from .conftest import make_words
+
+def test_long_word_lens():
+    lexicon = Lexicon(["AB", "ABC", "B"*300, "C"*70000])
+    assert lexicon.max_word_len == 70000
+    assert lexicon.words.lens.tolist() == [2, 3, 300, 70000]
+    assert lexicon.words.ids_of_len(300).tolist() == [2]
+    assert "B"*300 in lexicon.words
+    assert "B"*44 not in lexicon.words
+
+def test_invalid_snapshot(tmp_path):
+    lexicon = Lexicon(["AB", "ABC", "BCA"])
+    lexicon.save(str(tmp_path))
+    assert list(Lexicon.load(str(tmp_path))) == list(lexicon)
+    
+    with open(os.path.join(str(tmp_path), "words.bin"), "wb") as f:
+        f.write(b"AB\nABD\nBCA")
+    with pytest.raises(ValueError):
+        Lexicon.load(str(tmp_path))
+
+def write_words_file(words_file, lines):
+    with (gzip.open if words_file.endswith(".gz") else open)(words_file, "wt", encoding = "utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return words_file
+
+def test_snapshot(tmp_path):
+    # three word lists with duplicates inside and across them, one of them gzipped
+    rng = random.Random(2)
+    lines = [make_words(seed = seed, n_words = 150) for seed in (1, 2, 3)]
+    lines = [file_lines + rng.sample(file_lines, 20) for file_lines in lines]
+    lines[1] += [word.lower() for word in lines[0][:10]] + ["  AB  ", "", "A-B", "AB CD"]
+    words_files = [write_words_file(str(tmp_path / "words_{}.txt".format(i)), file_lines) for i, file_lines in enumerate(lines[:2])]
+    words_files.append(write_words_file(str(tmp_path / "words_2.txt.gz"), lines[2]))
+    words = {line.strip().upper() for file_lines in lines for line in file_lines} - {"", "A-B", "AB CD"}
+    
+    # NOTE: chunks much smaller than the word lists, so there are many runs and the same word is in several of them
+    for chunk_size in (7, 100, 10000):
+        snapshot_dir = str(tmp_path / "snapshot_{}".format(chunk_size))
+        stats = build_lexicon_snapshot(words_files, snapshot_dir, chunk_size = chunk_size)
+        assert stats == {"n_lines": sum(map(len, lines)), "n_words": len(words), "n_invalid": 2}
+        
+        snapshot = Lexicon.load(snapshot_dir)
+        lexicon = Lexicon(sorted(words))
+        assert list(snapshot) == list(lexicon) == sorted(words)
+        assert (snapshot.digest, snapshot.letters, snapshot.max_word_len) == (lexicon.digest, lexicon.letters, lexicon.max_word_len)
+        assert snapshot.words.starts.tolist() == lexicon.words.starts.tolist()
+    
+    # an empty word list
+    write_words_file(str(tmp_path / "empty.txt"), [""])
+    stats = build_lexicon_snapshot([str(tmp_path / "empty.txt")], str(tmp_path / "empty"), chunk_size = 7)
+    assert stats == {"n_lines": 1, "n_words": 0, "n_invalid": 0}
+    assert len(Lexicon.load(str(tmp_path / "empty"))) == 0
+
+def test_snapshot_letters(tmp_path):
+    # letters outside of ASCII, lower case in the files, through the LetterCodec of the snapshot
+    lines = ["año", "niño", "ÑANDÚ", "café", "CAFÉ", "über", "ABC", "ÀB", "AB1", "ñ"*70]
+    words_files = [write_words_file(str(tmp_path / "words.txt"), lines[:5]), write_words_file(str(tmp_path / "words.txt.gz"), lines[5:])]
+    words = {line.upper() for line in lines}
+    
+    for letters in (None, "abcdefghijklmnopqrstuvwxyzñú"):
+        kept_words = words if letters is None else {word for word in words if set(word) <= set(letters.upper())}
+        snapshot_dir = str(tmp_path / "snapshot_{}".format(letters))
+        stats = build_lexicon_snapshot(words_files, snapshot_dir, letters, chunk_size = 3)
+        assert stats == {"n_lines": len(lines), "n_words": len(kept_words), "n_invalid": sum(line.upper() not in kept_words for line in lines)}
+        
+        snapshot = Lexicon.load(snapshot_dir)
+        lexicon = Lexicon(sorted(kept_words), None if letters is None else letters.upper())
+        assert list(snapshot) == list(lexicon) == sorted(kept_words)
+        assert (snapshot.digest, snapshot.letters, snapshot.words.codec.symbols) == (lexicon.digest, lexicon.letters, lexicon.words.codec.symbols)
+        assert snapshot.max_word_len == 70
+        assert all(word in snapshot for word in kept_words) and ("ÀB" in snapshot) == (letters is None)
+    
+    with pytest.raises(ValueError):
+        build_lexicon_snapshot(words_files, str(tmp_path / "invalid"), "ABCC")
+
+def test_hash_table():
+    lexicon = Lexicon(["AB", "ABC", "BCA"])
+    assert "hash_table" not in vars(lexicon.words)
+    table, mask = lexicon.words.build_hash_table()
+    assert lexicon.words.build_hash_table() == lexicon.words.hash_table == (table, mask)
+    assert sorted(word_id - 1 for word_id in table if word_id) == [0, 1, 2]
+    assert ("ABC" in lexicon.words) and ("ABD" not in lexicon.words)
@@ -0,0 +1,42 @@
+'''
+Opening book entries and lexicon checks.
+'''
+from agents.SuperAgent import best_proposal_finder as finder
+from agents.SuperAgent.opening_book import build_opening_book, load_opening_book, get_opening_book_file
+from .conftest import make_words
+from lexicon import Lexicon
+
+N_PLIES = 3
+
+def test_book_entries(lexicon, index, tmp_path):
+    book = build_opening_book(lexicon, index, 3, True, N_PLIES)
+    book.save(get_opening_book_file(str(tmp_path), 3, "metagame"))
+    loaded_book = load_opening_book(lexicon, 3, "metagame", str(tmp_path))
+    assert loaded_book is not None
+    assert len(loaded_book) == len(book)
+    assert (loaded_book.digest, loaded_book.n_plies) == (lexicon.digest, N_PLIES)
+    
+    # every string of the first plies that isn't a word is in the book, with the scores of score_proposals
+    assert "" in loaded_book.entries
+    for current_string, scores in loaded_book.entries.items():
+        assert len(current_string) < N_PLIES
+        assert current_string not in lexicon.words_set
+        assert scores == finder.score_proposals(current_string, 3, lexicon.max_word_len, lexicon.words_set, lexicon.letters, True, index)
+        assert loaded_book.get(3, "metagame", current_string) == scores
+        assert loaded_book.get(4, "metagame", current_string) is None
+        assert loaded_book.get(3, "ratio", current_string) is None
+    
+    n_substrings = len({word[i:i + n] for word in lexicon.words_set for n in range(1, N_PLIES) for i in range(len(word) - n + 1)} - lexicon.words_set)
+    assert len(loaded_book) == n_substrings + 1
+
+def test_other_lexicon(lexicon, index, tmp_path):
+    book = build_opening_book(lexicon, index, 4, False, 2)
+    book.save(get_opening_book_file(str(tmp_path), 4, "ratio"))
+    
+    # a book of another word list is never used, even once it is loaded in the process
+    assert load_opening_book(lexicon, 4, "ratio", str(tmp_path)) is not None
+    other_lexicon = Lexicon(make_words(seed = 3))
+    assert other_lexicon.digest != lexicon.digest
+    assert load_opening_book(other_lexicon, 4, "ratio", str(tmp_path)) is None
+    assert load_opening_book(other_lexicon, 4, "ratio", str(tmp_path / "no_books")) is None
+    assert load_opening_book(lexicon, 3, "ratio", str(tmp_path)) is None
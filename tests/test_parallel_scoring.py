@@ -0,0 +1,52 @@
+'''
+Scoring on a ProposalPool against the serial scoring.
+'''
+import time
+import pytest
+
+from agents.SuperAgent import best_proposal_finder as finder
+from agents.SuperAgent.parallel_scoring import ProposalPool
+
+@pytest.fixture(scope = "module")
+def pool(lexicon, index):
+    pool = ProposalPool(lexicon, index, 2)
+    yield pool
+    pool.close()
+
+def test_pool_scores(lexicon, index, states, pool):
+    for current_string in states:
+        for n_players in (2, 3):
+            for use_metagame_strat in (False, True):
+                key = (current_string, n_players, use_metagame_strat)
+                scores = finder.score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters, 
+                                                use_metagame_strat, index)
+                assert finder.score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters, 
+                                              use_metagame_strat, index, pool) == scores, key
+
+def test_pool_deadline(lexicon, index, states, pool):
+    # with the deadline already passed, only the first proposal with basis words is scored, pool or not
+    n_cut_short = 0
+    for current_string in states:
+        deadline = time.perf_counter() - 1
+        scores = finder.score_proposals(current_string, 3, lexicon.max_word_len, lexicon.words, lexicon.letters, True, index, 
+                                        deadline = deadline)
+        assert finder.score_proposals(current_string, 3, lexicon.max_word_len, lexicon.words, lexicon.letters, True, index, pool, 
+                                      deadline = deadline) == scores, current_string
+        if scores["depth"] == 0:
+            assert (len(scores["basis_word_ratios"]), scores["nohalt_intersection_ratios"]) == (1, None), current_string
+            n_cut_short += 1
+    assert n_cut_short > 100
+    
+    # metagame ratios that come back after the deadline are dropped, like the ones the serial path doesn't compute in time
+    n_dropped = 0
+    for current_string in states:
+        proposals, universe_word_ids, basis_masks, halt_masks, _ = finder.get_basis_word_masks(current_string, 3, lexicon.words, lexicon.letters, 
+                                                                                               index)
+        if not proposals:
+            continue
+        for some_pool in (None, pool):
+            assert finder.compute_nohalt_intersection_ratios_from_masks(proposals, universe_word_ids, basis_masks, halt_masks, 3, lexicon.words, 
+                                                                        lexicon.letters, index, some_pool, 
+                                                                        deadline = time.perf_counter() - 1) is None, current_string
+        n_dropped += 1
+    assert n_dropped > 100
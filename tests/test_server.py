@@ -0,0 +1,87 @@
+'''
+Tables of server.py driven over a loopback connection.
+'''
+import asyncio
+import json
+
+import agents
+from load_test_client import RandomPlayer
+from server import WordntServer
+
+TIMEOUT = 60
+
+class Client:
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, request):
+        self.writer.write((json.dumps(request) + "\n").encode())
+        await self.writer.drain()
+
+    async def receive(self):
+        line = await asyncio.wait_for(self.reader.readline(), TIMEOUT)
+        assert line, "connection closed"
+        return json.loads(line)
+
+async def play_table(lexicon, index):
+    server = WordntServer(lexicon, (agents.SuperAgent, {"index": index}), bot_threads = 2)
+    tcp_server = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    client = Client(*await asyncio.open_connection("127.0.0.1", port))
+    player = RandomPlayer(lexicon, index)
+
+    await client.send({"op": "new_table", "n_players": 3, "n_clients": 1, "tag": "first"})
+    table = await client.receive()
+    assert (table["op"], table["tag"], len(table["seats"])) == ("table", "first", 1)
+    table_id = table["table_id"]
+
+    # the client plays its seat until the game is over
+    update = await client.receive()
+    n_client_moves = 0
+    while update["op"] == "turn":
+        assert (update["table_id"], update["seat"]) == (table_id, table["seats"][0])
+        action_type, string_ = player.get_action(update["state"])
+        await client.send({"op": "action", "table_id": table_id, "action_type": action_type, "string": string_})
+        update = await client.receive()
+        n_client_moves += 1
+    assert update["op"] == "game_over"
+    assert update["state"]["done"] and (update["state"]["loss_condition"] != "invalid_action")
+    assert update["n_moves"] >= n_client_moves
+
+    # invalid requests get an error and the connection keeps serving the table
+    await client.send({"op": "action", "table_id": table_id, "action_type": "add_to_end", "string": "A"})
+    error = await client.receive()
+    assert (error["op"], error["table_id"], error["message"]) == ("error", table_id, "not your turn")
+    client.writer.write(b"not json\n")
+    assert (await client.receive())["op"] == "error"
+
+    await client.send({"op": "new_game", "table_id": table_id})
+    assert (await client.receive())["op"] in ("turn", "game_over")
+    await client.send({"op": "stats"})
+    assert (await client.receive())["tables"] == 1
+
+    # a closed table is gone
+    await client.send({"op": "close_table", "table_id": table_id})
+    await client.send({"op": "action", "table_id": table_id, "action_type": "add_to_end", "string": "A"})
+    error = await client.receive()
+    assert (error["op"], error["message"]) == ("error", "no table {}".format(table_id))
+
+    # closing a table while its bots are moving waits for them, closing it twice is a no-op
+    await client.send({"op": "new_table", "n_players": 4, "n_clients": 0})
+    await client.send({"op": "close_table", "table_id": table_id + 1})
+    await client.send({"op": "close_table", "table_id": table_id + 1})
+    table = await client.receive()
+    assert (table["op"], table["table_id"]) == ("table", table_id + 1)
+    assert (await client.receive())["op"] == "game_over"
+    await client.send({"op": "stats"})
+    assert (await client.receive())["tables"] == 0
+
+    client.writer.close()
+    tcp_server.close()
+    await tcp_server.wait_closed()
+    server.executor.shutdown()
+
+def test_loopback_table(lexicon, index):
+    asyncio.run(play_table(lexicon, index))
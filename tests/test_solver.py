@@ -0,0 +1,63 @@
+'''
+The solved tables against a brute force search of the game tree on tiny lexicons.
+'''
+import functools
+import pytest
+
+from lexicon import Lexicon
+from agents.SuperAgent.solver import SolvedTable, load_solved_table, get_solved_table_file
+from .conftest import make_words
+
+TINY_WORDS = make_words(seed = 4, n_words = 40, letters = "ABC", max_word_len = 6)
+
+def get_brute_force_win(words, n_players):
+    # win(string, turn_offset) of the SolvedTable docstring, searched from the strings down
+    substrings = {word[i:j] for word in words for i in range(len(word)) for j in range(i, len(word) + 1)}
+    letters = sorted(set("".join(words)))
+    
+    @functools.lru_cache(maxsize = None)
+    def win(string, turn_offset):
+        extensions = {extension for letter in letters for extension in (letter + string, string + letter)
+                      if (extension in substrings) and (extension not in words)}
+        next_wins = [win(extension, (turn_offset + 1) % n_players) for extension in sorted(extensions)]
+        return any(next_wins) if turn_offset == 0 else all(next_wins)
+    
+    return substrings, letters, win
+
+@pytest.mark.parametrize("n_players", [2, 3, 4])
+def test_solve(n_players):
+    lexicon = Lexicon(TINY_WORDS)
+    words = set(TINY_WORDS)
+    table = SolvedTable.solve(lexicon, n_players)
+    substrings, letters, win = get_brute_force_win(words, n_players)
+    
+    assert len(table) == len(substrings - words)
+    for string in sorted(substrings | {"CCCCCCC", "ABCABCABC"}):
+        if (string in words) or (string not in substrings):
+            assert table.get_mask(string) is None, string
+            continue
+        for turn_offset in range(n_players):
+            assert table.is_win(string, turn_offset) == win(string, turn_offset), (string, turn_offset)
+        
+        winning_proposals = {proposal for letter in letters for proposal in (letter + string, string + letter)
+                             if (proposal in substrings) and (proposal not in words) and win(proposal, 1)}
+        assert set(table.winning_proposals(string, lexicon.letters)) == winning_proposals, string
+
+def test_save_load(tmp_path):
+    lexicon = Lexicon(TINY_WORDS)
+    table = SolvedTable.solve(lexicon, 3)
+    table_file = get_solved_table_file(str(tmp_path), 3)
+    table.save(table_file)
+    
+    loaded_table = SolvedTable.load(table_file)
+    assert (loaded_table.digest, loaded_table.n_players, len(loaded_table)) == (lexicon.digest, 3, len(table))
+    for string in {word[i:j] for word in TINY_WORDS for i in range(len(word)) for j in range(i, len(word) + 1)}:
+        assert loaded_table.get_mask(string) == table.get_mask(string), string
+    
+    # a table of another lexicon in table_dir is solved again, not used
+    other_lexicon = Lexicon(make_words(seed = 5, n_words = 40, letters = "ABC", max_word_len = 6))
+    other_table = load_solved_table(other_lexicon, 3, str(tmp_path))
+    assert other_table.digest == other_lexicon.digest
+    expected_table = SolvedTable.solve(other_lexicon, 3)
+    for string in {word[i:j] for word in other_lexicon.words for i in range(len(word)) for j in range(i, len(word) + 1)}:
+        assert other_table.get_mask(string) == expected_table.get_mask(string), string
@@ -0,0 +1,84 @@
+'''
+The substring index against brute force scans of the words.
+'''
+import random
+import pytest
+
+from lexicon import Lexicon
+from agents.SuperAgent import best_proposal_finder as finder
+from agents.SuperAgent.substring_index import SubstringIndex, MAX_MASK_WORD_LEN, make_word_len_masks, load_substring_index
+from .conftest import make_words, LETTERS
+
+def get_halt_edge_words(words, proposal, halt_modulus):
+    # words starting (ending) with the proposal that contain a halt word also starting (ending) with it
+    halt_words = [word for word in words if len(word) % halt_modulus == 0]
+    prefix_halt_words = [halt_word for halt_word in halt_words if halt_word.startswith(proposal)]
+    suffix_halt_words = [halt_word for halt_word in halt_words if halt_word.endswith(proposal)]
+    halt_edge_words = {word for word in words if word.startswith(proposal) and any(halt_word in word for halt_word in prefix_halt_words)}
+    halt_edge_words |= {word for word in words if word.endswith(proposal) and any(halt_word in word for halt_word in suffix_halt_words)}
+    return halt_edge_words
+
+def test_long_words(tmp_path):
+    # the word length masks can't hold the lengths of these words, the contained words are looked up in the buffer instead
+    rng = random.Random(2)
+    long_words = ["".join(rng.choice(LETTERS) for _ in range(rng.randint(MAX_MASK_WORD_LEN + 1, 100))) for _ in range(20)]
+    # NOTE: words made of the short words, so the long words contain halt words at their edges
+    short_words = make_words(n_words = 200, max_word_len = 6)
+    long_words += ["".join(rng.sample(short_words, 15)) for _ in range(20)]
+    lexicon = Lexicon(short_words + long_words)
+    assert lexicon.max_word_len > MAX_MASK_WORD_LEN
+    
+    with pytest.raises(ValueError):
+        make_word_len_masks(lexicon.words)
+    
+    index = SubstringIndex.build(lexicon)
+    index.save(str(tmp_path))
+    loaded_index = SubstringIndex.load(str(tmp_path), lexicon)
+    
+    n_edge_words = 0
+    for proposal in sorted({word[:k] for word in lexicon.words for k in (2, 3)} | {word[-k:] for word in lexicon.words for k in (2, 3)}):
+        for halt_modulus in (3, 4, 5, 7):
+            halt_edge_words = get_halt_edge_words(lexicon.words, proposal, halt_modulus)
+            n_edge_words += len(halt_edge_words)
+            for some_index in (index, loaded_index):
+                assert index.words_of(finder.get_halt_edge_word_ids(proposal, halt_modulus, some_index)) == halt_edge_words, (proposal, halt_modulus)
+    assert n_edge_words > 0
+
+def test_long_word_offsets():
+    long_word = "B"*300 + "CAB"
+    lexicon = Lexicon(["AB", "ABC", "CAB", long_word])
+    index = SubstringIndex.build(lexicon)
+    assert index.words_containing("BCA") == {long_word}
+    assert index.words_of(index.suffix_word_ids("CAB")) == {"CAB", long_word}
+    assert index.words_of(index.prefix_word_ids("BBB")) == {long_word}
+    assert index.adjacent_letters("CA") == ("B", "B")
+
+def test_stale_index(tmp_path, lexicon, index):
+    # an index saved for another lexicon is rebuilt, not loaded
+    other_lexicon = Lexicon(make_words(seed = 3))
+    index.save(str(tmp_path))
+    with pytest.raises(ValueError):
+        SubstringIndex.load(str(tmp_path), other_lexicon)
+    
+    other_index = load_substring_index(other_lexicon, str(tmp_path))
+    assert other_index.digest == other_lexicon.digest
+    assert other_index.words_containing("AB") == {word for word in other_lexicon.words if "AB" in word}
+
+def test_witness(lexicon, index):
+    # a word containing the string whenever there is one, else None
+    rng = random.Random(5)
+    substrings = {word[i:i + k] for word in lexicon.words for k in (1, 2, 3, 4) for i in range(len(word) - k + 1)}
+    substrings |= {"".join(rng.choice(LETTERS) for _ in range(rng.randint(3, 6))) for _ in range(300)}
+    substrings |= {"Z", "AZ", lexicon.words[0] + "A"}
+    n_absent = 0
+    for substring in sorted(substrings):
+        words = {word for word in lexicon.words if substring in word}
+        if not words:
+            assert index.witness(substring, rng) is None, substring
+            n_absent += 1
+            continue
+        assert index.witness(substring, rng) in words, substring
+        # NOTE: every suffix starting with substring can be picked, so every word containing it is a possible witness
+        if len(words) <= 3:
+            assert {index.witness(substring, rng) for _ in range(100)} == words, substring
+    assert n_absent > 100
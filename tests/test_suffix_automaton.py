@@ -0,0 +1,26 @@
+'''
+The suffix automata against brute force counts of the words.
+'''
+import pytest
+
+from lexicon import Lexicon
+from agents.SuperAgent.suffix_automaton import BidirectionalAutomaton, load_suffix_automaton
+from .conftest import make_words
+
+def test_long_word_counts():
+    long_word = "B"*300 + "CAB"
+    automaton = BidirectionalAutomaton.build(Lexicon(["AB", "ABC", "CAB", long_word]))
+    assert list(automaton.forward.word_len_counts(automaton.forward_state("CA"))) == [(3, 1), (len(long_word), 1)]
+    assert automaton.count_words("BB", min_len = 256) == 1
+    assert automaton.extension_counts("BC", "ABC") == {"ABC": 1, "BBC": 1, "BCA": 1}
+
+def test_stale_automaton(tmp_path, lexicon, suffix_automaton):
+    # automata saved for another lexicon are rebuilt, not loaded
+    other_lexicon = Lexicon(make_words(seed = 3))
+    suffix_automaton.save(str(tmp_path))
+    with pytest.raises(ValueError):
+        BidirectionalAutomaton.load(str(tmp_path), other_lexicon)
+    
+    other_automaton = load_suffix_automaton(other_lexicon, str(tmp_path))
+    assert other_automaton.digest == other_lexicon.digest
+    assert other_automaton.count_words("AB") == sum("AB" in word for word in other_lexicon.words)
@@ -0,0 +1,28 @@
+'''
+Reproducibility of the tournaments, serial and parallel.
+'''
+import agents
+from tournament import run_tournament, run_parallel_tournament, summarize_tournament
+
+N_GAMES = 12
+
+def get_lineup(index):
+    # NOTE: the index is passed so that the agents don't look for one of the test lexicon on disk
+    return [(agents.SuperAgent, "SuperAgent 1", {"index": index}),
+            (agents.SuperAgent, "SuperAgent 2", {"index": index, "search_depth": 3}),
+            (agents.SuperAgent, "SuperAgent 3", {"index": index})]
+
+def test_seeded_tournament(lexicon, index):
+    results = run_tournament(get_lineup(index), N_GAMES, seed = 7, lexicon = lexicon)
+    assert [result["seed"] for result in results] == list(range(7, 7 + N_GAMES))
+    assert run_tournament(get_lineup(index), N_GAMES, seed = 7, lexicon = lexicon) == results
+    
+    # game i of seed 7 is game i - 1 of seed 8
+    assert run_tournament(get_lineup(index), N_GAMES, seed = 8, lexicon = lexicon)[:-1] == results[1:]
+    assert sum(player["losses"] for player in summarize_tournament(results, ["1", "2", "3"])) == N_GAMES
+    assert len({result["final_string"] for result in results}) > 1
+
+def test_parallel_tournament(lexicon, index):
+    results = run_tournament(get_lineup(index), N_GAMES, seed = 3, lexicon = lexicon)
+    parallel_results = list(run_parallel_tournament(get_lineup(index), N_GAMES, 2, seed = 3, lexicon = lexicon))
+    assert sorted(parallel_results, key = lambda result: result["seed"]) == results
@@ -0,0 +1,57 @@
+'''
+TranspositionCache eviction, persistence and keys.
+'''
+from agents.SuperAgent import best_proposal_finder as finder
+from agents.SuperAgent.transposition_cache import TranspositionCache, load_transposition_cache
+from .conftest import make_words
+from lexicon import Lexicon
+
+def test_lru_eviction():
+    cache = TranspositionCache("digest", max_size = 2)
+    cache.put(3, "ratio", "AB", {"a":1})
+    cache.put(3, "ratio", "BC", {"b":1})
+    assert cache.get(3, "ratio", "AB") == {"a":1}
+    cache.put(3, "ratio", "CD", {"c":1})
+    
+    # BC was used least recently
+    assert len(cache) == 2
+    assert cache.get(3, "ratio", "BC") is None
+    assert cache.get(3, "ratio", "AB") == {"a":1}
+    assert cache.get(3, "ratio", "CD") == {"c":1}
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_sqlite_round_trip(tmp_path):
+    cache_file = str(tmp_path / "cache.sqlite")
+    scores = {"basis_word_ratios":{"ABC":0.5, "BCD":1.0}, "stall_proposal":None, "nohalt_intersection_ratios":None, "depth":1}
+    cache = TranspositionCache("digest", cache_file)
+    cache.put(3, "ratio", "BC", scores)
+    
+    # another process (or a restart) reads it back from the file
+    other_cache = TranspositionCache("digest", cache_file)
+    assert other_cache.get(3, "ratio", "BC") == scores
+    other_cache.clear()
+    assert other_cache.get(3, "ratio", "BC") == scores
+    
+    # entries of another lexicon, number of players or strategy aren't hits
+    assert TranspositionCache("other digest", cache_file).get(3, "ratio", "BC") is None
+    assert other_cache.get(4, "ratio", "BC") is None
+    assert other_cache.get(3, "metagame", "BC") is None
+    assert other_cache.get(3, "ratio", "CB") is None
+
+def test_keys(lexicon, index, states):
+    # scores of other numbers of players, strategies and search depths are kept apart
+    cache = TranspositionCache(lexicon.digest)
+    current_string = states[len(states)//2]
+    for n_players, use_metagame_strat, search_depth in [(3, True, 2), (3, True, 3), (3, False, 2), (4, True, 2)]:
+        finder.find_best_proposal(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters, use_metagame_strat, 
+                                  index = index, cache = cache, search_depth = search_depth)
+        scores = finder.score_proposals(current_string, n_players, lexicon.max_word_len, lexicon.words, lexicon.letters, use_metagame_strat, 
+                                        index, search_depth = search_depth)
+        strategy = "ratio" if not use_metagame_strat else ("metagame" if search_depth == 2 else "metagame_{}".format(search_depth))
+        assert cache.get(n_players, strategy, current_string) == scores, (n_players, strategy)
+    assert len(cache) == 4
+    
+    # the transposition caches of different lexicons are different caches
+    other_lexicon = Lexicon(make_words(seed = 3))
+    assert load_transposition_cache(other_lexicon) is not load_transposition_cache(lexicon)
+    assert load_transposition_cache(lexicon) is load_transposition_cache(lexicon)
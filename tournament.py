@@ -0,0 +1,184 @@
+'''
+Headless bot-vs-bot tournaments.
+Agents, the lexicon and the environment are created once per lineup and reused for every game,
+each game is seeded so any game can be replayed, and nothing is printed until the final tables.
+
+With --workers, games are spread over a process pool. Workers are forked after the lexicon and the agents'
+indexes are loaded, so they share those pages instead of each loading or receiving a copy.
+
+usage: python tournament.py --games 100 --lineup SuperAgent SuperAgent SuperAgent:use_solver=true
+'''
+import argparse
+import json
+import multiprocessing
+import random
+import time
+from collections import Counter
+import agents
+from game_env import WordntEnv
+from lexicon import load_lexicon, DEFAULT_WORDS_FILE
+from run_game import play_ordered_game
+
+LOSS_CONDITIONS = [
+    "formed_word",
+    "challenge_no_word_failed",
+    "claim_word_failed",
+    "challenge_is_word_failed",
+    "invalid_action",
+    "agent_error",
+]
+
+def create_players(lineup, lexicon):
+    '''
+    lineup is a list of (agent class, name, kwargs) tuples, kwargs are optional.
+    '''
+    n_players = len(lineup)
+    players = []
+    for player in lineup:
+        agent_class, name = player[0], player[1]
+        kwargs = player[2] if len(player) > 2 else {}
+        players.append(agent_class(name = name, n_players = n_players, lexicon = lexicon, **kwargs))
+    return players
+
+def play_seeded_game(env, players, seed):
+    '''
+    Play one game with no printing. The seed fixes the play order and every random choice of the agents.
+    '''
+    random.seed(seed)
+    play_order = [i for i in range(len(players))]
+    random.shuffle(play_order)
+
+    loser, state = play_ordered_game(env, players, play_order, verbosity = 0)
+
+    return {"seed": seed,
+            "play_order": play_order,
+            "loser": loser,
+            "loss_condition": state["loss_condition"],
+            "final_string": state["current_string"]}
+
+def run_tournament(lineup, n_games, seed = 0, lexicon = None):
+    '''
+    Play n_games games with the same lineup. Game i is seeded with seed + i.
+    Returns the list of game results (see play_seeded_game).
+    '''
+    if lexicon is None:
+        lexicon = load_lexicon()
+
+    env = WordntEnv(len(lineup), lexicon = lexicon)
+    players = create_players(lineup, lexicon)
+
+    return [play_seeded_game(env, players, seed + i) for i in range(n_games)]
+
+# environment and players of a pool worker, created once per worker by _init_worker
+_WORKER_STATE = {}
+
+def _init_worker(lineup, lexicon, words_file):
+    if lexicon is None:
+        # NOTE: only happens without fork (e.g. spawn on macOS/Windows), then each worker loads the lexicon once
+        lexicon = load_lexicon(words_file)
+    _WORKER_STATE["env"] = WordntEnv(len(lineup), lexicon = lexicon)
+    _WORKER_STATE["players"] = create_players(lineup, lexicon)
+
+def _play_worker_game(seed):
+    return play_seeded_game(_WORKER_STATE["env"], _WORKER_STATE["players"], seed)
+
+def run_parallel_tournament(lineup, n_games, n_workers, seed = 0, lexicon = None, words_file = DEFAULT_WORDS_FILE):
+    '''
+    Same games as run_tournament, played by a pool of n_workers processes.
+    Yields each game result as soon as it is finished, so results are not in seed order.
+    '''
+    if lexicon is None:
+        lexicon = load_lexicon(words_file)
+
+    # NOTE: creating the players once here loads the indexes and tables they share into this process,
+    # forked workers then inherit them instead of loading them again
+    create_players(lineup, lexicon)
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initargs = (lineup, lexicon, words_file)
+    else:
+        context = multiprocessing.get_context()
+        initargs = (lineup, None, words_file)
+
+    with context.Pool(n_workers, initializer = _init_worker, initargs = initargs) as pool:
+        # NOTE: tasks and results are only seeds and small dicts, nothing big is pickled
+        for result in pool.imap_unordered(_play_worker_game, range(seed, seed + n_games)):
+            yield result
+
+def summarize_tournament(results, names):
+    '''
+    Aggregate game results into per player losses and loss conditions.
+    '''
+    losses = Counter(result["loser"] for result in results)
+    loss_conditions = Counter((result["loser"], result["loss_condition"]) for result in results)
+
+    summary = []
+    for i, name in enumerate(names):
+        summary.append({"name": name,
+                        "games": len(results),
+                        "losses": losses[i],
+                        "loss_rate": losses[i] / len(results) if results else 0,
+                        "loss_conditions": {condition: loss_conditions[(i, condition)] for condition in LOSS_CONDITIONS}})
+    return summary
+
+def format_summary(summary):
+    name_width = max([len(player["name"]) for player in summary] + [6])
+    lines = [f"{'player':<{name_width}} {'games':>6} {'losses':>6} {'loss rate':>9}"]
+    for player in summary:
+        lines.append(f"{player['name']:<{name_width}} {player['games']:>6} {player['losses']:>6} {player['loss_rate']:>9.1%}")
+
+    lines.append("")
+    lines.append(f"{'player':<{name_width}} " + " ".join(f"{condition:>{len(condition)}}" for condition in LOSS_CONDITIONS))
+    for player in summary:
+        counts = player["loss_conditions"]
+        lines.append(f"{player['name']:<{name_width}} " + " ".join(f"{counts[condition]:>{len(condition)}}" for condition in LOSS_CONDITIONS))
+
+    return "\n".join(lines)
+
+def parse_lineup(specs):
+    '''
+    Each spec is an agent class name from the agents package,
+    optionally followed by keyword arguments, e.g. "SuperAgent:use_solver=true,cache_file=cache.sqlite"
+    '''
+    lineup = []
+    for i, spec in enumerate(specs):
+        class_name, _, kwargs_spec = spec.partition(":")
+        kwargs = {}
+        for kwarg in filter(None, kwargs_spec.split(",")):
+            key, _, value = kwarg.partition("=")
+            try:
+                kwargs[key] = json.loads(value)
+            except ValueError:
+                kwargs[key] = value
+        lineup.append((getattr(agents, class_name), f"{class_name} {i + 1}", kwargs))
+    return lineup
+
+def main():
+    parser = argparse.ArgumentParser(description = "Play headless Wordn't tournaments between bots.")
+    parser.add_argument("--games", type = int, default = 100)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--words-file", default = DEFAULT_WORDS_FILE)
+    parser.add_argument("--workers", type = int, default = 1, help = "number of worker processes")
+    parser.add_argument("--lineup", nargs = "+", action = "append", required = True,
+                        help = "agent class names, repeat --lineup to play several lineups")
+    args = parser.parse_args()
+
+    lexicon = load_lexicon(args.words_file)
+
+    for specs in args.lineup:
+        lineup = parse_lineup(specs)
+        start_time = time.time()
+        if args.workers > 1:
+            results = list(run_parallel_tournament(lineup, args.games, args.workers, args.seed, lexicon, args.words_file))
+        else:
+            results = run_tournament(lineup, args.games, args.seed, lexicon)
+        elapsed = time.time() - start_time
+
+        print(f"Lineup: {', '.join(specs)}")
+        print(f"{args.games} games in {elapsed:.1f}s ({args.games / elapsed * 60:.0f} games per minute)")
+        print(format_summary(summarize_tournament(results, [player[1] for player in lineup])))
+        print()
+
+if __name__ == "__main__":
+    main()